@@ -0,0 +1,395 @@
+"""
+InfraLink asyncio core
+Runs status reads, log fetching and receipt waiting for any number of devices
+on one asyncio event loop (AsyncWeb3 over keep-alive aiohttp sessions) in a
+background thread. Synchronous code - the Tk UI, payload hooks, scripts -
+talks to it through thread-safe queues and concurrent.futures.Future objects,
+so hundreds of reads can be in flight without a thread per outstanding call.
+
+Usage:
+    core = AsyncMonitorCore()
+    core.start()
+    core.watch_device(address, rpc_url, out_queue)      # DeviceSnapshot/FetchError items
+    receipt = core.wait_for_receipt(rpc_url, tx_hash).result()
+    core.stop()
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+import aiohttp
+from eth_abi import decode, encode
+from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+
+from contract_abis import CONTRACT_ABI
+from metadata_cache import DEVICE_METADATA_FUNCTIONS, get_default_cache
+from monitor_core import DYNAMIC_STATE_FUNCTIONS, FetchError, build_snapshot
+from rpc_batch import AGGREGATE3_SELECTOR, MULTICALL3_ADDRESS, BatchCallError, decode_function_result, encode_call
+from rpc_pool import CONNECT_TIMEOUT, READ_TIMEOUT, split_rpc_urls
+
+MAX_IN_FLIGHT = 256  # Reads outstanding at once across all devices
+CONNECTIONS_PER_HOST = 64  # Keep-alive connections per RPC endpoint
+
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider with its own keep-alive aiohttp session, created on the core's loop"""
+
+    def __init__(self, endpoint_uri, request_kwargs=None):
+        super().__init__(endpoint_uri, request_kwargs)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=CONNECTIONS_PER_HOST, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+            )
+        return self._session
+
+    async def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        async with self._get_session().post(self.endpoint_uri, data=request_data,
+                                            headers=self.get_request_headers()) as response:
+            response.raise_for_status()
+            raw_response = await response.read()
+        return self.decode_rpc_response(raw_response)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class _Watch:
+    """One watched device: its task plus everything the loop needs to read it"""
+
+    def __init__(self, address, w3, out_queue, interval, detector, poll_interval,
+                 metadata_cache, event_watcher, reconcile_interval, metadata_watcher=None):
+        self.address = address
+        self.w3 = w3
+        self.out_queue = out_queue
+        self.interval = interval
+        self.detector = detector
+        self.poll_interval = poll_interval
+        self.metadata_cache = metadata_cache
+        self.event_watcher = event_watcher
+        self.reconcile_interval = reconcile_interval
+        self.metadata_watcher = metadata_watcher
+        self.chain_id = None
+        self.task = None
+
+
+class AsyncMonitorCore:
+    """
+    One asyncio event loop thread serving every device and chain
+
+    Each watched device is one task; watching a key again replaces its task,
+    so there is never more than one poller per device. Blocking callbacks
+    (transition detectors, event dispatch, payload hooks) run on the loop's
+    default executor so they never stall other devices' reads.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        """
+        Args:
+            max_in_flight (int): Maximum concurrent RPC reads across all devices
+        """
+        self.max_in_flight = max_in_flight
+        self.loop = None
+        self.in_flight = 0
+        self._thread = None
+        self._ready = threading.Event()
+        self._semaphore = None
+        self._web3 = {}  # rpc_url -> AsyncWeb3 (loop thread only)
+        self._unbound = {}  # rpc_url -> unbound async contract for encoding/decoding
+        self._multicall = {}  # rpc_url -> bool
+        self._watches = {}  # key -> _Watch (loop thread only)
+
+    # --- lifecycle (any thread) ---
+
+    def start(self):
+        """Start the event loop thread; returns once it is running"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, name="AsyncMonitorCore", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._ready.set()
+        self.loop.run_forever()
+
+    def stop(self, timeout=5):
+        """Cancel every watch, close the HTTP sessions and stop the loop"""
+        if self.loop is None:
+            return
+        try:
+            self.submit(self._shutdown()).result(timeout)
+        except Exception as e:
+            print(f"Async core shutdown: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self.loop = None
+        self._ready.clear()
+
+    async def _shutdown(self):
+        for watch in list(self._watches.values()):
+            watch.task.cancel()
+        self._watches.clear()
+        for w3 in self._web3.values():
+            await w3.provider.close()
+        self._web3.clear()
+        self._unbound.clear()
+
+    def submit(self, coro):
+        """
+        Run a coroutine on the core's loop from any thread
+
+        Returns:
+            concurrent.futures.Future: Resolves to the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # --- public API (any thread) ---
+
+    def watch_device(self, address, rpc_url, out_queue, interval=10.0, detector=None, poll_interval=None,
+                     metadata_cache=None, event_watcher=None, reconcile_interval=60.0,
+                     metadata_watcher=None, key=None):
+        """
+        Poll a device on the loop and post DeviceSnapshot / FetchError items to out_queue
+
+        Args:
+            address (str): Device contract address
+            rpc_url (str): RPC endpoint (the first one is used if several are given)
+            out_queue (queue.Queue): Thread-safe queue the consumer drains
+            interval (float): Seconds between polls
+            detector (TransitionDetector, optional): Fed every snapshot (polling mode)
+            poll_interval (AdaptivePollInterval, optional): Varies the delay between polls
+            metadata_cache (MetadataCache, optional): Defaults to the shared on-disk cache
+            event_watcher (DeviceEventWatcher, optional): Log-ingestion mode; its logs
+                are fetched on the loop and dispatched on the executor
+            reconcile_interval (float): Seconds between full reads in log-ingestion mode
+            metadata_watcher (DeviceEventWatcher, optional): Polled every `reconcile_interval`
+                in polling mode so metadata-changing events still invalidate the cache
+            key (optional): Watch key (defaults to the address); replaces any existing watch
+
+        Returns:
+            concurrent.futures.Future: Resolves to the watch key once the task is running
+        """
+        key = key or Web3.to_checksum_address(address.lower())
+        future = Future()
+
+        def schedule():
+            try:
+                watch = _Watch(Web3.to_checksum_address(address.lower()), self._get_web3(rpc_url), out_queue,
+                               interval, detector, poll_interval, metadata_cache or get_default_cache(),
+                               event_watcher, reconcile_interval, metadata_watcher)
+                self._cancel_watch(key)
+                watch.task = self.loop.create_task(self._watch_loop(watch))
+                self._watches[key] = watch
+                future.set_result(key)
+            except Exception as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(schedule)
+        return future
+
+    def unwatch(self, key):
+        """Stop watching a device (by key or address)"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel_watch, key)
+
+    def unwatch_all(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel_all)
+
+    def active_watches(self):
+        """Number of device tasks currently running"""
+        return sum(1 for watch in list(self._watches.values()) if not watch.task.done())
+
+    def wait_for_receipt(self, rpc_url, tx_hash, timeout=120, poll_latency=1.0):
+        """
+        Wait for a transaction receipt on the loop
+
+        Returns:
+            concurrent.futures.Future: Resolves to the receipt (or raises TimeExhausted)
+        """
+        async def wait():
+            w3 = self._get_web3(rpc_url)
+            return await w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout, poll_latency=poll_latency)
+        return self.submit(wait())
+
+    def read_snapshot(self, address, rpc_url, metadata_cache=None):
+        """
+        One-off status read
+
+        Returns:
+            concurrent.futures.Future: Resolves to a DeviceSnapshot
+        """
+        async def read():
+            watch = _Watch(Web3.to_checksum_address(address.lower()), self._get_web3(rpc_url), None, 0, None,
+                           None, metadata_cache or get_default_cache(), None, 0)
+            return await self._read_snapshot(watch)
+        return self.submit(read())
+
+    # --- loop internals ---
+
+    def _get_web3(self, rpc_url):
+        rpc_url = split_rpc_urls(rpc_url)[0]
+        w3 = self._web3.get(rpc_url)
+        if w3 is None:
+            w3 = AsyncWeb3(PooledAsyncHTTPProvider(rpc_url))
+            self._web3[rpc_url] = w3
+            self._unbound[rpc_url] = w3.eth.contract(abi=CONTRACT_ABI)
+        return w3
+
+    def _cancel_watch(self, key):
+        watch = self._watches.pop(key, None)
+        if watch is not None:
+            watch.task.cancel()
+
+    def _cancel_all(self):
+        for key in list(self._watches):
+            self._cancel_watch(key)
+
+    async def _call(self, coro):
+        """Await one RPC coroutine under the global in-flight limit"""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await coro
+            finally:
+                self.in_flight -= 1
+
+    async def _has_multicall(self, w3):
+        endpoint = str(w3.provider.endpoint_uri)
+        if endpoint not in self._multicall:
+            try:
+                code = await self._call(w3.eth.get_code(MULTICALL3_ADDRESS))
+                self._multicall[endpoint] = len(code) > 0
+            except Exception:
+                self._multicall[endpoint] = False
+        return self._multicall[endpoint]
+
+    async def _read_calls(self, w3, address, fn_names):
+        """Read several no-argument views of one contract: one Multicall3 call, or concurrent eth_calls"""
+        contract = self._unbound[str(w3.provider.endpoint_uri)]
+        encoded = [encode_call(contract, fn_name, ()) for fn_name in fn_names]
+
+        if len(encoded) > 1 and await self._has_multicall(w3):
+            calldata = AGGREGATE3_SELECTOR + encode(
+                ['(address,bool,bytes)[]'], [[(address, True, bytes.fromhex(data[2:])) for data, _ in encoded]]
+            )
+            raw = await self._call(w3.eth.call({'to': MULTICALL3_ADDRESS, 'data': Web3.to_hex(calldata)}))
+            returned = decode(['(bool,bytes)[]'], bytes(raw))[0]
+            results = []
+            for fn_name, (_, fn_abi), (success, data) in zip(fn_names, encoded, returned):
+                if not success:
+                    raise BatchCallError(f"call to {address} ({fn_name}) reverted")
+                results.append(decode_function_result(fn_abi, data))
+            return results
+
+        raws = await asyncio.gather(*[
+            self._call(w3.eth.call({'to': address, 'data': data})) for data, _ in encoded
+        ])
+        return [decode_function_result(fn_abi, bytes(raw)) for (_, fn_abi), raw in zip(encoded, raws)]
+
+    async def _read_snapshot(self, watch):
+        w3 = watch.w3
+        cache = watch.metadata_cache
+        # Lookups are in memory; writes save the cache file, so they run on the executor
+        loop = asyncio.get_running_loop()
+        if watch.chain_id is None:
+            watch.chain_id = cache.get_cached_chain_id(w3)
+            if watch.chain_id is None:
+                watch.chain_id = await self._call(w3.eth.chain_id)
+                await loop.run_in_executor(None, cache.put_chain_id, w3, watch.chain_id)
+
+        metadata = cache.get(watch.chain_id, watch.address)
+        state_fields = list(DYNAMIC_STATE_FUNCTIONS)
+        metadata_fields = list(DEVICE_METADATA_FUNCTIONS) if metadata is None else []
+        fn_names = ([DYNAMIC_STATE_FUNCTIONS[field] for field in state_fields] +
+                    [DEVICE_METADATA_FUNCTIONS[field] for field in metadata_fields])
+        results = await self._read_calls(w3, watch.address, fn_names)
+        fetched_at = time.time()
+
+        state = dict(zip(state_fields, results))
+        if metadata is None:
+            metadata = dict(zip(metadata_fields, results[len(state_fields):]))
+            await loop.run_in_executor(None, cache.put, watch.chain_id, watch.address, metadata)
+        elif metadata['token_address'].lower() != state['token_address'].lower():
+            # setToken() emits no event; refetch names/decimals on the next read
+            await loop.run_in_executor(None, cache.invalidate, watch.chain_id, watch.address)
+        return build_snapshot(state, metadata, watch.chain_id, fetched_at)
+
+    async def _poll_events(self, watch, watcher):
+        """Async twin of DeviceEventWatcher.poll(): fetch on the loop, dispatch on the executor"""
+        loop = asyncio.get_running_loop()
+        # begin_poll/end_poll may save the cursor file (and begin_poll drop cached metadata)
+        block_number = await self._call(watch.w3.eth.block_number)
+        poll_range = await loop.run_in_executor(None, watcher.begin_poll, block_number)
+        if poll_range is None:
+            return []
+
+        dispatched = []
+        start_block = from_block = poll_range[0]
+        head = poll_range[1]
+        page_size = watcher.max_block_range
+        while from_block <= head:
+            to_block = min(from_block + page_size - 1, head)
+            try:
+                logs = await self._call(watch.w3.eth.get_logs(watcher.log_filter(from_block, to_block)))
+            except Exception:
+                if page_size > 1:
+                    page_size = max(1, page_size // 2)
+                    continue
+                raise
+            dispatched.extend(await loop.run_in_executor(None, watcher.handle_page, logs, to_block))
+            from_block = to_block + 1
+
+        await loop.run_in_executor(None, watcher.end_poll, start_block)
+        return dispatched
+
+    async def _watch_loop(self, watch):
+        loop = asyncio.get_running_loop()
+        last_snapshot_at = None
+        last_metadata_check = None
+        snapshot = None
+        while True:
+            error = False
+            events = None
+            try:
+                if watch.event_watcher is not None:
+                    events = await self._poll_events(watch, watch.event_watcher)
+                    await loop.run_in_executor(None, watch.event_watcher.check_expiry)
+                    due = last_snapshot_at is None or time.time() - last_snapshot_at >= watch.reconcile_interval
+                    if events or due:
+                        snapshot = await self._read_snapshot(watch)
+                        watch.out_queue.put(snapshot)
+                        last_snapshot_at = time.time()
+                else:
+                    if watch.metadata_watcher is not None and (
+                            last_metadata_check is None or
+                            time.time() - last_metadata_check >= watch.reconcile_interval):
+                        await self._poll_events(watch, watch.metadata_watcher)
+                        last_metadata_check = time.time()
+                    snapshot = await self._read_snapshot(watch)
+                    if watch.detector is not None:
+                        await loop.run_in_executor(None, watch.detector.observe_snapshot, snapshot)
+                    watch.out_queue.put(snapshot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = True
+                watch.out_queue.put(FetchError(str(e), time.time()))
+
+            delay = watch.interval
+            if watch.poll_interval is not None:
+                watch.poll_interval.record_call()
+                delay = watch.poll_interval.next_interval(snapshot, error=error, events_pending=bool(events))
+            await asyncio.sleep(delay)
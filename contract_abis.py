@@ -0,0 +1,425 @@
+"""
+InfraLink contract ABIs
+Shared by the Tk device monitor, the headless daemon and the helper modules,
+so none of them has to import tkinter just to talk to the contracts.
+"""
+
+# Device Contract ABI - Updated to match actual deployed contract
+CONTRACT_ABI = [
+    {
+        "inputs": [
+            {"internalType": "address", "name": "_token", "type": "address"},
+            {"internalType": "uint256", "name": "_feePerSecond", "type": "uint256"},
+            {"internalType": "uint256", "name": "_whitelistFeePerSecond", "type": "uint256"},
+            {"internalType": "string", "name": "_deviceName", "type": "string"},
+            {"internalType": "string", "name": "_deviceDescription", "type": "string"}
+        ],
+        "stateMutability": "nonpayable",
+        "type": "constructor"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
+            {"indexed": False, "internalType": "uint256", "name": "duration", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "endsAt", "type": "uint256"},
+            {"indexed": False, "internalType": "bool", "name": "isWhitelisted", "type": "bool"},
+            {"indexed": False, "internalType": "uint256", "name": "paidAmount", "type": "uint256"}
+        ],
+        "name": "DeviceActivated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
+            {"indexed": False, "internalType": "bool", "name": "wasWhitelisted", "type": "bool"}
+        ],
+        "name": "DeviceDeactivated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "internalType": "string", "name": "name", "type": "string"},
+            {"indexed": False, "internalType": "string", "name": "description", "type": "string"}
+        ],
+        "name": "DeviceInfoUpdated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "internalType": "uint256", "name": "newFee", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "newWhitelistFee", "type": "uint256"}
+        ],
+        "name": "FeeChanged",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256", "name": "secondsToActivate", "type": "uint256"}
+        ],
+        "name": "activate",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "deactivate",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "deviceDescription",
+        "outputs": [
+            {"internalType": "string", "name": "", "type": "string"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "deviceName",
+        "outputs": [
+            {"internalType": "string", "name": "", "type": "string"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "feePerSecond",
+        "outputs": [
+            {"internalType": "uint256", "name": "", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "forceDeactivate",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getDeviceDetails",
+        "outputs": [
+            {"internalType": "string", "name": "_deviceName", "type": "string"},
+            {"internalType": "string", "name": "_deviceDescription", "type": "string"},
+            {"internalType": "bool", "name": "_useNativeToken", "type": "bool"},
+            {"internalType": "bool", "name": "_lastUserWasWhitelisted", "type": "bool"},
+            {"internalType": "uint256", "name": "_whitelistFeePerSecond", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "user", "type": "address"}
+        ],
+        "name": "getDeviceInfo",
+        "outputs": [
+            {"internalType": "uint256", "name": "_feePerSecond", "type": "uint256"},
+            {"internalType": "bool", "name": "_isActive", "type": "bool"},
+            {"internalType": "address", "name": "_lastActivatedBy", "type": "address"},
+            {"internalType": "uint256", "name": "_sessionEndsAt", "type": "uint256"},
+            {"internalType": "address", "name": "_token", "type": "address"},
+            {"internalType": "bool", "name": "_isWhitelisted", "type": "bool"},
+            {"internalType": "uint256", "name": "_timeRemaining", "type": "uint256"},
+            {"internalType": "string", "name": "_tokenName", "type": "string"},
+            {"internalType": "string", "name": "_tokenSymbol", "type": "string"},
+            {"internalType": "uint8", "name": "_tokenDecimals", "type": "uint8"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+
+
+    {
+        "inputs": [],
+        "name": "isActive",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "lastActivatedBy",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "lastUserWasWhitelisted",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "owner",
+        "outputs": [
+            {"internalType": "address", "name": "", "type": "address"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "sessionEndsAt",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "string", "name": "_name", "type": "string"},
+            {"internalType": "string", "name": "_description", "type": "string"}
+        ],
+        "name": "setDeviceInfo",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256", "name": "_fee", "type": "uint256"},
+            {"internalType": "uint256", "name": "_whitelistFee", "type": "uint256"}
+        ],
+        "name": "setFee",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "_token", "type": "address"}
+        ],
+        "name": "setToken",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+
+
+    {
+        "inputs": [],
+        "name": "token",
+        "outputs": [
+            {"internalType": "address", "name": "", "type": "address"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "tokenDecimals",
+        "outputs": [
+            {"internalType": "uint8", "name": "", "type": "uint8"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "tokenName",
+        "outputs": [
+            {"internalType": "string", "name": "", "type": "string"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "tokenSymbol",
+        "outputs": [
+            {"internalType": "string", "name": "", "type": "string"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "newOwner", "type": "address"}
+        ],
+        "name": "transferOwnership",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "useNativeToken",
+        "outputs": [
+            {"internalType": "bool", "name": "", "type": "bool"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+
+
+
+    {
+        "inputs": [],
+        "name": "whitelistFeePerSecond",
+        "outputs": [
+            {"internalType": "uint256", "name": "", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+
+    {
+        "inputs": [],
+        "name": "withdrawFees",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    }
+]
+
+# Info Contract ABI for whitelist functionality - Updated to match actual deployed contract
+INFO_CONTRACT_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "name", "type": "string"},
+            {"indexed": False, "internalType": "string", "name": "bio", "type": "string"}
+        ],
+        "name": "UserProfileUpdated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"}
+        ],
+        "name": "UserProfileDeleted",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "deviceContract", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "whitelistName", "type": "string"},
+            {"indexed": False, "internalType": "uint256", "name": "feePerSecond", "type": "uint256"},
+            {"indexed": False, "internalType": "bool", "name": "isFree", "type": "bool"}
+        ],
+        "name": "WhitelistAdded",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "deviceContract", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "removedBy", "type": "address"}
+        ],
+        "name": "WhitelistRemoved",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "deviceContract", "type": "address"},
+            {"indexed": False, "internalType": "string", "name": "whitelistName", "type": "string"},
+            {"indexed": False, "internalType": "uint256", "name": "feePerSecond", "type": "uint256"},
+            {"indexed": False, "internalType": "bool", "name": "isFree", "type": "bool"}
+        ],
+        "name": "WhitelistUpdated",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "user", "type": "address"},
+            {"internalType": "address", "name": "deviceContract", "type": "address"}
+        ],
+        "name": "getWhitelistInfo",
+        "outputs": [
+            {"internalType": "string", "name": "whitelistName", "type": "string"},
+            {"internalType": "uint256", "name": "feePerSecond", "type": "uint256"},
+            {"internalType": "bool", "name": "isFree", "type": "bool"},
+            {"internalType": "uint256", "name": "addedAt", "type": "uint256"},
+            {"internalType": "address", "name": "addedBy", "type": "address"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address", "name": "user", "type": "address"},
+            {"internalType": "address", "name": "deviceContract", "type": "address"}
+        ],
+        "name": "isUserWhitelisted",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "user", "type": "address"}],
+        "name": "getUserWhitelists",
+        "outputs": [
+            {"internalType": "address[]", "name": "deviceContracts", "type": "address[]"},
+            {"internalType": "string[]", "name": "deviceNames", "type": "string[]"},
+            {"internalType": "string[]", "name": "whitelistNames", "type": "string[]"},
+            {"internalType": "uint256[]", "name": "feePerSeconds", "type": "uint256[]"},
+            {"internalType": "bool[]", "name": "isFreeAccess", "type": "bool[]"},
+            {"internalType": "uint256[]", "name": "addedAts", "type": "uint256[]"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "user", "type": "address"}],
+        "name": "getUserProfile",
+        "outputs": [
+            {"internalType": "string", "name": "name", "type": "string"},
+            {"internalType": "string", "name": "bio", "type": "string"},
+            {"internalType": "string", "name": "email", "type": "string"},
+            {"internalType": "string", "name": "avatar", "type": "string"},
+            {"internalType": "bool", "name": "exists", "type": "bool"},
+            {"internalType": "uint256", "name": "createdAt", "type": "uint256"},
+            {"internalType": "uint256", "name": "updatedAt", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getAllRegisteredUsers",
+        "outputs": [{"internalType": "address[]", "name": "", "type": "address[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getAllRegisteredDevices",
+        "outputs": [{"internalType": "address[]", "name": "", "type": "address[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getRegisteredUsersCount",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "name": "registeredUsers",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
@@ -3,12 +3,13 @@
 Debug script to check contract deployment values with network awareness
 """
 import sys
-from web3 import Web3
 from network_utils import (
     get_network_info, validate_deployment_fee, 
-    format_native_amount, get_currency_symbol,
+    format_native_amount, format_units, parse_units, get_currency_symbol,
     print_deployment_guide
 )
+from metadata_cache import get_default_cache, get_device_metadata
+from rpc_pool import get_web3
 
 # Configuration
 HEDERA_TESTNET_RPC = "https://testnet.hashio.io/api"
@@ -57,6 +58,27 @@ MINIMAL_ABI = [
         "outputs": [{"internalType": "string", "name": "", "type": "string"}],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "deviceDescription",
+        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "token",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "tokenName",
+        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
     }
 ]
 
@@ -67,14 +89,17 @@ def main():
     print()
     
     # Initialize Web3
-    w3 = Web3(Web3.HTTPProvider(HEDERA_TESTNET_RPC))
+    w3 = get_web3(HEDERA_TESTNET_RPC)
     
     if not w3.is_connected():
         print("❌ Failed to connect to Hedera testnet")
         sys.exit(1)
     
     print("✅ Connected to network")
-    chain_id = w3.eth.chain_id
+    # Pass --refresh to ignore cached metadata and re-read it from the chain
+    refresh = "--refresh" in sys.argv[1:]
+    metadata_cache = get_default_cache()
+    chain_id = w3.eth.chain_id if refresh else metadata_cache.get_chain_id(w3)
     network_info = get_network_info(chain_id)
     print(f"Chain ID: {chain_id}")
     print(f"Network: {network_info['name']}")
@@ -95,17 +120,21 @@ def main():
     print("=== Contract Values ===")
     
     try:
-        # Get basic info
-        device_name = contract.functions.deviceName().call()
+        # Get basic info (served from the metadata cache when available)
+        if refresh:
+            metadata_cache.invalidate(chain_id, contract_address)
+        metadata = get_device_metadata(contract, chain_id, metadata_cache)
+        
+        device_name = metadata['device_name']
         print(f"Device Name: {device_name}")
         
-        use_native = contract.functions.useNativeToken().call()
+        use_native = metadata['use_native_token']
         print(f"Use Native Token: {use_native}")
         
-        token_symbol = contract.functions.tokenSymbol().call()
+        token_symbol = metadata['token_symbol']
         print(f"Token Symbol: {token_symbol}")
         
-        token_decimals = contract.functions.tokenDecimals().call()
+        token_decimals = metadata['token_decimals']
         print(f"Token Decimals: {token_decimals}")
         
         # Get fee info
@@ -137,33 +166,27 @@ def main():
         print(f"Total Cost (raw): {total_cost_raw}")
         print(f"Total Cost (human): {total_cost_human_formatted} {currency_symbol}")
         
-        # Expected values based on network
-        expected_fee = 0.001
-        expected_total = expected_fee * duration
+        # Expected values based on network, in smallest units so the comparison is exact
+        expected_fee = "0.001"
+        expected_fee_raw = parse_units(expected_fee, token_decimals, truncate=True)
+        expected_total_raw = expected_fee_raw * duration
         
         print()
         print("=== Expected vs Actual ===")
         print(f"Expected fee per second: {expected_fee} {currency_symbol}")
         print(f"Actual fee per second: {fee_human_formatted} {currency_symbol}")
-        print(f"Expected total cost: {expected_total} {currency_symbol}")
+        print(f"Expected total cost: {format_units(expected_total_raw, token_decimals, trim=True)} {currency_symbol}")
         print(f"Actual total cost: {total_cost_human_formatted} {currency_symbol}")
         
-        # Convert human-formatted strings to float for comparison
-        try:
-            actual_fee_float = float(fee_human_formatted)
-            actual_total_float = float(total_cost_human_formatted)
+        if fee_per_second == expected_fee_raw:
+            print("✅ Fee per second matches expected value")
+        else:
+            print(f"❌ Fee per second does NOT match expected value ({fee_per_second} != {expected_fee_raw})")
             
-            if abs(actual_fee_float - expected_fee) < 0.0001:
-                print("✅ Fee per second matches expected value")
-            else:
-                print("❌ Fee per second does NOT match expected value")
-                
-            if abs(actual_total_float - expected_total) < 0.0001:
-                print("✅ Total cost matches expected value")
-            else:
-                print("❌ Total cost does NOT match expected value")
-        except ValueError:
-            print("⚠️  Could not parse formatted amounts for comparison")
+        if total_cost_raw == expected_total_raw:
+            print("✅ Total cost matches expected value")
+        else:
+            print(f"❌ Total cost does NOT match expected value ({total_cost_raw} != {expected_total_raw})")
             
     except Exception as e:
         print(f"❌ Error reading contract values: {e}")
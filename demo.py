@@ -8,8 +8,11 @@ import json
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from web3 import Web3
 from datetime import datetime
+from gas_oracle import get_gas_oracle
+from nonce_manager import get_nonce_manager
+from rpc_pool import get_web3
+from tx_pipeline import TransactionPipeline, CONFIRMED, FAILED, SENT, REPLACED, REPLACE_FAILED
 
 class InfraLinkDemo:
     def __init__(self):
@@ -30,6 +33,9 @@ class InfraLinkDemo:
         self.contract = None
         self.token_contract = None
         self.account = None
+        self.gas_oracle = None
+        self.tx_pipeline = None
+        self.tx_poll_job = None
         
         self.setup_ui()
         
@@ -176,6 +182,7 @@ class InfraLinkDemo:
         ttk.Button(button_frame, text="Activate Device", command=self.activate_device).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Deactivate Device", command=self.deactivate_device).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Check Balance", command=self.check_balance).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Speed Up Pending", command=self.speed_up_pending).pack(side='left', padx=5)
         
         # Device info display
         info_frame = ttk.LabelFrame(user_frame, text="Device Information", padding="10")
@@ -184,6 +191,10 @@ class InfraLinkDemo:
         self.device_info_text = tk.Text(info_frame, height=8, wrap='word')
         self.device_info_text.pack(fill='both', expand=True)
         
+        # Transactions still being sent or mined
+        self.tx_status_label = ttk.Label(user_frame, text="No pending transactions")
+        self.tx_status_label.grid(row=3, column=0, columnspan=2, sticky='w')
+        
     def setup_logs_tab(self, parent):
         # Logs display
         logs_frame = ttk.LabelFrame(parent, text="Event Logs", padding="10")
@@ -215,15 +226,21 @@ class InfraLinkDemo:
             private_key = self.key_entry.get()
             
             # Initialize Web3
-            self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+            self.w3 = get_web3(rpc_url)
             
             if not self.w3.is_connected():
                 raise Exception("Failed to connect to blockchain")
+            chain_id = self.w3.eth.chain_id
+            self.gas_oracle = get_gas_oracle(self.w3, chain_id)
             
             # Initialize account
             if private_key:
                 self.account = self.w3.eth.account.from_key(private_key)
                 self.log_message(f"Connected account: {self.account.address}")
+                if self.tx_pipeline:
+                    self.tx_pipeline.shutdown()
+                self.tx_pipeline = TransactionPipeline(self.w3, self.account,
+                                                       nonces=get_nonce_manager(self.w3, self.account.address, chain_id))
             
             # Initialize contracts if addresses provided
             if contract_addr and contract_addr != "0x0000000000000000000000000000000000000000":
@@ -315,76 +332,99 @@ class InfraLinkDemo:
             self.root.after(5000, self.monitor_device)  # Check every 5 seconds
             
     def activate_device(self):
-        """Simulate device activation"""
+        """Simulate device activation (returns once the transaction is queued)"""
         if not self.contract or not self.account:
             messagebox.showerror("Error", "Please connect to blockchain and contract first")
             return
             
         try:
             duration = int(self.duration_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Duration must be a whole number of seconds")
+            return
             
-            # Build transaction
-            txn = self.contract.functions.activate(duration).build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': 200000,
-                'gasPrice': self.w3.eth.gas_price
-            })
-            
-            # Sign and send transaction
-            signed_txn = self.account.sign_transaction(txn)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            self.log_message(f"Device activation transaction sent: {tx_hash.hex()}")
-            
-            # Wait for confirmation
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            
-            if receipt.status == 1:
-                self.log_message(f"Device activated successfully for {duration} seconds")
-                messagebox.showinfo("Success", f"Device activated for {duration} seconds")
-            else:
-                self.log_message("Device activation failed")
-                messagebox.showerror("Error", "Device activation failed")
-                
-        except Exception as e:
-            self.log_message(f"Activation error: {str(e)}")
-            messagebox.showerror("Error", f"Activation failed: {str(e)}")
+        contract = self.contract
+        self.submit_transaction(lambda nonce: self.build_transaction(contract.functions.activate(duration), nonce),
+                                f"activation ({duration}s)")
             
     def deactivate_device(self):
-        """Simulate device deactivation"""
+        """Simulate device deactivation (returns once the transaction is queued)"""
         if not self.contract or not self.account:
             messagebox.showerror("Error", "Please connect to blockchain and contract first")
             return
             
-        try:
-            # Build transaction
-            txn = self.contract.functions.deactivate().build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': 200000,
-                'gasPrice': self.w3.eth.gas_price
-            })
-            
-            # Sign and send transaction
-            signed_txn = self.account.sign_transaction(txn)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            self.log_message(f"Device deactivation transaction sent: {tx_hash.hex()}")
-            
-            # Wait for confirmation
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        contract = self.contract
+        self.submit_transaction(lambda nonce: self.build_transaction(contract.functions.deactivate(), nonce),
+                                "deactivation")
+        
+    def build_transaction(self, fn, nonce):
+        """Build a contract call with a cached gas estimate and current fees (runs on the sender thread)"""
+        return fn.build_transaction({
+            'from': self.account.address,
+            'nonce': nonce,
+            **self.gas_oracle.transaction_params(fn, self.account.address)
+        })
+        
+    def submit_transaction(self, build, label):
+        """Hand a transaction to the pipeline and make sure its progress gets reported"""
+        self.tx_pipeline.submit(build, label)
+        self.log_message(f"Device {label} queued")
+        self.update_tx_status()
+        if self.tx_poll_job is None:
+            self.tx_poll_job = self.root.after(250, self.poll_transactions)
+            
+    def poll_transactions(self):
+        """Report sent/mined transactions; runs on the Tk thread while any are outstanding"""
+        self.tx_poll_job = None
+        pipeline = self.tx_pipeline
+        if pipeline is None:
+            return
             
-            if receipt.status == 1:
-                self.log_message("Device deactivated successfully")
-                messagebox.showinfo("Success", "Device deactivated")
+        # Read before draining: the pipeline queues a transaction's last update before it stops
+        # counting as outstanding, so once this is zero the drain below holds every final status
+        outstanding = pipeline.outstanding
+        for tx, status in pipeline.drain():
+            if status == SENT:
+                self.log_message(f"Device {tx.label} transaction sent: {tx.tx_hash} (nonce {tx.nonce})")
+            elif status == REPLACED:
+                self.log_message(f"Device {tx.label} re-sent with higher fees: {tx.tx_hash}")
+            elif status == REPLACE_FAILED:
+                self.log_message(f"Device {tx.label} could not be replaced: {tx.error}")
+            elif status == CONFIRMED:
+                self.log_message(f"Device {tx.label} confirmed in block {tx.receipt['block_number']}")
+                messagebox.showinfo("Success", f"Device {tx.label} confirmed")
+            elif status == FAILED:
+                self.log_message(f"Device {tx.label} failed (reverted in block {tx.receipt['block_number']})")
+                if tx.receipt['gas_used'] >= tx.params.get('gas', 0):
+                    # Out of gas: the cached estimates no longer match the contract's state
+                    self.gas_oracle.invalidate()
+                messagebox.showerror("Error", f"Device {tx.label} failed")
             else:
-                self.log_message("Device deactivation failed")
-                messagebox.showerror("Error", "Device deactivation failed")
+                self.log_message(f"Device {tx.label} error: {tx.error}")
+                messagebox.showerror("Error", f"Device {tx.label} failed: {tx.error}")
                 
-        except Exception as e:
-            self.log_message(f"Deactivation error: {str(e)}")
-            messagebox.showerror("Error", f"Deactivation failed: {str(e)}")
+        self.update_tx_status()
+        if pipeline is self.tx_pipeline and outstanding:
+            self.tx_poll_job = self.root.after(250, self.poll_transactions)
+            
+    def speed_up_pending(self):
+        """Replace every sent-but-unmined transaction with a higher-fee copy (same nonce)"""
+        stuck = self.tx_pipeline.sent_transactions() if self.tx_pipeline else []
+        if not stuck:
+            messagebox.showinfo("Speed Up", "No transactions waiting to be mined")
+            return
+        for tx in stuck:
+            self.tx_pipeline.replace(tx)
+        self.log_message(f"Re-sending {len(stuck)} transaction(s) with higher fees")
+        if self.tx_poll_job is None:
+            self.tx_poll_job = self.root.after(250, self.poll_transactions)
+            
+    def update_tx_status(self):
+        outstanding = self.tx_pipeline.outstanding if self.tx_pipeline else 0
+        if outstanding:
+            self.tx_status_label.config(text=f"{outstanding} transaction(s) pending")
+        else:
+            self.tx_status_label.config(text="No pending transactions")
             
     def force_deactivate(self):
         """Force deactivate device (owner only)"""
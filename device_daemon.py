@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+InfraLink headless device daemon
+Monitors many device contracts, possibly on several chains, from one process
+without a GUI. Devices on the same RPC URL share one Web3 connection and are
+read together in batched round-trips; a single scheduler thread decides which
+devices are due, and each device's payload hooks run independently of the
+others' on a shared worker pool.
+
+Usage:
+    python device_daemon.py devices.json
+
+Config file:
+    {
+        "interval": 10,
+        "idle_interval": 60,
+        "devices": [
+            {
+                "name": "lab-lamp",
+                "address": "0xaff84326fc701dfb3c5881b2749dba27e9a98978",
+                "rpc_url": "https://testnet.hashio.io/api",
+                "payload_script": "devicepayload.py",
+                "interval": 5
+            }
+        ]
+    }
+
+"name", "payload_script" and the per-device "interval" are optional.
+"rpc_urls" (a list) may replace "rpc_url" to spread reads over several
+endpoints of the same chain with failover and hedging.
+"idle_interval" (top-level or per device) turns on adaptive polling: idle
+devices slow down towards it, and reads cluster around session ends.
+Devices using the default devicepayload.py run its hooks in-process, with
+the device address passed to each hook; other payload scripts run as
+subprocesses with INFRALINK_DEVICE and INFRALINK_DEVICE_NAME in their
+environment.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+from contract_abis import CONTRACT_ABI
+from device_events import DeviceEventWatcher
+from metadata_cache import get_default_cache, queue_metadata_reads, collect_metadata, INVALIDATING_EVENTS
+from monitor_core import (TransitionDetector, SessionExpiryScheduler, AdaptivePollInterval,
+                          queue_state_reads, build_snapshot)
+from network_utils import get_block_time
+from rpc_pool import get_web3, close_sessions, split_rpc_urls
+from payload_runner import DEFAULT_PAYLOAD_SCRIPT, PayloadEngine, SerialHookRunner, run_payload_script
+from rpc_batch import BatchReader, BatchCallError
+
+DEFAULT_INTERVAL = 10  # seconds
+DEFAULT_BATCH_SIZE = 50  # devices per batched round-trip
+RATE_REPORT_INTERVAL = 300  # seconds between reads/min reports when adaptive polling is on
+EXPIRY_WARNING_LEAD = 60  # seconds before a session ends that the expiry_warning hook runs
+METADATA_CHECK_INTERVAL = 60  # seconds between DeviceInfoUpdated/FeeChanged log checks per device
+
+
+class MonitoredDevice:
+    """Per-device state; kept deliberately small so hundreds fit in one process"""
+
+    __slots__ = ('name', 'address', 'rpc_url', 'payload_script', 'interval', 'idle_interval',
+                 'detector', 'poll_interval', 'snapshot', 'last_error')
+
+    def __init__(self, address, rpc_url, name=None, payload_script=DEFAULT_PAYLOAD_SCRIPT,
+                 interval=DEFAULT_INTERVAL, idle_interval=None):
+        self.address = Web3.to_checksum_address(address.lower())
+        self.rpc_url = rpc_url
+        self.name = name or self.address[:10]
+        self.payload_script = payload_script
+        self.interval = interval
+        self.idle_interval = idle_interval  # None: fixed interval, no adaptive polling
+        self.detector = None
+        self.poll_interval = None
+        self.snapshot = None
+        self.last_error = None
+
+
+class _ChainConnection:
+    """One Web3 instance and one unbound contract per RPC URL, shared by every device on it"""
+
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.w3 = get_web3(rpc_url)
+        # Unbound contract: only used to encode/decode calls, the device address is passed per call
+        self.contract = self.w3.eth.contract(abi=CONTRACT_ABI)
+        self.chain_id = None
+        # Per-device DeviceInfoUpdated/FeeChanged watchers and when each is next due; a device
+        # is only ever in one pass at a time, so its entries are never touched concurrently
+        self.metadata_watchers = {}
+        self.next_metadata_check = {}
+
+
+class DeviceDaemon:
+    """Schedules batched status reads for many devices and dispatches their payload hooks"""
+
+    def __init__(self, max_workers=8, batch_size=DEFAULT_BATCH_SIZE, metadata_cache=None):
+        """
+        Args:
+            max_workers (int): Threads shared by RPC reads and payload hooks (each)
+            batch_size (int): Maximum devices read in one batched round-trip
+            metadata_cache (MetadataCache, optional): Defaults to the shared on-disk cache
+        """
+        self.batch_size = batch_size
+        self.metadata_cache = metadata_cache or get_default_cache()
+        self.devices = []
+        self._connections = {}
+        self._schedule = []  # heap of (due_time, seq, device)
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._read_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reader")
+        self.hooks = SerialHookRunner(max_workers=max_workers)
+        # One timer thread disables every device right at its session end; polls only reconcile
+        self.expiry_scheduler = SessionExpiryScheduler()
+        self.payload_engine = None  # Created on first use by a device with the default payload
+        self._engine_lock = threading.Lock()  # Transitions arrive from reader and expiry threads
+
+    def add_device(self, device):
+        """Register a MonitoredDevice; it is polled on the next scheduler pass"""
+        if device.rpc_url not in self._connections:
+            self._connections[device.rpc_url] = _ChainConnection(device.rpc_url)
+        device.detector = TransitionDetector(
+            lambda action, user, whitelisted, device=device: self._on_transition(device, action, user, whitelisted),
+            expiry_scheduler=self.expiry_scheduler,
+            warning_lead=EXPIRY_WARNING_LEAD
+        )
+        self.devices.append(device)
+        with self._condition:
+            heapq.heappush(self._schedule, (time.time(), next(self._seq), device))
+            self._condition.notify()
+
+    def run(self):
+        """Run the scheduler loop until stop() is called"""
+        self._running = True
+        print(f"InfraLink daemon monitoring {len(self.devices)} devices on {len(self._connections)} RPC endpoints")
+        next_report = time.time() + RATE_REPORT_INTERVAL
+        while self._running:
+            if time.time() >= next_report:
+                self._report_rate()
+                next_report = time.time() + RATE_REPORT_INTERVAL
+            with self._condition:
+                due = self._pop_due()
+                if not due:
+                    # Wake for the next due device or the next rate report, whichever is first
+                    timeout = next_report - time.time()
+                    if self._schedule:
+                        timeout = min(timeout, self._schedule[0][0] - time.time())
+                    self._condition.wait(max(0.0, timeout))
+                    continue
+
+            # Devices on the same endpoint are read together
+            by_endpoint = {}
+            for device in due:
+                by_endpoint.setdefault(device.rpc_url, []).append(device)
+            for rpc_url, devices in by_endpoint.items():
+                self._read_pool.submit(self._poll_endpoint, self._connections[rpc_url], devices)
+
+    def stop(self):
+        self._running = False
+        with self._condition:
+            self._condition.notify()
+        self._read_pool.shutdown(wait=False)
+        self.expiry_scheduler.stop()
+        self.hooks.shutdown(wait=True)
+        if self.payload_engine is not None:
+            self.payload_engine.shutdown()
+        close_sessions()
+
+    def _pop_due(self):
+        now = time.time()
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            due.append(heapq.heappop(self._schedule)[2])
+        return due
+
+    def _reschedule(self, devices, chain_id=None):
+        now = time.time()
+        with self._condition:
+            for device in devices:
+                heapq.heappush(self._schedule, (now + self._next_interval(device, chain_id), next(self._seq), device))
+            self._condition.notify()
+
+    def _next_interval(self, device, chain_id):
+        if device.idle_interval is None:
+            return device.interval
+        if device.poll_interval is None:
+            if chain_id is None:
+                return device.interval  # Block time unknown until the chain id is
+            device.poll_interval = AdaptivePollInterval(device.interval, block_time=get_block_time(chain_id),
+                                                        idle_interval=device.idle_interval)
+        device.poll_interval.record_call()
+        return device.poll_interval.next_interval(device.snapshot, error=device.last_error is not None)
+
+    def calls_per_minute(self):
+        """Effective status reads per minute across all devices, and what fixed intervals would cost"""
+        actual = sum(d.poll_interval.calls_per_minute() for d in self.devices if d.poll_interval is not None)
+        fixed = sum(60.0 / d.interval for d in self.devices)
+        return actual, fixed
+
+    def _report_rate(self):
+        if not any(device.poll_interval is not None for device in self.devices):
+            return
+        actual, fixed = self.calls_per_minute()
+        print(f"Status reads: {actual:.1f}/min (fixed intervals would be {fixed:.1f}/min)")
+
+    def _poll_endpoint(self, connection, devices):
+        fetched_metadata = {}  # address -> metadata read this pass, saved in one write
+        try:
+            if connection.chain_id is None:
+                connection.chain_id = self.metadata_cache.get_chain_id(connection.w3)
+            self._check_metadata_events(connection, devices)
+            for start in range(0, len(devices), self.batch_size):
+                self._poll_batch(connection, devices[start:start + self.batch_size], fetched_metadata)
+        except Exception as e:
+            for device in devices:
+                self._record_error(device, str(e))
+        finally:
+            self.metadata_cache.put_many(connection.chain_id, fetched_metadata)
+            self._reschedule(devices, connection.chain_id)
+
+    def _check_metadata_events(self, connection, devices):
+        """Drop cached metadata of devices that emitted DeviceInfoUpdated/FeeChanged since the last check"""
+        now = time.time()
+        for device in devices:
+            if connection.next_metadata_check.get(device.address, 0) > now:
+                continue
+            watcher = connection.metadata_watchers.get(device.address)
+            if watcher is None:
+                contract = connection.w3.eth.contract(address=device.address, abi=CONTRACT_ABI)
+                watcher = DeviceEventWatcher(
+                    connection.w3, contract, connection.chain_id, None,
+                    on_metadata_changed=lambda device=device: self._invalidate_metadata(connection, device),
+                    watched_events=INVALIDATING_EVENTS
+                )
+                connection.metadata_watchers[device.address] = watcher
+            try:
+                watcher.poll()
+            except Exception as e:
+                # Retried on the device's next pass; the cached metadata is used until then
+                print(f"[{device.name}] Error checking metadata events: {e}")
+                continue
+            connection.next_metadata_check[device.address] = now + METADATA_CHECK_INTERVAL
+
+    def _invalidate_metadata(self, connection, device):
+        print(f"[{device.name}] Device metadata changed on-chain, refreshing cache")
+        self.metadata_cache.invalidate(connection.chain_id, device.address)
+
+    def _poll_batch(self, connection, devices, fetched_metadata):
+        reader = BatchReader(connection.w3)
+        queued = []
+        for device in devices:
+            metadata = self.metadata_cache.get(connection.chain_id, device.address)
+            state_indexes = queue_state_reads(reader, connection.contract, device.address)
+            metadata_indexes = None
+            if metadata is None:
+                metadata_indexes = queue_metadata_reads(reader, connection.contract, device.address)
+            queued.append((device, metadata, state_indexes, metadata_indexes))
+
+        results = reader.execute(raise_errors=False)
+        fetched_at = time.time()
+
+        for device, metadata, state_indexes, metadata_indexes in queued:
+            indexes = list(state_indexes.values()) + list((metadata_indexes or {}).values())
+            errors = [results[i] for i in indexes if isinstance(results[i], BatchCallError)]
+            if errors:
+                self._record_error(device, str(errors[0]))
+                continue
+
+            state = {field: results[index] for field, index in state_indexes.items()}
+            if metadata_indexes is not None:
+                metadata = collect_metadata(results, metadata_indexes)
+                fetched_metadata[device.address] = metadata
+            elif metadata['token_address'].lower() != state['token_address'].lower():
+                # Token changed; refetch names/decimals on the next pass
+                self.metadata_cache.invalidate(connection.chain_id, device.address)
+
+            device.snapshot = build_snapshot(state, metadata, connection.chain_id, fetched_at)
+            device.last_error = None
+            device.detector.observe_snapshot(device.snapshot)
+
+    def _record_error(self, device, message):
+        if device.last_error != message:
+            print(f"[{device.name}] Error updating status: {message}")
+            device.last_error = message
+
+    def _on_transition(self, device, action, user_address, is_whitelisted):
+        print(f"[{device.name}] Device state change: {action.upper()} (user {user_address})")
+        if device.payload_script == DEFAULT_PAYLOAD_SCRIPT:
+            with self._engine_lock:
+                if self.payload_engine is None:
+                    self.payload_engine = PayloadEngine()
+            if self.payload_engine.available:
+                self.hooks.submit(device.address, self.payload_engine.run, action, user_address, is_whitelisted,
+                                  device_address=device.address)
+                return
+
+        env = {'INFRALINK_DEVICE': device.address, 'INFRALINK_DEVICE_NAME': device.name}
+        self.hooks.submit(device.address, run_payload_script, action, user_address, is_whitelisted,
+                          script_path=device.payload_script, env=env)
+
+
+def load_devices(config_path):
+    """
+    Read a daemon config file
+
+    Returns:
+        list: MonitoredDevice instances
+    """
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    default_interval = config.get('interval', DEFAULT_INTERVAL)
+    default_idle_interval = config.get('idle_interval')
+    devices = []
+    for entry in config['devices']:
+        payload_script = entry.get('payload_script', DEFAULT_PAYLOAD_SCRIPT)
+        if not os.path.isabs(payload_script):
+            payload_script = os.path.join(base_dir, payload_script)
+        # Several endpoints of one chain share a failover connection
+        rpc_url = ",".join(split_rpc_urls(entry.get('rpc_urls') or entry['rpc_url']))
+        devices.append(MonitoredDevice(
+            entry['address'],
+            rpc_url,
+            name=entry.get('name'),
+            payload_script=payload_script,
+            interval=entry.get('interval', default_interval),
+            idle_interval=entry.get('idle_interval', default_idle_interval)
+        ))
+    return devices
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("InfraLink Device Daemon")
+        print("Usage: python device_daemon.py <devices.json>")
+        return
+
+    daemon = DeviceDaemon()
+    for device in load_devices(sys.argv[1]):
+        daemon.add_device(device)
+
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("Stopping daemon...")
+    finally:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+InfraLink device event ingestion
+Pages through DeviceActivated / DeviceDeactivated / FeeChanged logs with
+eth_getLogs and turns them into enable/disable payload calls, exactly once
+per on-chain event. The block cursor is persisted so a restart resumes
+where it left off instead of replaying or missing events.
+"""
+
+import json
+import os
+import threading
+import time
+
+from web3 import Web3
+
+DEFAULT_CURSOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".infralink_cursors.json")
+
+# Events the watcher subscribes to by default
+WATCHED_EVENTS = ('DeviceActivated', 'DeviceDeactivated', 'FeeChanged', 'DeviceInfoUpdated')
+
+_cursor_file_lock = threading.Lock()
+
+
+def event_topic(event_abi):
+    """Return the topic0 hash for an event ABI entry"""
+    arg_types = ",".join(item['type'] for item in event_abi['inputs'])
+    return Web3.to_hex(Web3.keccak(text=f"{event_abi['name']}({arg_types})"))
+
+
+def load_cursor(key, cursor_file=DEFAULT_CURSOR_FILE):
+    """Load the persisted cursor for a watcher key, or None if there isn't one"""
+    with _cursor_file_lock:
+        try:
+            with open(cursor_file, 'r') as f:
+                return json.load(f).get(key)
+        except (OSError, ValueError):
+            return None
+
+
+def save_cursor(key, cursor, cursor_file=DEFAULT_CURSOR_FILE):
+    """Persist the cursor for a watcher key (other keys in the file are preserved)"""
+    with _cursor_file_lock:
+        try:
+            with open(cursor_file, 'r') as f:
+                cursors = json.load(f)
+        except (OSError, ValueError):
+            cursors = {}
+
+        cursors[key] = cursor
+        tmp_file = cursor_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(cursors, f, indent=2)
+        os.replace(tmp_file, cursor_file)
+
+
+class DeviceEventWatcher:
+    """
+    Turns device contract logs into payload transitions
+
+    Every call to poll() fetches logs from the cursor up to the latest block
+    (minus `confirmations`), in pages of at most `max_block_range` blocks.
+    Each log is dispatched once and the cursor (block, log index and the open
+    session) is saved right after, so a crash never replays a handled event.
+    """
+
+    def __init__(self, w3, contract, chain_id, on_transition, on_fee_changed=None,
+                 on_metadata_changed=None, watched_events=WATCHED_EVENTS,
+                 cursor_file=DEFAULT_CURSOR_FILE, max_block_range=1000, confirmations=0,
+                 expiry_scheduler=None):
+        """
+        Args:
+            w3 (Web3): Connected Web3 instance
+            contract: web3 contract bound to CONTRACT_ABI
+            chain_id (int): Chain ID the contract lives on
+            on_transition (callable): Called as on_transition(action, user_address, is_whitelisted)
+            on_fee_changed (callable, optional): Called as on_fee_changed(new_fee, new_whitelist_fee)
+            on_metadata_changed (callable, optional): Called with no arguments after
+                DeviceInfoUpdated or FeeChanged, so cached metadata can be dropped; also
+                on the first run, when there is no cursor to replay missed events from
+            watched_events (tuple): Event names to fetch; a subset gets its own cursor
+            cursor_file (str): JSON file holding persisted cursors
+            max_block_range (int): Largest block span requested per eth_getLogs call
+            confirmations (int): Blocks to stay behind the head to avoid reorged logs
+            expiry_scheduler (SessionExpiryScheduler, optional): Closes open sessions at
+                their endsAt instead of on the next check_expiry() call
+        """
+        self.w3 = w3
+        self.contract = contract
+        self.chain_id = chain_id
+        self.on_transition = on_transition
+        self.on_fee_changed = on_fee_changed
+        self.on_metadata_changed = on_metadata_changed
+        self.cursor_file = cursor_file
+        self.max_block_range = max_block_range
+        self.confirmations = confirmations
+        self.expiry_scheduler = expiry_scheduler
+        self.key = f"events:{chain_id}:{contract.address.lower()}"
+        if tuple(watched_events) != WATCHED_EVENTS:
+            self.key += ":" + ",".join(sorted(watched_events))
+
+        self._events_by_topic = {}
+        for entry in contract.abi:
+            if entry.get('type') == 'event' and entry['name'] in watched_events:
+                self._events_by_topic[event_topic(entry)] = getattr(contract.events, entry['name'])()
+        self._watches_metadata = any(name in watched_events for name in ('DeviceInfoUpdated', 'FeeChanged'))
+
+        # cursor = {'block': n, 'log_index': i, 'session': {...} or None}
+        self.cursor = load_cursor(self.key, self.cursor_file)
+        # Guards the cursor: the expiry scheduler closes sessions from its own thread
+        self._lock = threading.RLock()
+        self._arm_expiry()
+
+    @property
+    def session(self):
+        return self.cursor.get('session') if self.cursor else None
+
+    def _save(self):
+        save_cursor(self.key, self.cursor, self.cursor_file)
+
+    def poll(self):
+        """
+        Fetch and dispatch every new log up to the safe head
+
+        Returns:
+            list: Decoded events that were dispatched, oldest first
+        """
+        poll_range = self.begin_poll(self.w3.eth.block_number)
+        if poll_range is None:
+            return []
+
+        dispatched = []
+        start_block = from_block = poll_range[0]
+        head = poll_range[1]
+        page_size = self.max_block_range
+        while from_block <= head:
+            to_block = min(from_block + page_size - 1, head)
+            try:
+                logs = self.w3.eth.get_logs(self.log_filter(from_block, to_block))
+            except Exception:
+                # Most providers reject oversized ranges; shrink the page and retry
+                if page_size > 1:
+                    page_size = max(1, page_size // 2)
+                    continue
+                raise
+
+            dispatched.extend(self.handle_page(logs, to_block))
+            from_block = to_block + 1
+
+        self.end_poll(start_block)
+        return dispatched
+
+    # The steps of poll(), shared with the asyncio core (which fetches the logs itself)
+
+    def begin_poll(self, block_number):
+        """
+        Start a poll given the chain's latest block number
+
+        Returns:
+            tuple: (first block, last block) to fetch, or None if there is nothing to fetch yet
+        """
+        head = block_number - self.confirmations
+        if head < 0:
+            return None
+
+        if self.cursor is None:
+            # First run: start at the head rather than replaying the contract's history
+            with self._lock:
+                self.cursor = {'block': head + 1, 'log_index': -1, 'session': None}
+                self._save()
+            if self.on_metadata_changed is not None and self._watches_metadata:
+                # Metadata cached by an earlier run may predate DeviceInfoUpdated/FeeChanged
+                # events nobody was watching for; without a cursor to replay from, drop it
+                self.on_metadata_changed()
+            return None
+        return self.cursor['block'], head
+
+    def log_filter(self, from_block, to_block):
+        """eth_getLogs filter for the watched events in [from_block, to_block]"""
+        return {
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': self.contract.address,
+            'topics': [list(self._events_by_topic.keys())]
+        }
+
+    def handle_page(self, logs, to_block):
+        """
+        Dispatch the logs of one fetched block range and advance the cursor past it
+
+        Returns:
+            list: Decoded events that were dispatched, oldest first
+        """
+        dispatched = []
+        logs = sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex']))
+        for log in logs:
+            if (log['blockNumber'], log['logIndex']) <= (self.cursor['block'], self.cursor['log_index']):
+                continue  # Already handled before the last save
+            event = self._events_by_topic[Web3.to_hex(log['topics'][0])].process_log(log)
+            with self._lock:
+                self._dispatch(event)
+                self.cursor['block'] = log['blockNumber']
+                self.cursor['log_index'] = log['logIndex']
+                self._save()
+            dispatched.append(event)
+
+        # Whole range handled: resume from the next block
+        with self._lock:
+            self.cursor['block'] = to_block + 1
+            self.cursor['log_index'] = -1
+        return dispatched
+
+    def end_poll(self, start_block):
+        """Persist the cursor if the poll moved it"""
+        if self.cursor['block'] != start_block:
+            with self._lock:
+                self._save()
+
+    def _dispatch(self, event):
+        """Translate one decoded event into payload transitions"""
+        args = event['args']
+
+        if event['event'] == 'DeviceActivated':
+            # A new activation implies the previous session already ran out
+            self._close_session()
+            self.cursor['session'] = {
+                'user_address': args['user'],
+                'is_whitelisted': args['isWhitelisted'],
+                'ends_at': args['endsAt']
+            }
+            self._arm_expiry()
+            self.on_transition('enable', args['user'], args['isWhitelisted'])
+
+        elif event['event'] == 'DeviceDeactivated':
+            if self.session is not None:
+                self.cursor['session'] = None
+                self._arm_expiry()
+                self.on_transition('disable', args['user'], args['wasWhitelisted'])
+
+        elif event['event'] == 'FeeChanged':
+            if self.on_fee_changed is not None:
+                self.on_fee_changed(args['newFee'], args['newWhitelistFee'])
+            if self.on_metadata_changed is not None:
+                self.on_metadata_changed()
+
+        elif event['event'] == 'DeviceInfoUpdated':
+            if self.on_metadata_changed is not None:
+                self.on_metadata_changed()
+
+    def _arm_expiry(self):
+        session = self.session
+        if self.expiry_scheduler is None:
+            return
+        if session is None:
+            self.expiry_scheduler.cancel(self)
+        else:
+            self.expiry_scheduler.arm(self, session['ends_at'], self.check_expiry)
+
+    def _close_session(self):
+        session = self.session
+        if session is not None:
+            self.cursor['session'] = None
+            self._arm_expiry()
+            self.on_transition('disable', session['user_address'], session['is_whitelisted'])
+
+    def check_expiry(self, now=None):
+        """
+        Disable the device if the open session has run out
+
+        Sessions that simply time out never emit DeviceDeactivated, so the
+        expiry has to be detected locally from the endsAt of the activation.
+
+        Returns:
+            bool: True if a disable transition fired
+        """
+        with self._lock:
+            session = self.session
+            if session is None:
+                return False
+            if now is None:
+                now = time.time()
+            if session['ends_at'] > now:
+                return False
+
+            self._close_session()
+            self._save()
+            return True
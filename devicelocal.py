@@ -1,11 +1,22 @@
+import os
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from web3 import Web3
 import json
-import subprocess
-import os
-from network_utils import get_network_info, format_native_amount, get_currency_symbol
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contract_abis import CONTRACT_ABI, INFO_CONTRACT_ABI
+from payload_runner import PayloadEngine, PayloadClient, run_payload_script
+from monitor_core import (StatusFetcher, TransitionDetector, SessionExpiryScheduler, AdaptivePollInterval,
+                          PollingEngine, FetchError)
+from device_events import DeviceEventWatcher
+from whitelist_sync import WhitelistSync
+from whitelist_view import VirtualTreeview, LazyResolver
+from rpc_batch import BatchReader
+from metadata_cache import get_default_cache, INVALIDATING_EVENTS
+from rpc_pool import get_web3
+from async_core import AsyncMonitorCore
+from network_utils import get_network_info, format_native_amount, format_units, get_currency_symbol, get_block_time
 
 # === CONFIG ===
 # Supported Networks:
@@ -16,373 +27,54 @@ from network_utils import get_network_info, format_native_amount, get_currency_s
 INFURA_URL = "https://testnet.hashio.io/api"  # Hedera testnet by default
 DEVICE_CONTRACT_ADDRESS = "0xaff84326fc701dfb3c5881b2749dba27e9a98978"  # Updated contract address
 INFO_CONTRACT_ADDRESS = "0x7aee0cbbcd0e5257931f7dc87f0345c1bb2aab39"  # Info contract for whitelist logic
-
-# Device Contract ABI - Updated to match actual deployed contract
-CONTRACT_ABI = [
-    {
-        "inputs": [
-            {"internalType": "address", "name": "_token", "type": "address"},
-            {"internalType": "uint256", "name": "_feePerSecond", "type": "uint256"},
-            {"internalType": "uint256", "name": "_whitelistFeePerSecond", "type": "uint256"},
-            {"internalType": "string", "name": "_deviceName", "type": "string"},
-            {"internalType": "string", "name": "_deviceDescription", "type": "string"}
-        ],
-        "stateMutability": "nonpayable",
-        "type": "constructor"
-    },
-    {
-        "anonymous": False,
-        "inputs": [
-            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
-            {"indexed": False, "internalType": "uint256", "name": "duration", "type": "uint256"},
-            {"indexed": False, "internalType": "uint256", "name": "endsAt", "type": "uint256"},
-            {"indexed": False, "internalType": "bool", "name": "isWhitelisted", "type": "bool"},
-            {"indexed": False, "internalType": "uint256", "name": "paidAmount", "type": "uint256"}
-        ],
-        "name": "DeviceActivated",
-        "type": "event"
-    },
-    {
-        "anonymous": False,
-        "inputs": [
-            {"indexed": True, "internalType": "address", "name": "user", "type": "address"},
-            {"indexed": False, "internalType": "bool", "name": "wasWhitelisted", "type": "bool"}
-        ],
-        "name": "DeviceDeactivated",
-        "type": "event"
-    },
-    {
-        "anonymous": False,
-        "inputs": [
-            {"indexed": False, "internalType": "string", "name": "name", "type": "string"},
-            {"indexed": False, "internalType": "string", "name": "description", "type": "string"}
-        ],
-        "name": "DeviceInfoUpdated",
-        "type": "event"
-    },
-    {
-        "anonymous": False,
-        "inputs": [
-            {"indexed": False, "internalType": "uint256", "name": "newFee", "type": "uint256"},
-            {"indexed": False, "internalType": "uint256", "name": "newWhitelistFee", "type": "uint256"}
-        ],
-        "name": "FeeChanged",
-        "type": "event"
-    },
-    {
-        "inputs": [
-            {"internalType": "uint256", "name": "secondsToActivate", "type": "uint256"}
-        ],
-        "name": "activate",
-        "outputs": [],
-        "stateMutability": "payable",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "deactivate",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "deviceDescription",
-        "outputs": [
-            {"internalType": "string", "name": "", "type": "string"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "deviceName",
-        "outputs": [
-            {"internalType": "string", "name": "", "type": "string"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "feePerSecond",
-        "outputs": [
-            {"internalType": "uint256", "name": "", "type": "uint256"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "forceDeactivate",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "getDeviceDetails",
-        "outputs": [
-            {"internalType": "string", "name": "_deviceName", "type": "string"},
-            {"internalType": "string", "name": "_deviceDescription", "type": "string"},
-            {"internalType": "bool", "name": "_useNativeToken", "type": "bool"},
-            {"internalType": "bool", "name": "_lastUserWasWhitelisted", "type": "bool"},
-            {"internalType": "uint256", "name": "_whitelistFeePerSecond", "type": "uint256"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [
-            {"internalType": "address", "name": "user", "type": "address"}
-        ],
-        "name": "getDeviceInfo",
-        "outputs": [
-            {"internalType": "uint256", "name": "_feePerSecond", "type": "uint256"},
-            {"internalType": "bool", "name": "_isActive", "type": "bool"},
-            {"internalType": "address", "name": "_lastActivatedBy", "type": "address"},
-            {"internalType": "uint256", "name": "_sessionEndsAt", "type": "uint256"},
-            {"internalType": "address", "name": "_token", "type": "address"},
-            {"internalType": "bool", "name": "_isWhitelisted", "type": "bool"},
-            {"internalType": "uint256", "name": "_timeRemaining", "type": "uint256"},
-            {"internalType": "string", "name": "_tokenName", "type": "string"},
-            {"internalType": "string", "name": "_tokenSymbol", "type": "string"},
-            {"internalType": "uint8", "name": "_tokenDecimals", "type": "uint8"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-
-
-    {
-        "inputs": [],
-        "name": "isActive",
-        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "lastActivatedBy",
-        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "lastUserWasWhitelisted",
-        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "owner",
-        "outputs": [
-            {"internalType": "address", "name": "", "type": "address"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "sessionEndsAt",
-        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [
-            {"internalType": "string", "name": "_name", "type": "string"},
-            {"internalType": "string", "name": "_description", "type": "string"}
-        ],
-        "name": "setDeviceInfo",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },
-    {
-        "inputs": [
-            {"internalType": "uint256", "name": "_fee", "type": "uint256"},
-            {"internalType": "uint256", "name": "_whitelistFee", "type": "uint256"}
-        ],
-        "name": "setFee",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },
-    {
-        "inputs": [
-            {"internalType": "address", "name": "_token", "type": "address"}
-        ],
-        "name": "setToken",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },
-
-
-    {
-        "inputs": [],
-        "name": "token",
-        "outputs": [
-            {"internalType": "address", "name": "", "type": "address"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "tokenDecimals",
-        "outputs": [
-            {"internalType": "uint8", "name": "", "type": "uint8"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "tokenName",
-        "outputs": [
-            {"internalType": "string", "name": "", "type": "string"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "tokenSymbol",
-        "outputs": [
-            {"internalType": "string", "name": "", "type": "string"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [
-            {"internalType": "address", "name": "newOwner", "type": "address"}
-        ],
-        "name": "transferOwnership",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "useNativeToken",
-        "outputs": [
-            {"internalType": "bool", "name": "", "type": "bool"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-
-
-
-    {
-        "inputs": [],
-        "name": "whitelistFeePerSecond",
-        "outputs": [
-            {"internalType": "uint256", "name": "", "type": "uint256"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-
-    {
-        "inputs": [],
-        "name": "withdrawFees",
-        "outputs": [],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    }
-]
-
-# Info Contract ABI for whitelist functionality - Updated to match actual deployed contract
-INFO_CONTRACT_ABI = [
-    {
-        "inputs": [
-            {"internalType": "address", "name": "user", "type": "address"},
-            {"internalType": "address", "name": "deviceContract", "type": "address"}
-        ],
-        "name": "getWhitelistInfo",
-        "outputs": [
-            {"internalType": "string", "name": "whitelistName", "type": "string"},
-            {"internalType": "uint256", "name": "feePerSecond", "type": "uint256"},
-            {"internalType": "bool", "name": "isFree", "type": "bool"},
-            {"internalType": "uint256", "name": "addedAt", "type": "uint256"},
-            {"internalType": "address", "name": "addedBy", "type": "address"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [
-            {"internalType": "address", "name": "user", "type": "address"},
-            {"internalType": "address", "name": "deviceContract", "type": "address"}
-        ],
-        "name": "isUserWhitelisted",
-        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [{"internalType": "address", "name": "user", "type": "address"}],
-        "name": "getUserWhitelists",
-        "outputs": [
-            {"internalType": "address[]", "name": "deviceContracts", "type": "address[]"},
-            {"internalType": "string[]", "name": "deviceNames", "type": "string[]"},
-            {"internalType": "string[]", "name": "whitelistNames", "type": "string[]"},
-            {"internalType": "uint256[]", "name": "feePerSeconds", "type": "uint256[]"},
-            {"internalType": "bool[]", "name": "isFreeAccess", "type": "bool[]"},
-            {"internalType": "uint256[]", "name": "addedAts", "type": "uint256[]"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [{"internalType": "address", "name": "user", "type": "address"}],
-        "name": "getUserProfile",
-        "outputs": [
-            {"internalType": "string", "name": "name", "type": "string"},
-            {"internalType": "string", "name": "bio", "type": "string"},
-            {"internalType": "string", "name": "email", "type": "string"},
-            {"internalType": "string", "name": "avatar", "type": "string"},
-            {"internalType": "bool", "name": "exists", "type": "bool"},
-            {"internalType": "uint256", "name": "createdAt", "type": "uint256"},
-            {"internalType": "uint256", "name": "updatedAt", "type": "uint256"}
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "getAllRegisteredUsers",
-        "outputs": [{"internalType": "address[]", "name": "", "type": "address[]"}],
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "getAllRegisteredDevices",
-        "outputs": [{"internalType": "address[]", "name": "", "type": "address[]"}],
-        "stateMutability": "view",
-        "type": "function"
-    }
-]
+INFO_CONTRACT_DEPLOYMENT_BLOCK = 0  # Block it was deployed in; the first whitelist sync scans its logs from here
+EVENT_MODE = False  # Detect enable/disable from contract logs (eth_getLogs) instead of state polling
+RECONCILE_INTERVAL = 60  # Seconds between full state reads in event mode
+ASYNC_CORE = False  # Read status on the shared asyncio core (AsyncWeb3) instead of a fetcher thread
+ADAPTIVE_POLLING = True  # Poll slower while idle and around session ends, instead of every interval
+IDLE_POLL_INTERVAL = 30  # Longest gap between polls while no session is active (seconds)
+EXPIRY_WARNING_LEAD = 60  # Seconds before a session ends to run the expiry_warning hook (0: never)
+# How payload hooks run:
+# - "inprocess": devicepayload imported into this process (falls back to "subprocess")
+# - "server": sent to a running `python devicepayload.py serve` (falls back to "subprocess")
+# - "subprocess": a new `python devicepayload.py` process per transition
+PAYLOAD_MODE = "inprocess"
 
 class DeviceMonitor:
     def __init__(self):
         self.w3 = None
         self.contract = None
         self.info_contract = None  # Info contract for whitelist logic
+        self.whitelist_sync = None  # Local registry mirror, kept current from Info contract events
+        self.whitelist_resolver = LazyResolver(self.fetch_user_details)  # Details for visible rows only
+        self.resolver_job = None
+        self.whitelist_filter_job = None
+        self.whitelist_filter = None  # Filter the whitelist view currently shows
+        self.whitelist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whitelist-sync")
+        self.whitelist_results = queue.Queue()  # (sync, changes, error) posted by the sync thread
+        self.whitelist_job = None
         self.root = tk.Tk()
         self.setup_ui()
+        self.payload_backend = self.create_payload_backend()
+        # Runs hooks in order when there is no backend; callers are fetcher/event threads
+        self.payload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payload")
         self.last_error = None
         self.update_interval = 10000  # 10 seconds for demo, 60000 for production
         self.device_info = {}
         self.whitelist_info = {}
-        self.last_device_state = None  # Track device state changes
+        self.chain_id = None
+        self.metadata_cache = get_default_cache()  # Device names/token details, persisted across restarts
+        self.snapshot_queue = queue.Queue()  # Snapshots posted by the fetcher thread
+        self.polling = PollingEngine()  # Owns the fetcher thread; never more than one per device
+        self.async_core = None  # Started on first use when ASYNC_CORE is set
+        self.poll_interval = None  # AdaptivePollInterval of the running poller
+        self.transition_detector = None
+        self.transition_device = None  # Contract address the transition detector has been watching
+        self.expiry_scheduler = SessionExpiryScheduler()  # Disables the device right at sessionEndsAt
+        self.drain_interval = 200  # How often the UI checks for new snapshots (ms)
+        self.drain_job = None
+        self.current_snapshot = None
+        self.last_render_second = None
         
     def setup_ui(self):
         self.root.title("InfraLink Device Monitor")
@@ -478,34 +170,35 @@ class DeviceMonitor:
         details_frame = ttk.LabelFrame(parent, text="Registered Users", padding="10")
         details_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         
-        # Create treeview for whitelist
-        columns = ('Address', 'Name')
-        self.whitelist_tree = ttk.Treeview(details_frame, columns=columns, show='headings', height=10)
-        
-        # Define headings
-        self.whitelist_tree.heading('Address', text='Address')
-        self.whitelist_tree.heading('Name', text='Name')
-        
-        # Define column widths
-        self.whitelist_tree.column('Address', width=300)
-        self.whitelist_tree.column('Name', width=200)
-        
-        # Scrollbar for treeview
-        scrollbar = ttk.Scrollbar(details_frame, orient=tk.VERTICAL, command=self.whitelist_tree.yview)
-        self.whitelist_tree.configure(yscrollcommand=scrollbar.set)
-        
-        # Pack treeview and scrollbar
-        self.whitelist_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        # Search/filter, answered from the local whitelist index
+        filter_frame = ttk.Frame(details_frame)
+        filter_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Label(filter_frame, text="Search:").pack(side=tk.LEFT)
+        self.whitelist_search_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.whitelist_search_var, width=30).pack(side=tk.LEFT, padx=5)
+        self.whitelisted_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Whitelisted on this device only", variable=self.whitelisted_only_var,
+                        command=self.update_whitelist_view).pack(side=tk.LEFT, padx=5)
+        self.whitelist_search_var.trace_add('write', lambda *args: self.schedule_whitelist_filter())
+        
+        # Virtualized treeview: only the visible rows exist as Treeview items
+        self.whitelist_view = VirtualTreeview(
+            details_frame,
+            ('Address', 'Name', 'Whitelist'),
+            self.whitelist_row_values,
+            widths={'Address': 300, 'Name': 200, 'Whitelist': 200},
+            on_visible=self.resolve_visible_users
+        )
+        self.whitelist_view.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Configure grid weights for whitelist tab
         parent.rowconfigure(1, weight=1)
         parent.columnconfigure(0, weight=1)
-        details_frame.rowconfigure(0, weight=1)
+        details_frame.rowconfigure(1, weight=1)
         details_frame.columnconfigure(0, weight=1)
         
         # Refresh button
-        ttk.Button(details_frame, text="Refresh Users", command=self.refresh_whitelist).grid(row=1, column=0, pady=10)
+        ttk.Button(details_frame, text="Refresh Users", command=self.refresh_whitelist).grid(row=2, column=0, pady=10)
         
     def setup_config_tab(self, parent):
         # Connection Frame
@@ -519,7 +212,7 @@ class DeviceMonitor:
         self.address_entry.insert(0, DEVICE_CONTRACT_ADDRESS)
         
         # RPC URL entry
-        ttk.Label(conn_frame, text="RPC URL:").grid(row=1, column=0, sticky=tk.W)
+        ttk.Label(conn_frame, text="RPC URL(s):").grid(row=1, column=0, sticky=tk.W)  # comma-separated for failover
         self.rpc_entry = ttk.Entry(conn_frame, width=60)
         self.rpc_entry.grid(row=1, column=1, padx=5)
         self.rpc_entry.insert(0, INFURA_URL)
@@ -548,41 +241,30 @@ class DeviceMonitor:
         interval_entry = ttk.Entry(control_frame, textvariable=self.interval_var, width=10)
         interval_entry.grid(row=1, column=1, padx=5, pady=(10, 0))
         
+        # Event-driven mode
+        self.event_mode_var = tk.BooleanVar(value=EVENT_MODE)
+        ttk.Checkbutton(control_frame, text="Event-driven mode (read contract logs)",
+                        variable=self.event_mode_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
         # Configure grid weights
         conn_frame.columnconfigure(1, weight=1)
         
     def call_device_payload(self, action, user_address=None, is_whitelisted=False):
-        """Call the devicepayload.py script for device control"""
-        try:
-            script_path = os.path.join(os.path.dirname(__file__), "devicepayload.py")
-            if not os.path.exists(script_path):
-                print(f"Warning: devicepayload.py not found at {script_path}")
-                return False
-                
-            cmd = ["python", script_path, action]
-            if user_address:
-                cmd.append(user_address)
-                cmd.append(str(is_whitelisted).lower())
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                print(f"Device payload {action} executed successfully")
-                if result.stdout:
-                    print(f"Output: {result.stdout.strip()}")
-                return True
-            else:
-                print(f"Device payload {action} failed")
-                if result.stderr:
-                    print(f"Error: {result.stderr.strip()}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print(f"Device payload {action} timed out")
-            return False
-        except Exception as e:
-            print(f"Error calling device payload {action}: {e}")
-            return False
+        """Run the devicepayload.py hooks for device control (in-process when possible)"""
+        device_address = self.contract.address if self.contract is not None else None
+        if self.payload_backend is not None:
+            return self.payload_backend.submit(action, user_address, is_whitelisted, device_address)
+        env = {'INFRALINK_DEVICE': device_address} if device_address else None
+        return self.payload_executor.submit(run_payload_script, action, user_address, is_whitelisted, env=env)
+        
+    def create_payload_backend(self):
+        """Build the payload backend for PAYLOAD_MODE (None means one subprocess per call)"""
+        if PAYLOAD_MODE == "server":
+            return PayloadClient()
+        if PAYLOAD_MODE == "inprocess":
+            engine = PayloadEngine()  # Imports devicepayload and warms up the mixer once
+            return engine if engine.available else None
+        return None
         
     def connect_to_contract(self):
         try:
@@ -594,7 +276,8 @@ class DeviceMonitor:
                 return
                 
             # Initialize Web3
-            self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+            # Pooled session: reconnects reuse warm connections; several comma-separated URLs fail over
+            self.w3 = get_web3(rpc_url)
             
             if not self.w3.is_connected():
                 raise Exception("Failed to connect to RPC node")
@@ -605,9 +288,22 @@ class DeviceMonitor:
                 
             # Initialize contract
             self.contract = self.w3.eth.contract(address=contract_address, abi=CONTRACT_ABI)
+            # Payload hooks (in-process or subprocess) look up whitelist entries for this device
+            os.environ['INFRALINK_DEVICE'] = self.contract.address
             
-            # Test device contract call
-            owner = self.contract.functions.owner().call()
+            # Chain id is cached per RPC URL; on a cold cache it rides along with the owner() probe
+            reader = BatchReader(self.w3)
+            owner_index = reader.add(self.contract, 'owner')
+            cached_chain_id = self.metadata_cache.get_cached_chain_id(self.w3)
+            if cached_chain_id is None:
+                chain_index = reader.add_request('eth_chainId', formatter=lambda value: int(value, 16))
+            results = reader.execute()
+            owner = results[owner_index]
+            if cached_chain_id is None:
+                self.chain_id = results[chain_index]
+                self.metadata_cache.put_chain_id(self.w3, self.chain_id)
+            else:
+                self.chain_id = cached_chain_id
             
             # Try to initialize Info contract for whitelist functionality
             try:
@@ -621,6 +317,9 @@ class DeviceMonitor:
                     if code == '0x':
                         raise Exception("Info contract not deployed at this address")
                     print("Info contract found and connected successfully")
+                    self.whitelist_sync = WhitelistSync(self.w3, self.info_contract, self.chain_id,
+                                                        deployment_block=INFO_CONTRACT_DEPLOYMENT_BLOCK)
+                    self.whitelist_resolver.clear()
                 except Exception as test_error:
                     raise Exception(f"Info contract test failed: {test_error}")
                 
@@ -628,6 +327,7 @@ class DeviceMonitor:
                 print(f"Info contract connection failed: {info_error}")
                 print("Info contract unavailable - whitelist functionality will be disabled")
                 self.info_contract = None
+                self.whitelist_sync = None
                 
             self.status_bar.config(text=f"Connected to contract. Owner: {owner[:10]}...")
             if self.info_contract:
@@ -643,83 +343,110 @@ class DeviceMonitor:
             messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
             print(f"Connection error: {e}")
             
-    def start_monitoring(self):
-        self.update_status()
-        
-    def update_status(self):
+    @property
+    def fetcher(self):
+        """The running StatusFetcher for the connected device, or None"""
+        if self.contract is None:
+            return None
+        return self.polling.get(self.contract.address)
+    
+    def is_monitoring(self):
+        """True while a fetcher thread or an async core watch is polling"""
+        return bool(len(self.polling) or (self.async_core is not None and self.async_core.active_watches()))
+    
+    def active_pollers(self):
+        """Live pollers of either kind; more than one means a duplicate loop"""
+        count = self.polling.active_pollers()
+        if self.async_core is not None:
+            count += self.async_core.active_watches()
+        return count
+    
+    def drain_snapshots(self):
+        """Render the newest snapshot posted by the fetcher thread (runs on the Tk thread)"""
+        latest = None
+        try:
+            while True:
+                latest = self.snapshot_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        if isinstance(latest, FetchError):
+            self.current_snapshot = None
+            error_msg = f"Error updating status: {latest.message}"
+            self.status_bar.config(text=error_msg)
+            if self.last_error != latest.message:
+                print(f"Error: {latest.message}")
+                self.last_error = latest.message
+        elif latest is not None:
+            self.current_snapshot = latest
+            self.render_snapshot(latest)
+        elif self.current_snapshot is not None and int(time.time()) != self.last_render_second:
+            # Snapshots can be a minute apart in event mode; keep the countdown ticking
+            self.render_snapshot(self.current_snapshot)
+
+        if self.is_monitoring():
+            self.drain_job = self.root.after(self.drain_interval, self.drain_snapshots)
+        else:
+            self.drain_job = None
+
+    def on_device_transition(self, action, user_address, is_whitelisted):
+        """Called from the fetcher or expiry thread when the device is enabled or disabled, or a session nears its end"""
+        if action == 'enable':
+            print(f"Device state change: ENABLED by {user_address}")
+        elif action == 'expiry_warning':
+            print(f"Session of {user_address} ends in {EXPIRY_WARNING_LEAD}s")
+        else:
+            print(f"Device state change: DISABLED (user {user_address})")
+        self.call_device_payload(action, user_address, is_whitelisted)
+
+    def invalidate_metadata(self):
+        """Drop cached device metadata after a DeviceInfoUpdated/FeeChanged event"""
+        print("Device metadata changed on-chain, refreshing cache")
+        self.metadata_cache.invalidate(self.chain_id, self.contract.address)
+
+    def render_snapshot(self, snapshot):
+        """Update every status label from a DeviceSnapshot; makes no RPC calls"""
         try:
-            if not self.contract:
-                return
-                
-            # Get device info with zero address to get general info
-            zero_address = "0x0000000000000000000000000000000000000000"
-            device_info = self.contract.functions.getDeviceInfo(zero_address).call()
-            
-            # Parse the device info response (10 values from getDeviceInfo)
-            fee_per_second = device_info[0]
-            is_active = device_info[1]
-            last_activated_by = device_info[2]
-            session_ends_at = device_info[3]
-            token_address = device_info[4]
-            is_whitelisted = device_info[5]
-            time_remaining = device_info[6]
-            token_name = device_info[7]
-            token_symbol = device_info[8]
-            token_decimals = device_info[9]
-            
-            # Get additional device details separately
-            device_details = self.contract.functions.getDeviceDetails().call()
-            device_name = device_details[0]
-            device_description = device_details[1]
-            use_native_token = device_details[2]
-            last_user_was_whitelisted = device_details[3]
-            whitelist_fee_per_second = device_details[4]
-            
             # Store device info for other uses
             self.device_info = {
-                'device_name': device_name,
-                'device_description': device_description,
-                'token_name': token_name,
-                'token_symbol': token_symbol,
-                'token_decimals': token_decimals,
-                'token_address': token_address,
-                'fee_per_second': fee_per_second,
-                'last_user_was_whitelisted': last_user_was_whitelisted,
-                'use_native_token': use_native_token
+                'device_name': snapshot.device_name,
+                'device_description': snapshot.device_description,
+                'token_name': snapshot.token_name,
+                'token_symbol': snapshot.token_symbol,
+                'token_decimals': snapshot.token_decimals,
+                'token_address': snapshot.token_address,
+                'fee_per_second': snapshot.fee_per_second,
+                'last_user_was_whitelisted': snapshot.last_user_was_whitelisted,
+                'use_native_token': snapshot.use_native_token
             }
             
-            # Get regular and whitelist fees
-            regular_fee = self.contract.functions.feePerSecond().call()
-            whitelist_fee = whitelist_fee_per_second  # Use the value from getDeviceDetails
+            token_symbol = snapshot.token_symbol
+            token_decimals = snapshot.token_decimals
+            regular_fee = snapshot.fee_per_second
+            whitelist_fee = snapshot.whitelist_fee_per_second
+            last_user_was_whitelisted = snapshot.last_user_was_whitelisted
+            session_ends_at = snapshot.session_ends_at
+            time_remaining = snapshot.time_remaining
             
             current_time = int(time.time())
             
             # Update device info labels
-            self.device_name_label.config(text=f"Device: {device_name}")
-            self.device_desc_label.config(text=f"Description: {device_description}")
+            self.device_name_label.config(text=f"Device: {snapshot.device_name}")
+            self.device_desc_label.config(text=f"Description: {snapshot.device_description}")
             
-            if use_native_token:
+            if snapshot.use_native_token:
                 # Get network-aware native token name
-                try:
-                    chain_id = self.w3.eth.chain_id
-                    network_info = get_network_info(chain_id)
-                    native_currency = network_info['currency']
-                    self.token_info_label.config(text=f"Payment Token: Native Token ({native_currency})")
-                except:
-                    self.token_info_label.config(text=f"Payment Token: Native Token ({token_symbol})")
+                native_currency = get_network_info(snapshot.chain_id)['currency']
+                self.token_info_label.config(text=f"Payment Token: Native Token ({native_currency})")
             else:
-                self.token_info_label.config(text=f"Payment Token: {token_name} ({token_symbol})")
+                self.token_info_label.config(text=f"Payment Token: {snapshot.token_name} ({token_symbol})")
             
             # Update fee info
             regular_fee_formatted = self.format_token_amount(regular_fee, token_decimals)
             whitelist_fee_formatted = self.format_token_amount(whitelist_fee, token_decimals)
             
             # Get network-aware currency symbol
-            try:
-                chain_id = self.w3.eth.chain_id
-                token_display = get_currency_symbol(chain_id, token_symbol if use_native_token else token_symbol)
-            except:
-                token_display = "HBAR" if use_native_token else token_symbol
+            token_display = get_currency_symbol(snapshot.chain_id, token_symbol)
             
             self.regular_fee_label.config(text=f"Regular Fee: {regular_fee_formatted} {token_display}/sec")
             
@@ -728,36 +455,17 @@ class DeviceMonitor:
             else:
                 self.whitelist_fee_label.config(text=f"Whitelist Fee: {whitelist_fee_formatted} {token_display}/sec")
             
-            # Update UI and detect state changes
-            current_state = {
-                'is_active': is_active and session_ends_at > current_time,
-                'user_address': last_activated_by,
-                'is_whitelisted': last_user_was_whitelisted
-            }
-            
-            # Check for state changes and trigger payload actions
-            if self.last_device_state is not None:
-                # Device enabled (inactive -> active)
-                if not self.last_device_state['is_active'] and current_state['is_active']:
-                    print(f"Device state change: ENABLED by {current_state['user_address']}")
-                    self.call_device_payload('enable', current_state['user_address'], current_state['is_whitelisted'])
-                
-                # Device disabled (active -> inactive)
-                elif self.last_device_state['is_active'] and not current_state['is_active']:
-                    print(f"Device state change: DISABLED (user {self.last_device_state['user_address']})")
-                    self.call_device_payload('disable', self.last_device_state['user_address'], self.last_device_state['is_whitelisted'])
-            
-            # Store current state for next comparison
-            self.last_device_state = current_state
-                
             # Update UI
-            if current_state['is_active']:
+            if snapshot.is_active and session_ends_at > current_time:
                 self.status_label.config(text="🟢 ONLINE", foreground="green")
-                self.user_label.config(text=f"Active user: {last_activated_by[:10]}...")
+                self.user_label.config(text=f"Active user: {snapshot.last_activated_by[:10]}...")
                 
                 # Show whitelist status of current user
                 if last_user_was_whitelisted:
-                    self.whitelist_status_label.config(text="✅ Current user is whitelisted", foreground="green")
+                    entry = self.get_whitelist_info(snapshot.last_activated_by)
+                    list_name = f" ({entry['whitelist_name']})" if entry and entry['whitelist_name'] else ""
+                    self.whitelist_status_label.config(text=f"✅ Current user is whitelisted{list_name}",
+                                                       foreground="green")
                 else:
                     self.whitelist_status_label.config(text="Regular user (not whitelisted)", foreground="blue")
                 
@@ -790,7 +498,14 @@ class DeviceMonitor:
                 self.progress['value'] = 0
                 self.fee_label.config(text=f"Regular rate: {regular_fee_formatted} {token_display}/sec")
                 
-            self.status_bar.config(text=f"Last updated: {time.strftime('%H:%M:%S')}")
+            self.last_render_second = current_time
+            fetched = time.strftime('%H:%M:%S', time.localtime(snapshot.fetched_at))
+            status_text = f"Last updated: {fetched} | pollers: {self.active_pollers()}"
+            poll_interval = self.poll_interval
+            if poll_interval is not None and poll_interval.calls_per_minute() > 0:
+                status_text += (f" | {poll_interval.calls_per_minute():.1f} reads/min"
+                                f" (fixed interval: {poll_interval.fixed_calls_per_minute():.1f})")
+            self.status_bar.config(text=status_text)
             self.last_error = None
             
         except Exception as e:
@@ -799,76 +514,177 @@ class DeviceMonitor:
             if self.last_error != str(e):
                 print(f"Error: {e}")
                 self.last_error = str(e)
-            
-        # Schedule next update
-        self.root.after(self.update_interval, self.update_status)
         
     def format_token_amount(self, amount, decimals):
-        """Format token amount with proper decimal places using network-aware formatting"""
-        if amount == 0:
-            return "0"
-        
-        # Use network utilities if we have chain info
-        if hasattr(self, 'w3') and self.w3 and self.w3.is_connected():
-            try:
-                chain_id = self.w3.eth.chain_id
-                return format_native_amount(amount, chain_id, decimals)
-            except:
-                pass  # Fall back to manual formatting
-        
-        # Fallback to manual formatting
-        decimal_amount = amount / (10 ** decimals)
-        
-        # Format with appropriate decimal places
-        if decimal_amount >= 1:
-            return f"{decimal_amount:.6f}"
-        else:
-            return f"{decimal_amount:.8f}"
+        """Format token amount with proper decimal places using network-aware formatting (exact, memoized)"""
+        # Use network utilities if we know the chain (resolved once at connect time)
+        if self.chain_id is not None:
+            return format_native_amount(amount, self.chain_id, decimals)
+        return format_units(amount, decimals)
+    
+    def get_whitelist_info(self, user_address, device_address=None):
+        """
+        Whitelist entry of a user on a device (default: the connected one), from the local index
+
+        Returns:
+            dict: {'whitelist_name', 'fee_per_second', 'is_free'}, or None if not
+                whitelisted or the Info contract is unavailable
+        """
+        if self.whitelist_sync is None or not user_address:
+            return None
+        device_address = device_address or (self.contract.address if self.contract else None)
+        if device_address is None:
+            return None
+        return self.whitelist_sync.index.get_whitelist_info(user_address, device_address)
     
     def refresh_whitelist(self):
-        """Refresh the whitelist information using Info contract only"""
+        """Refresh the whitelist information using Info contract only (the sync runs off the Tk thread)"""
+        if not self.info_contract or self.whitelist_sync is None:
+            messagebox.showerror("Error", "Info contract not available")
+            return
+        if self.whitelist_job is not None:
+            return  # A sync is already running; its result refreshes the view
+        if not self.whitelist_sync.synced:
+            self.whitelist_count_label.config(text="Total Registered Users: syncing...")
+        self.whitelist_executor.submit(self.sync_whitelist, self.whitelist_sync)
+        self.whitelist_job = self.root.after(100, self.drain_whitelist_sync)
+    
+    def sync_whitelist(self, whitelist_sync):
+        """Bring the local registry up to date (runs on the whitelist sync thread)"""
         try:
-            if not self.info_contract:
-                messagebox.showerror("Error", "Info contract not available")
-                return
-                
-            print("Attempting to query Info contract...")
-            # Get all registered users from Info contract
-            all_users = self.info_contract.functions.getAllRegisteredUsers().call()
-            print(f"Info contract returned {len(all_users)} registered users")
-            
-            # Update whitelist count
-            self.whitelist_count_label.config(text=f"Total Registered Users: {len(all_users)}")
-            
-            # Clear existing items
-            for item in self.whitelist_tree.get_children():
-                self.whitelist_tree.delete(item)
-            
-            # Add user entries
-            for address in all_users:
-                self.whitelist_tree.insert('', tk.END, values=(address, "Registered User"))
-            
-            # Store basic info
-            self.whitelist_info = {
-                'addresses': all_users,
-                'names': ["Registered User"] * len(all_users),
-                'count': len(all_users)
-            }
-            print("Info contract query successful")
-                
+            # Only logs since the last refresh are fetched; the first start takes one snapshot
+            self.whitelist_results.put((whitelist_sync, whitelist_sync.poll(), None))
         except Exception as e:
-            print(f"Info contract whitelist query failed: {e}")
-            messagebox.showerror("Error", f"Failed to refresh whitelist: {str(e)}")
+            self.whitelist_results.put((whitelist_sync, None, e))
+    
+    def drain_whitelist_sync(self):
+        """Show the result of a finished whitelist sync (runs on the Tk thread)"""
+        try:
+            whitelist_sync, changes, error = self.whitelist_results.get_nowait()
+        except queue.Empty:
+            self.whitelist_job = self.root.after(100, self.drain_whitelist_sync)
+            return
+        self.whitelist_job = None
+        if whitelist_sync is not self.whitelist_sync:
+            # Reconnected while it ran; sync the new registry instead
+            if self.whitelist_sync is not None:
+                self.refresh_whitelist()
+            return
+        
+        if error is not None:
+            print(f"Info contract whitelist query failed: {error}")
+            messagebox.showerror("Error", f"Failed to refresh whitelist: {str(error)}")
             # Show empty whitelist on failure
             self.whitelist_count_label.config(text="Total Registered Users: 0 (Unable to fetch)")
-            for item in self.whitelist_tree.get_children():
-                self.whitelist_tree.delete(item)
-            self.whitelist_info = {'addresses': [], 'names': [], 'count': 0}
+            self.whitelist_view.set_keys([])
+            self.whitelist_info = {'addresses': [], 'count': 0}
+            return
+        if changes:
+            print(f"Whitelist sync applied {len(changes)} registry changes")
+        self.update_whitelist_view()
+    
+    def update_whitelist_view(self):
+        """Re-run the search over the local index and update the visible rows by diff (no RPC)"""
+        self.whitelist_filter_job = None
+        if self.whitelist_sync is None:
+            self.whitelist_view.set_keys([])
+            return
+        index = self.whitelist_sync.index
+        device = self.contract.address if self.contract else None
+        query = self.whitelist_search_var.get()
+        whitelist_filter = (query.strip().lower(), device, self.whitelisted_only_var.get())
+        users = index.search(query, device=device, whitelisted_only=whitelist_filter[2])
+        # A new filter starts at the top; a sync refresh keeps the scroll position
+        self.whitelist_view.set_keys(users, force=True, to_top=whitelist_filter != self.whitelist_filter)
+        self.whitelist_filter = whitelist_filter
+        
+        registered = len(index.registered_users())
+        if query.strip() or self.whitelisted_only_var.get():
+            self.whitelist_count_label.config(text=f"Total Registered Users: {registered} ({len(users)} matching)")
+        else:
+            self.whitelist_count_label.config(text=f"Total Registered Users: {registered}")
+        self.whitelist_info = {'addresses': users, 'count': len(users)}
+    
+    def schedule_whitelist_filter(self):
+        """Debounce typing in the search box"""
+        if self.whitelist_filter_job is not None:
+            self.root.after_cancel(self.whitelist_filter_job)
+        self.whitelist_filter_job = self.root.after(250, self.update_whitelist_view)
+    
+    def whitelist_row_values(self, user):
+        """Column values for one whitelist row, from the local index or lazily fetched details"""
+        address = self.w3.to_checksum_address(user) if self.w3 else user
+        details = self.whitelist_resolver.get(user) or {}
+        profile = self.whitelist_sync.index.get_profile(user) if self.whitelist_sync else None
+        if profile is not None:
+            name = profile['name'] or "Registered User"
+        elif details:
+            name = details['name'] or "(no profile)"
+        else:
+            name = "..."
+        
+        entry = self.get_whitelist_info(user) or details.get('whitelist')
+        if entry is None:
+            whitelist = "-"
+        elif entry['is_free']:
+            whitelist = f"{entry['whitelist_name']} (free)"
+        elif self.device_info.get('token_decimals') is not None:
+            fee = self.format_token_amount(entry['fee_per_second'], self.device_info['token_decimals'])
+            whitelist = f"{entry['whitelist_name']} ({fee}/sec)"
+        else:
+            whitelist = f"{entry['whitelist_name']} ({entry['fee_per_second']} base units/sec)"
+        return (address, name, whitelist)
+    
+    def resolve_visible_users(self, users):
+        """Fetch profiles the local index lacks, for on-screen rows only"""
+        if self.whitelist_sync is None:
+            return
+        missing = [user for user in users if self.whitelist_sync.index.get_profile(user) is None]
+        if not missing:
+            return
+        self.whitelist_resolver.request(missing)
+        if self.resolver_job is None:
+            self.resolver_job = self.root.after(100, self.drain_resolver)
+    
+    def drain_resolver(self):
+        """Show lazily fetched row details as they arrive (runs on the Tk thread)"""
+        arrived = self.whitelist_resolver.drain()
+        if arrived:
+            self.whitelist_view.refresh(arrived)
+        if self.whitelist_resolver.pending:
+            self.resolver_job = self.root.after(100, self.drain_resolver)
+        else:
+            self.resolver_job = None
+    
+    def fetch_user_details(self, users):
+        """
+        Profiles and whitelist info for rows the index cannot answer (runs on the resolver thread)
+        
+        Returns:
+            dict: user -> {'name', 'whitelist'}
+        """
+        whitelist_sync = self.whitelist_sync
+        if whitelist_sync is None:
+            return {}
+        # Batched/multicall reads with a TTL cache, shared with the registry snapshot
+        profiles = whitelist_sync.enricher.profiles(users)
+        entries = {}
+        if self.contract is not None:
+            entries = whitelist_sync.enricher.whitelist_info(users, self.contract.address)
+        return {
+            user: {'name': profile['name'] if profile['exists'] else "", 'whitelist': entries.get(user)}
+            for user, profile in profiles.items()
+        }
     
     def stop_monitoring(self):
         """Stop the monitoring updates"""
-        # This would stop the after() calls if we had a way to cancel them
-        # For now, just disable the connect button
+        self.polling.stop_all()
+        if self.async_core is not None:
+            self.async_core.unwatch_all()
+        if self.drain_job is not None:
+            self.root.after_cancel(self.drain_job)
+            self.drain_job = None
+        self.expiry_scheduler.clear()
         self.connect_btn.config(state='normal')
         self.status_bar.config(text="Monitoring stopped")
         
@@ -879,14 +695,102 @@ class DeviceMonitor:
         except ValueError:
             return 10000  # Default 10 seconds
     
+    def create_poll_interval(self):
+        """Adaptive poll timing for the fetcher, or None for a fixed interval"""
+        if not ADAPTIVE_POLLING:
+            return None
+        base_interval = self.update_interval / 1000
+        return AdaptivePollInterval(
+            base_interval,
+            block_time=get_block_time(self.chain_id),
+            idle_interval=max(base_interval, IDLE_POLL_INTERVAL)
+        )
+    
     def start_monitoring(self):
-        """Start monitoring and update the interval"""
+        """Start monitoring and update the interval (restarts the poller if already running)"""
+        if self.contract is None:
+            self.status_bar.config(text="Connect to a device contract first")
+            return
         self.update_interval = self.get_update_interval()
-        self.update_status()
+        
+        self.polling.stop(self.contract.address)
+        self.expiry_scheduler.clear()  # Re-armed by the new fetcher's first snapshot or event
+        if self.transition_detector is None or self.transition_device != self.contract.address:
+            # The detector remembers the last state it saw; carried over to another
+            # contract it would fire a transition for the difference between the two
+            self.transition_detector = TransitionDetector(self.on_device_transition,
+                                                          expiry_scheduler=self.expiry_scheduler,
+                                                          warning_lead=EXPIRY_WARNING_LEAD)
+            self.transition_device = self.contract.address
+        
+        event_watcher = None
+        metadata_watcher = None
+        if self.event_mode_var.get():
+            event_watcher = DeviceEventWatcher(self.w3, self.contract, self.chain_id, self.on_device_transition,
+                                               on_metadata_changed=self.invalidate_metadata,
+                                               expiry_scheduler=self.expiry_scheduler)
+        else:
+            metadata_watcher = DeviceEventWatcher(self.w3, self.contract, self.chain_id, None,
+                                                  on_metadata_changed=self.invalidate_metadata,
+                                                  watched_events=INVALIDATING_EVENTS)
+        
+        self.poll_interval = self.create_poll_interval()
+        if ASYNC_CORE:
+            # RPC reads happen on the asyncio core's loop; snapshots arrive on the same queue
+            if self.async_core is None:
+                self.async_core = AsyncMonitorCore()
+                self.async_core.start()
+            self.async_core.watch_device(
+                self.contract.address,
+                self.rpc_entry.get().strip(),
+                self.snapshot_queue,
+                interval=self.update_interval / 1000,
+                detector=self.transition_detector,
+                poll_interval=self.poll_interval,
+                metadata_cache=self.metadata_cache,
+                event_watcher=event_watcher,
+                reconcile_interval=RECONCILE_INTERVAL,
+                metadata_watcher=metadata_watcher
+            )
+            if self.drain_job is None:
+                self.drain_job = self.root.after(self.drain_interval, self.drain_snapshots)
+            self.refresh_whitelist()
+            return
+        
+        # RPC reads happen on the fetcher thread; the Tk loop only renders what it posts
+        fetcher = StatusFetcher(
+            self.contract,
+            self.chain_id,
+            self.snapshot_queue,
+            interval=self.update_interval / 1000,
+            detector=self.transition_detector,
+            event_watcher=event_watcher,
+            reconcile_interval=RECONCILE_INTERVAL,
+            metadata_cache=self.metadata_cache,
+            metadata_watcher=metadata_watcher,
+            poll_interval=self.poll_interval
+        )
+        self.polling.start(self.contract.address, fetcher)
+        
+        if self.drain_job is None:
+            self.drain_job = self.root.after(self.drain_interval, self.drain_snapshots)
         self.refresh_whitelist()  # Also refresh whitelist when starting
         
     def on_closing(self):
         """Handle app closing"""
+        self.polling.stop_all()
+        if self.async_core is not None:
+            self.async_core.stop()
+        self.expiry_scheduler.stop()
+        self.whitelist_resolver.shutdown()
+        if self.whitelist_job is not None:
+            self.root.after_cancel(self.whitelist_job)
+        self.whitelist_executor.shutdown(wait=False)
+        if self.whitelist_sync is not None:
+            self.whitelist_sync.enricher.shutdown()
+        if self.payload_backend is not None:
+            self.payload_backend.shutdown(wait=False)
+        self.payload_executor.shutdown(wait=False)
         self.root.destroy()
         
     def run(self):
@@ -1,15 +1,23 @@
 """
 InfraLink Device Payload Controller
 Handles device enable/disable actions with customizable commands and sound effects.
-This script is called by devicelocal.py when device state changes occur.
+This script is called by devicelocal.py when device state changes occur, either
+once per transition or as a long-lived payload server (`python devicepayload.py serve`).
 """
 
 import os
 import sys
+import json
+import socket
+import socketserver
 import subprocess
+import threading
 import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import pygame
 from pathlib import Path
+from whitelist_index import DEFAULT_WHITELIST_DB, lookup_whitelist
 
 # === CONFIGURATION ===
 # Sound settings
@@ -17,8 +25,33 @@ SOUND_ENABLED = True
 SOUND_FILE = "song.mp3"  # Place your sound file in the same directory
 SOUND_VOLUME = 0.7  # Volume level (0.0 to 1.0)
 
+# Sound cues, decoded once at startup and played from memory
+# Set a cue to None to disable it
+SOUND_CUES = {
+    "enable": SOUND_FILE,
+    "disable": None,
+    "expiry_warning": None,  # Played shortly before a session runs out (see EXPIRY_WARNING_LEAD in devicelocal.py)
+}
+# Decoded PCM is cached here so later starts skip decoding entirely
+CUE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cue_cache")
+
 # Custom commands for device enable/disable
 # Modify these to control your specific device/hardware
+#
+# Plain strings run one after another, in list order; a failing one does not
+# stop the rest. Use a dict to let a command run concurrently with the others:
+#   {"name": "relay", "cmd": "gpio write 18 1"}
+#   {"name": "notify", "cmd": "curl ...", "after": ["relay"]}  # wait for "relay" to succeed
+#   {"name": "log", "cmd": "...", "follows": ["relay"]}  # wait for "relay" to finish, either way
+#   {"name": "led", "cmd": "...", "group": "serial"}  # one command per group at a time
+#   {"name": "slow", "cmd": "...", "timeout": 5}  # per-command timeout (seconds)
+#
+# Built-in actions run in-process (no fork, no /bin/sh) and take the same
+# name/after/follows/group/timeout keys:
+#   {"type": "http", "method": "POST", "url": "http://192.168.1.100/api/enable", "json": {...}}
+#   {"type": "serial", "port": "/dev/ttyUSB0", "data": "Device enabled\n", "baudrate": 9600}
+#   {"type": "gpio", "pin": 18, "value": 1}  # sysfs GPIO (/sys/class/gpio)
+#   {"type": "file", "path": "/tmp/device_state", "data": "on\n", "append": False}
 ENABLE_COMMANDS = [
     # Example commands - replace with your actual device control commands
     # "gpio write 18 1",  # Turn on GPIO pin 18
@@ -35,17 +68,109 @@ DISABLE_COMMANDS = [
     # "echo 'Device disabled' > /dev/ttyUSB0",  # Send serial command
 ]
 
+# Command execution limits
+MAX_PARALLEL_COMMANDS = 4  # Commands running at the same time
+COMMAND_TIMEOUT = 30  # Default per-command timeout (seconds)
+COMMAND_DEADLINE = 60  # Overall budget for a whole command list (seconds)
+
+# Payload server settings (`python devicepayload.py serve`)
+# Unix domain socket path; platforms without AF_UNIX listen on 127.0.0.1:PAYLOAD_PORT instead
+PAYLOAD_SOCKET = os.environ.get("INFRALINK_PAYLOAD_SOCKET", "/tmp/infralink-payload.sock")
+PAYLOAD_PORT = int(os.environ.get("INFRALINK_PAYLOAD_PORT", "47820"))
+
+# Local whitelist index (filled by devicelocal.py / WhitelistSync); hooks read it without RPC
+WHITELIST_DB = DEFAULT_WHITELIST_DB
+
 # === SOUND SYSTEM ===
+class CueBank:
+    """
+    Sound cues held as decoded pygame.mixer.Sound buffers
+    
+    Each cue is decoded once (or read back as raw PCM from CUE_CACHE_DIR), so
+    playing it touches no disk and costs the same regardless of file size.
+    """
+    
+    def __init__(self, cache_dir=CUE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.sounds = {}
+    
+    def _cache_path(self, sound_file):
+        # Raw PCM depends on the source file and on the mixer's format
+        stat = os.stat(sound_file)
+        key = f"{os.path.abspath(sound_file)}|{stat.st_size}|{stat.st_mtime}|{pygame.mixer.get_init()}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{Path(sound_file).stem}-{digest}.pcm")
+    
+    def load(self, cues):
+        """Decode every configured cue; returns the number loaded"""
+        for name, sound_file in cues.items():
+            if not sound_file:
+                continue
+            if not os.path.exists(sound_file):
+                print(f"Sound file not found for cue '{name}': {sound_file}")
+                continue
+            try:
+                self.sounds[name] = self._load_sound(sound_file)
+                self.sounds[name].set_volume(SOUND_VOLUME)
+            except Exception as e:
+                print(f"Could not preload cue '{name}' ({e}); it will be streamed from disk")
+        return len(self.sounds)
+    
+    def _load_sound(self, sound_file):
+        cache_path = self._cache_path(sound_file)
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                return pygame.mixer.Sound(buffer=f.read())
+        
+        sound = pygame.mixer.Sound(sound_file)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, "wb") as f:
+                f.write(sound.get_raw())
+        except OSError as e:
+            print(f"Could not write cue cache {cache_path}: {e}")
+        return sound
+    
+    def play(self, name):
+        """Play a cue from memory; returns False if it isn't loaded"""
+        sound = self.sounds.get(name)
+        if sound is None:
+            return False
+        sound.play()
+        return True
+    
+    def stop(self):
+        for sound in self.sounds.values():
+            sound.stop()
+
+cue_bank = CueBank()
+
 def initialize_sound():
-    """Initialize pygame mixer for sound playback"""
+    """Initialize pygame mixer for sound playback and preload the sound cues"""
     try:
         pygame.mixer.init()
         pygame.mixer.music.set_volume(SOUND_VOLUME)
+        loaded = cue_bank.load(SOUND_CUES)
+        print(f"Loaded {loaded} sound cue(s)")
         return True
     except Exception as e:
         print(f"Sound initialization failed: {e}")
         return False
 
+def play_cue(name):
+    """Play a configured sound cue (enable, disable, expiry_warning)"""
+    if not SOUND_ENABLED:
+        return
+    
+    try:
+        if cue_bank.play(name):
+            print(f"Playing cue: {name}")
+        elif SOUND_CUES.get(name):
+            # Not preloaded (e.g. format unsupported by mixer.Sound): stream it
+            play_sound(SOUND_CUES[name])
+    except Exception as e:
+        print(f"Error playing cue {name}: {e}")
+
 def play_sound(sound_file=None):
     """Play sound effect when device is enabled"""
     if not SOUND_ENABLED:
@@ -53,7 +178,8 @@ def play_sound(sound_file=None):
     
     try:
         if sound_file is None:
-            sound_file = SOUND_FILE
+            play_cue("enable")
+            return
             
         if not os.path.exists(sound_file):
             print(f"Sound file not found: {sound_file}")
@@ -69,6 +195,7 @@ def play_sound(sound_file=None):
 def stop_sound():
     """Stop any currently playing sound"""
     try:
+        cue_bank.stop()
         pygame.mixer.music.stop()
     except Exception as e:
         print(f"Error stopping sound: {e}")
@@ -103,37 +230,301 @@ def run_command(command, timeout=30):
         print(f"Error executing command '{command}': {e}")
         return False
 
-def run_commands(commands, description=""):
-    """Execute a list of commands"""
+# === NATIVE ACTIONS ===
+GPIO_SYSFS_ROOT = "/sys/class/gpio"
+
+_http_session = None
+_serial_ports = {}  # (port, baudrate) -> open handle, reused across calls
+_http_lock = threading.Lock()
+_serial_lock = threading.Lock()
+
+def _get_http_session():
+    """Shared requests session so HTTP actions reuse pooled keep-alive connections"""
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            import requests
+            _http_session = requests.Session()
+        return _http_session
+
+def http_action(action, timeout):
+    """Send an HTTP request; succeeds on any status below 400"""
+    response = _get_http_session().request(
+        action.get("method", "GET"),
+        action["url"],
+        json=action.get("json"),
+        data=action.get("data"),
+        headers=action.get("headers"),
+        timeout=timeout
+    )
+    if response.status_code >= 400:
+        print(f"HTTP {action['url']} returned {response.status_code}")
+        return False
+    return True
+
+def _encode_data(data):
+    return data.encode() if isinstance(data, str) else bytes(data)
+
+def serial_action(action, timeout):
+    """Write to a serial port, keeping the port open between calls"""
+    port = action["port"]
+    baudrate = action.get("baudrate", 9600)
+    key = (port, baudrate)
+    with _serial_lock:
+        handle = _serial_ports.get(key)
+        if handle is None:
+            try:
+                import serial  # pyserial, optional
+                handle = serial.Serial(port, baudrate, write_timeout=timeout)
+            except ImportError:
+                # No pyserial: write to the device node like `echo ... > /dev/ttyUSB0`
+                handle = open(port, "wb", buffering=0)
+            _serial_ports[key] = handle
+    try:
+        handle.write(_encode_data(action["data"]))
+        handle.flush()
+        return True
+    except Exception:
+        # Drop the handle so the next call reopens the port
+        with _serial_lock:
+            _serial_ports.pop(key, None)
+        handle.close()
+        raise
+
+def gpio_action(action, timeout):
+    """Set a GPIO pin through sysfs, exporting it first if needed"""
+    pin = int(action["pin"])
+    pin_dir = os.path.join(GPIO_SYSFS_ROOT, f"gpio{pin}")
+    if not os.path.exists(pin_dir):
+        with open(os.path.join(GPIO_SYSFS_ROOT, "export"), "w") as f:
+            f.write(str(pin))
+        with open(os.path.join(pin_dir, "direction"), "w") as f:
+            f.write("out")
+    with open(os.path.join(pin_dir, "value"), "w") as f:
+        f.write("1" if action.get("value") else "0")
+    return True
+
+def file_action(action, timeout):
+    """Write (or append) data to a file"""
+    mode = "ab" if action.get("append") else "wb"
+    with open(action["path"], mode) as f:
+        f.write(_encode_data(action.get("data", "")))
+    return True
+
+NATIVE_ACTIONS = {
+    "http": http_action,
+    "serial": serial_action,
+    "gpio": gpio_action,
+    "file": file_action,
+}
+
+def describe_action(action):
+    """Short human-readable form of a command entry for log output"""
+    action_type = action.get("type", "shell")
+    if action_type == "shell":
+        return action["cmd"]
+    if action_type == "http":
+        return f"{action.get('method', 'GET')} {action['url']}"
+    if action_type == "serial":
+        return f"serial write {action['port']}"
+    if action_type == "gpio":
+        return f"gpio {action['pin']} = {action.get('value')}"
+    if action_type == "file":
+        return f"write {action['path']}"
+    return action_type
+
+def run_action(action, timeout=30):
+    """Execute one normalized command entry (shell command or built-in action)"""
+    action_type = action.get("type", "shell")
+    if action_type == "shell":
+        return run_command(action["cmd"], timeout)
+    
+    handler = NATIVE_ACTIONS.get(action_type)
+    if handler is None:
+        print(f"Unknown action type: {action_type}")
+        return False
+    
+    description = describe_action(action)
+    try:
+        print(f"Executing: {description}")
+        success = handler(action, timeout)
+        if success:
+            print(f"Action succeeded: {description}")
+        return success
+    except Exception as e:
+        print(f"Error executing action '{description}': {e}")
+        return False
+
+def normalize_commands(commands, description=""):
+    """
+    Turn a command list into dicts with name, type, after, follows, group and timeout
+
+    Plain strings keep the original sequential behaviour: each one follows
+    the plain string before it, starting once that one has finished whether
+    or not it succeeded.
+    """
+    normalized = []
+    previous_plain = None
+    for index, command in enumerate(commands):
+        if isinstance(command, str):
+            name = f"{description or 'command'}-{index + 1}"
+            entry = {
+                "name": name,
+                "type": "shell",
+                "cmd": command,
+                "after": [],
+                "follows": [previous_plain] if previous_plain else [],
+                "group": None,
+                "timeout": COMMAND_TIMEOUT,
+            }
+            previous_plain = name
+        else:
+            entry = dict(command)
+            entry.setdefault("name", f"{description or 'command'}-{index + 1}")
+            entry.setdefault("type", "shell")
+            entry["after"] = list(entry.get("after", []))
+            entry["follows"] = list(entry.get("follows", []))
+            entry.setdefault("group", None)
+            entry.setdefault("timeout", COMMAND_TIMEOUT)
+        normalized.append(entry)
+    return normalized
+
+def run_commands(commands, description="", deadline=None, max_workers=None):
+    """
+    Execute a list of commands, running independent ones concurrently
+    
+    Args:
+        commands (list): Shell command strings and/or command dicts (see ENABLE_COMMANDS)
+        description (str): Label used in log output
+        deadline (float, optional): Overall budget in seconds (defaults to COMMAND_DEADLINE)
+        max_workers (int, optional): Concurrency bound (defaults to MAX_PARALLEL_COMMANDS)
+    
+    Returns:
+        bool: True if every command succeeded
+    """
     if not commands:
         print(f"No {description} commands configured")
         return True
         
     print(f"Running {description} commands...")
-    success_count = 0
+    entries = normalize_commands(commands, description)
+    by_name = {entry["name"]: entry for entry in entries}
+    deadline_at = time.time() + (COMMAND_DEADLINE if deadline is None else deadline)
+    
+    results = {}  # name -> (success, seconds, note)
+    pending = list(entries)
+    running = {}  # future -> (entry, started_at)
+    busy_groups = set()
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers or MAX_PARALLEL_COMMANDS)
+    try:
+        while pending or running:
+            # Skip commands whose dependencies failed or don't exist
+            for entry in list(pending):
+                missing = [dep for dep in entry["after"] + entry["follows"] if dep not in by_name]
+                failed = [dep for dep in entry["after"] if dep in results and not results[dep][0]]
+                if missing or failed:
+                    note = f"unknown dependency {missing[0]}" if missing else f"dependency {failed[0]} failed"
+                    results[entry["name"]] = (False, 0.0, f"skipped: {note}")
+                    pending.remove(entry)
+            
+            # Start everything that is ready, respecting concurrency groups
+            remaining = deadline_at - time.time()
+            for entry in list(pending):
+                if remaining <= 0:
+                    break
+                if not all(dep in results for dep in entry["after"] + entry["follows"]):
+                    continue
+                if entry["group"] is not None and entry["group"] in busy_groups:
+                    continue
+                timeout = min(entry["timeout"], remaining)
+                future = executor.submit(run_action, entry, timeout)
+                running[future] = (entry, time.time())
+                pending.remove(entry)
+                if entry["group"] is not None:
+                    busy_groups.add(entry["group"])
+            
+            if not running:
+                # Nothing can start: out of time, or a dependency cycle
+                note = "skipped: deadline reached" if deadline_at - time.time() <= 0 else "skipped: dependency cycle"
+                for entry in pending:
+                    results[entry["name"]] = (False, 0.0, note)
+                break
+            
+            done, _ = wait(list(running), timeout=max(0.0, deadline_at - time.time()), return_when=FIRST_COMPLETED)
+            if not done:
+                # Deadline hit while commands are still running. Their timeouts were capped at the
+                # deadline, so wait for them to stop: returning now would let the device's next
+                # hook start while these still drive it
+                for future in wait(list(running)).done:
+                    entry, started_at = running.pop(future)
+                    success = future.result()
+                    results[entry["name"]] = (success, time.time() - started_at, "" if success else "deadline reached")
+                for entry in pending:
+                    results[entry["name"]] = (False, 0.0, "skipped: deadline reached")
+                break
+            
+            for future in done:
+                entry, started_at = running.pop(future)
+                results[entry["name"]] = (future.result(), time.time() - started_at, "")
+                if entry["group"] is not None:
+                    busy_groups.discard(entry["group"])
+    finally:
+        # Only non-empty if something raised; queued commands never start
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=False)
     
-    for cmd in commands:
-        if run_command(cmd):
+    # Per-command timing report
+    success_count = 0
+    for entry in entries:
+        success, seconds, note = results[entry["name"]]
+        if success:
             success_count += 1
-        else:
-            print(f"Failed to execute {description} command: {cmd}")
+        status = "ok" if success else "FAILED"
+        print(f"  [{status}] {entry['name']}: {seconds * 1000:.0f} ms" + (f" ({note})" if note else ""))
+        if not success:
+            print(f"Failed to execute {description} command: {describe_action(entry)}")
+    
+    print(f"Completed {success_count}/{len(entries)} {description} commands")
+    return success_count == len(entries)
+
+# === WHITELIST LOOKUP ===
+def get_whitelist_info(user_address, device_address=None):
+    """
+    Whitelist entry of a user, from the local index (no RPC)
+    
+    Args:
+        user_address (str): User address
+        device_address (str): Device contract; defaults to $INFRALINK_DEVICE,
+            set by devicelocal.py and for device_daemon.py subprocess payloads
+            (in-process daemon hooks pass it explicitly)
     
-    print(f"Completed {success_count}/{len(commands)} {description} commands")
-    return success_count == len(commands)
+    Returns:
+        dict: {'whitelist_name', 'fee_per_second', 'is_free'}, or None
+    """
+    device_address = device_address or os.environ.get("INFRALINK_DEVICE")
+    return lookup_whitelist(user_address, device_address, WHITELIST_DB)
 
 # === DEVICE CONTROL FUNCTIONS ===
-def on_device_enable(user_address=None, is_whitelisted=False):
+def on_device_enable(user_address=None, is_whitelisted=False, device_address=None):
     """
     Called when device is enabled/activated
     
     Args:
         user_address (str): Address of the user who activated the device
         is_whitelisted (bool): Whether the user is whitelisted
+        device_address (str, optional): Device contract; defaults to $INFRALINK_DEVICE
     """
     print("=" * 50)
     print("🟢 DEVICE ENABLE EVENT")
     print(f"User: {user_address}")
     print(f"Whitelisted: {is_whitelisted}")
+    if is_whitelisted:
+        entry = get_whitelist_info(user_address, device_address)
+        if entry:
+            rate = "free" if entry['is_free'] else f"{entry['fee_per_second']}/sec"
+            print(f"Whitelist: {entry['whitelist_name']} ({rate})")
     print(f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
     
@@ -151,13 +542,14 @@ def on_device_enable(user_address=None, is_whitelisted=False):
     
     return success
 
-def on_device_disable(user_address=None, was_whitelisted=False):
+def on_device_disable(user_address=None, was_whitelisted=False, device_address=None):
     """
     Called when device is disabled/deactivated
     
     Args:
         user_address (str): Address of the user whose session ended
         was_whitelisted (bool): Whether the user was whitelisted
+        device_address (str, optional): Device contract; defaults to $INFRALINK_DEVICE
     """
     print("=" * 50)
     print("🔴 DEVICE DISABLE EVENT")
@@ -166,8 +558,10 @@ def on_device_disable(user_address=None, was_whitelisted=False):
     print(f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
     
-    # Stop any playing sound
+    # Stop any playing sound, then play the disable cue if one is configured
     stop_sound()
+    if SOUND_ENABLED and SOUND_CUES.get("disable"):
+        play_cue("disable")
     
     # Execute disable commands
     success = run_commands(DISABLE_COMMANDS, "disable")
@@ -179,6 +573,26 @@ def on_device_disable(user_address=None, was_whitelisted=False):
     
     return success
 
+def on_session_expiring(user_address=None, is_whitelisted=False, device_address=None):
+    """
+    Called shortly before an active session ends (the 'expiry_warning' action)
+    
+    Args:
+        user_address (str): Address of the user whose session is ending
+        is_whitelisted (bool): Whether the user is whitelisted
+        device_address (str, optional): Device contract; defaults to $INFRALINK_DEVICE
+    """
+    print(f"⏳ Session of {user_address} ends soon")
+    if SOUND_ENABLED and SOUND_CUES.get("expiry_warning"):
+        play_cue("expiry_warning")
+    return True
+
+def wait_for_cue(timeout=5):
+    """Let a playing cue finish before a one-shot process exits"""
+    deadline = time.time() + timeout
+    while SOUND_ENABLED and pygame.mixer.get_init() and pygame.mixer.get_busy() and time.time() < deadline:
+        time.sleep(0.05)
+
 # === TESTING FUNCTIONS ===
 def test_enable():
     """Test the enable functionality"""
@@ -201,6 +615,80 @@ def test_sound():
     else:
         print("Sound test failed - could not initialize sound system")
 
+# === PAYLOAD SERVER ===
+# Protocol: one JSON object per line in each direction.
+#   request:  {"action": "enable", "user_address": "0x...", "is_whitelisted": true,
+#              "device_address": "0x..."}  (device_address optional; defaults to $INFRALINK_DEVICE)
+#   response: {"ok": true} or {"ok": false, "error": "..."}
+#   cue:      {"action": "cue", "name": "expiry_warning"}
+# Actions: enable, disable, expiry_warning, cue, test-enable, test-disable, test-sound, ping
+
+_hook_lock = threading.Lock()  # Hooks share the mixer and device handles; run one at a time
+
+def handle_payload_request(request):
+    """Run one payload server request and return the response dict"""
+    action = request.get("action")
+    user_address = request.get("user_address")
+    is_whitelisted = bool(request.get("is_whitelisted", False))
+    device_address = request.get("device_address")
+    
+    if action == "ping":
+        return {"ok": True}
+    
+    handlers = {
+        "enable": lambda: on_device_enable(user_address, is_whitelisted, device_address),
+        "disable": lambda: on_device_disable(user_address, is_whitelisted, device_address),
+        "expiry_warning": lambda: on_session_expiring(user_address, is_whitelisted, device_address),
+        "test-enable": test_enable,
+        "test-disable": test_disable,
+        "test-sound": test_sound,
+        "cue": lambda: play_cue(request.get("name", "")),
+    }
+    if action not in handlers:
+        return {"ok": False, "error": f"Unknown action: {action}"}
+    
+    with _hook_lock:
+        result = handlers[action]()
+    return {"ok": result is not False}
+
+class PayloadRequestHandler(socketserver.StreamRequestHandler):
+    """Serves newline-delimited JSON requests on one client connection"""
+    
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = handle_payload_request(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+def serve():
+    """Run the payload server until interrupted, keeping pygame and device handles open"""
+    if SOUND_ENABLED:
+        initialize_sound()
+    
+    if hasattr(socket, "AF_UNIX"):
+        if os.path.exists(PAYLOAD_SOCKET):
+            os.remove(PAYLOAD_SOCKET)  # Stale socket from a previous run
+        server = socketserver.ThreadingUnixStreamServer(PAYLOAD_SOCKET, PayloadRequestHandler)
+        print(f"Payload server listening on {PAYLOAD_SOCKET}")
+    else:
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", PAYLOAD_PORT), PayloadRequestHandler)
+        print(f"Payload server listening on 127.0.0.1:{PAYLOAD_PORT}")
+    
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Payload server stopping")
+    finally:
+        server.server_close()
+        if hasattr(socket, "AF_UNIX") and os.path.exists(PAYLOAD_SOCKET):
+            os.remove(PAYLOAD_SOCKET)
+
 # === MAIN EXECUTION ===
 def main():
     """Main function for testing or direct execution"""
@@ -210,13 +698,20 @@ def main():
         print("Commands:")
         print("  enable [user_address] [is_whitelisted]")
         print("  disable [user_address] [was_whitelisted]")
+        print("  expiry_warning [user_address] [is_whitelisted]")
         print("  test-enable")
         print("  test-disable")
         print("  test-sound")
+        print("  cue <name>  (enable, disable, expiry_warning)")
+        print("  serve  (long-lived payload server for devicelocal.py)")
         return
     
     command = sys.argv[1].lower()
     
+    if command == "serve":
+        serve()
+        return
+    
     # Initialize sound system
     if SOUND_ENABLED:
         initialize_sound()
@@ -231,6 +726,12 @@ def main():
         was_whitelisted = sys.argv[3].lower() == "true" if len(sys.argv) > 3 else False
         on_device_disable(user_address, was_whitelisted)
         
+    elif command == "expiry_warning":
+        user_address = sys.argv[2] if len(sys.argv) > 2 else None
+        is_whitelisted = sys.argv[3].lower() == "true" if len(sys.argv) > 3 else False
+        on_session_expiring(user_address, is_whitelisted)
+        wait_for_cue()
+        
     elif command == "test-enable":
         test_enable()
         
@@ -240,6 +741,10 @@ def main():
     elif command == "test-sound":
         test_sound()
         
+    elif command == "cue":
+        play_cue(sys.argv[2] if len(sys.argv) > 2 else "enable")
+        wait_for_cue()
+        
     else:
         print(f"Unknown command: {command}")
 
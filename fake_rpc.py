@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+InfraLink fake JSON-RPC endpoint
+A tiny local Ethereum JSON-RPC server for exercising the RPC layer offline:
+latency, jitter, HTTP errors, rate limiting and stalls can be injected per
+server (and changed while it runs), so failover, hedging and circuit breaking
+can be watched without touching a real network.
+
+Usage:
+    python fake_rpc.py            # failover/hedging demo against three fake endpoints
+    python fake_rpc.py check      # offline checks of failover, hedging and circuit breaking
+
+    server = FakeRPCServer(latency=0.05, error_rate=0.2, error_mode='rate_limit')
+    url = server.start()
+    ...
+    server.stop()
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_abi import decode, encode
+from eth_utils import keccak
+
+from rpc_batch import MULTICALL3_ADDRESS
+
+# Injected failure kinds
+ERROR_MODES = ('http', 'rate_limit', 'stall', 'drop')
+
+
+class FakeRPCServer:
+    """One fake endpoint; attributes may be changed at any time to alter its behavior"""
+
+    def __init__(self, chain_id=296, latency=0.0, jitter=0.0, error_rate=0.0, error_mode='http',
+                 stall_time=30.0, block_number=1, call_results=None, multicall=False, seed=None,
+                 gas_price=10 ** 9, mine_delay=0.0, base_fee=None, gas_estimate=50000):
+        """
+        Args:
+            chain_id (int): Returned by eth_chainId / net_version
+            latency (float): Seconds added to every response
+            jitter (float): Extra random latency, uniform in [0, jitter]
+            error_rate (float): Fraction of requests that fail (0..1)
+            error_mode (str): How they fail: 'http' (HTTP 500), 'rate_limit'
+                (JSON-RPC error -32005), 'stall' (no answer for stall_time) or
+                'drop' (connection closed without a response)
+            stall_time (float): Seconds a stalled request hangs
+            block_number (int): Returned by eth_blockNumber
+            call_results (dict, optional): 4-byte selector ("0x12345678") -> hex
+                return data for eth_call; other calls revert
+            multicall (bool): Pretend Multicall3 is deployed and answer aggregate3
+                calls from call_results
+            seed (int, optional): Seed for reproducible error/jitter sequences
+            gas_price (int): Returned by eth_gasPrice (and eth_maxPriorityFeePerGas)
+            base_fee (int, optional): baseFeePerGas of the latest block; None
+                mimics a legacy-only chain
+            gas_estimate (int): Returned by eth_estimateGas
+            mine_delay (float): Seconds before a sent transaction gets a receipt;
+                every transaction succeeds and the count returned by
+                eth_getTransactionCount is simply the number sent so far
+        """
+        if error_mode not in ERROR_MODES:
+            raise ValueError(f"error_mode must be one of {ERROR_MODES}")
+        self.chain_id = chain_id
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_mode = error_mode
+        self.stall_time = stall_time
+        self.block_number = block_number
+        self.call_results = dict(call_results or {})
+        self.multicall = multicall
+        self.gas_price = gas_price
+        self.mine_delay = mine_delay
+        self.base_fee = base_fee
+        self.gas_estimate = gas_estimate
+        self.transactions = {}  # tx hash -> time it was received
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port=0):
+        """Serve on 127.0.0.1 in a daemon thread; returns the endpoint URL"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like real endpoints
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fake._handle_http(self, body)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="FakeRPC", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle_http(self, handler, body):
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            if fail:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+
+        if fail and self.error_mode == 'drop':
+            handler.close_connection = True
+            return
+        if fail and self.error_mode == 'stall':
+            time.sleep(self.stall_time)
+        if fail and self.error_mode == 'http':
+            self._write(handler, 500, {'error': 'injected failure'})
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._write(handler, 400, {'jsonrpc': '2.0', 'id': None,
+                                       'error': {'code': -32700, 'message': 'parse error'}})
+            return
+
+        if fail and self.error_mode == 'rate_limit':
+            error = {'code': -32005, 'message': 'rate limit exceeded (injected)'}
+            if isinstance(request, list):
+                reply = [{'jsonrpc': '2.0', 'id': item.get('id'), 'error': error} for item in request]
+            else:
+                reply = {'jsonrpc': '2.0', 'id': request.get('id'), 'error': error}
+            self._write(handler, 200, reply)
+            return
+
+        if isinstance(request, list):
+            self._write(handler, 200, [self._answer(item) for item in request])
+        else:
+            self._write(handler, 200, self._answer(request))
+
+    @staticmethod
+    def _write(handler, status, payload):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        try:
+            handler.end_headers()
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            handler.close_connection = True  # The client gave up (timed out) first
+
+    def _answer(self, request):
+        method = request.get('method')
+        params = request.get('params') or []
+        reply = {'jsonrpc': '2.0', 'id': request.get('id')}
+
+        if method == 'eth_chainId':
+            reply['result'] = hex(self.chain_id)
+        elif method == 'net_version':
+            reply['result'] = str(self.chain_id)
+        elif method == 'web3_clientVersion':
+            reply['result'] = 'InfraLinkFakeRPC/1.0'
+        elif method == 'eth_blockNumber':
+            reply['result'] = hex(self.block_number)
+        elif method == 'eth_getCode':
+            is_multicall = params and str(params[0]).lower() == MULTICALL3_ADDRESS.lower()
+            reply['result'] = '0x01' if self.multicall and is_multicall else '0x'
+        elif method == 'eth_getLogs':
+            reply['result'] = []
+        elif method in ('eth_gasPrice', 'eth_maxPriorityFeePerGas'):
+            reply['result'] = hex(self.gas_price)
+        elif method == 'eth_getBlockByNumber':
+            block = {'number': hex(self.block_number), 'timestamp': hex(int(time.time())), 'transactions': []}
+            if self.base_fee is not None:
+                block['baseFeePerGas'] = hex(self.base_fee)
+            reply['result'] = block
+        elif method == 'eth_estimateGas':
+            reply['result'] = hex(self.gas_estimate)
+        elif method == 'eth_getTransactionCount':
+            with self._lock:
+                reply['result'] = hex(len(self.transactions))
+        elif method == 'eth_sendRawTransaction':
+            tx_hash = '0x' + keccak(hexstr=params[0]).hex()
+            with self._lock:
+                self.transactions.setdefault(tx_hash, time.time())
+            reply['result'] = tx_hash
+        elif method == 'eth_getTransactionReceipt':
+            with self._lock:
+                received = self.transactions.get(str(params[0]).lower())
+            if received is None or time.time() - received < self.mine_delay:
+                reply['result'] = None
+            else:
+                reply['result'] = {'transactionHash': params[0], 'status': '0x1', 'gasUsed': hex(21000),
+                                   'blockNumber': hex(self.block_number), 'logs': []}
+        elif method == 'eth_call':
+            data = (params[0].get('data') or params[0].get('input') or '0x') if params else '0x'
+            if self.multicall and str(params[0].get('to', '')).lower() == MULTICALL3_ADDRESS.lower():
+                reply['result'] = self._aggregate3(data)
+                return reply
+            result = self.call_results.get(data[:10].lower())
+            if result is None:
+                reply['error'] = {'code': 3, 'message': 'execution reverted'}
+            else:
+                reply['result'] = result
+        else:
+            reply['error'] = {'code': -32601, 'message': f'method not found: {method}'}
+        return reply
+
+    def _aggregate3(self, data):
+        calls = decode(['(address,bool,bytes)[]'], bytes.fromhex(data[10:]))[0]
+        returned = []
+        for _, _, calldata in calls:
+            result = self.call_results.get('0x' + calldata[:4].hex())
+            returned.append((result is not None, bytes.fromhex(result[2:]) if result else b''))
+        return '0x' + encode(['(bool,bytes)[]'], [returned]).hex()
+
+
+def main():
+    from rpc_pool import FailoverHTTPProvider
+    from web3 import Web3
+
+    servers = {
+        'slow': FakeRPCServer(latency=0.4, jitter=0.4, seed=1),
+        'flaky': FakeRPCServer(latency=0.02, error_rate=1.0, error_mode='rate_limit', seed=2),
+        'fast': FakeRPCServer(latency=0.03, jitter=0.02, seed=3),
+    }
+    urls = {name: server.start() for name, server in servers.items()}
+    names = {url: name for name, url in urls.items()}
+
+    provider = FailoverHTTPProvider(list(urls.values()))
+    w3 = Web3(provider)
+
+    print("InfraLink fake RPC demo: slow (primary), flaky (always rate limited), fast")
+    started = time.time()
+    for _ in range(30):
+        w3.eth.block_number
+    elapsed = time.time() - started
+    print(f"30 reads in {elapsed:.2f}s ({elapsed / 30 * 1000:.0f} ms avg)")
+
+    for stats in provider.endpoint_stats():
+        print(f"  {names[stats['url']]:>5}: served={servers[names[stats['url']]].requests:3d} "
+              f"latency={stats['latency_ms']} ms errors={stats['failures']} circuit_open={stats['circuit_open']}")
+
+    for server in servers.values():
+        server.stop()
+
+
+def _check_hedge_keeps_request_timeout():
+    """A hedged backup slower than the hedge delay still gets the full request timeout"""
+    from rpc_pool import FailoverHTTPProvider
+
+    servers = [FakeRPCServer(latency=0.8), FakeRPCServer(latency=0.3)]
+    urls = [server.start() for server in servers]
+    try:
+        provider = FailoverHTTPProvider(urls, request_kwargs={'timeout': (1, 2)}, hedge_after=0.1)
+        for _ in range(5):
+            reply = provider.make_request('eth_blockNumber', [])
+            assert reply.get('result') == '0x1', reply
+        for stats in provider.endpoint_stats():
+            assert stats['failures'] == 0, stats
+            assert not stats['circuit_open'], stats
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def _check_failover_and_circuit(error_mode):
+    """Reads fail over from a failing primary, whose circuit opens after FAILURE_THRESHOLD failures"""
+    from rpc_pool import FAILURE_THRESHOLD, FailoverHTTPProvider
+
+    servers = [FakeRPCServer(error_rate=1.0, error_mode=error_mode), FakeRPCServer(latency=0.01)]
+    urls = [server.start() for server in servers]
+    try:
+        # Hedging off: every read tries the primary first until its circuit opens
+        provider = FailoverHTTPProvider(urls, request_kwargs={'timeout': (1, 2)}, hedge_after=5)
+        for _ in range(FAILURE_THRESHOLD + 3):
+            reply = provider.make_request('eth_blockNumber', [])
+            assert reply.get('result') == '0x1', reply
+        primary, backup = provider.endpoint_stats()
+        assert primary['failures'] == FAILURE_THRESHOLD, primary
+        assert primary['circuit_open'], primary
+        assert servers[0].requests == FAILURE_THRESHOLD, servers[0].requests
+        assert backup['failures'] == 0, backup
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def _check_write_not_resent_after_delivery():
+    """A write that timed out after reaching an endpoint is raised, not sent to the next one"""
+    from rpc_pool import EndpointUnavailable, FailoverHTTPProvider
+
+    servers = [FakeRPCServer(latency=1.0), FakeRPCServer()]
+    urls = [server.start() for server in servers]
+    try:
+        provider = FailoverHTTPProvider(urls, request_kwargs={'timeout': (1, 0.3)})
+        try:
+            provider.make_request('eth_sendRawTransaction', ['0x00'])
+        except EndpointUnavailable as e:
+            assert e.delivered, e
+        else:
+            raise AssertionError("timed-out write did not raise")
+        assert servers[1].requests == 0, "write was sent to a second endpoint"
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def _check_write_fails_over_when_unreachable():
+    """A write fails over when the first endpoint cannot even be connected to"""
+    from rpc_pool import FailoverHTTPProvider
+
+    down, up = FakeRPCServer(), FakeRPCServer()
+    down_url = down.start()
+    down.stop()  # Port now refuses connections
+    up_url = up.start()
+    try:
+        provider = FailoverHTTPProvider([down_url, up_url], request_kwargs={'timeout': (1, 2)})
+        reply = provider.make_request('eth_sendRawTransaction', ['0x00'])
+        assert 'result' in reply, reply
+        assert up.requests == 1, up.requests
+    finally:
+        up.stop()
+
+
+def _check_post_json_timeout():
+    """post_json's timeout overrides the provider's default"""
+    from rpc_pool import EndpointUnavailable, FailoverHTTPProvider
+
+    server = FakeRPCServer(latency=1.0)
+    url = server.start()
+    try:
+        provider = FailoverHTTPProvider([url], request_kwargs={'timeout': (1, 5)})
+        started = time.time()
+        try:
+            provider.post_json({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []},
+                               timeout=(1, 0.2))
+        except EndpointUnavailable:
+            pass
+        else:
+            raise AssertionError("slow request did not time out")
+        assert time.time() - started < 0.8, time.time() - started
+    finally:
+        server.stop()
+
+
+CHECKS = [
+    ('hedged backup keeps the request timeout', _check_hedge_keeps_request_timeout),
+    ('failover and circuit breaker on HTTP 500', lambda: _check_failover_and_circuit('http')),
+    ('failover and circuit breaker on rate limiting', lambda: _check_failover_and_circuit('rate_limit')),
+    ('delivered write is not resent', _check_write_not_resent_after_delivery),
+    ('undelivered write fails over', _check_write_fails_over_when_unreachable),
+    ('post_json honours its timeout', _check_post_json_timeout),
+]
+
+
+def run_checks():
+    """Run every offline RPC layer check; returns the number that failed"""
+    failed = 0
+    for name, check in CHECKS:
+        try:
+            check()
+            print(f"ok    {name}")
+        except Exception as e:
+            failed += 1
+            print(f"FAIL  {name}: {type(e).__name__}: {e}")
+    print(f"{len(CHECKS) - failed}/{len(CHECKS)} checks passed")
+    return failed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        sys.exit(1 if run_checks() else 0)
+    main()
@@ -0,0 +1,202 @@
+"""
+InfraLink gas oracle
+Prices transactions without a fixed gas limit or an eth_gasPrice call per
+send. Gas limits come from estimate_gas, cached per (contract, sender,
+function selector, argument shape): activate(300) and activate(3600) cost
+the same, so only the first call of each shape pays the estimate round-trip.
+Fees are EIP-1559 (base fee of the latest block plus priority fee) where
+the chain supports it and legacy gasPrice elsewhere (Hedera), read in one
+batched request and reused for about a block.
+"""
+
+import threading
+import time
+
+from network_utils import get_block_time, uses_legacy_gas
+from rpc_batch import BatchReader, BatchCallError
+
+DEFAULT_GAS_MARGIN = 1.2  # estimates are padded; state changes between estimate and mining
+DEFAULT_ESTIMATE_TTL = 600  # seconds a cached gas estimate is reused
+DEFAULT_FEE_TTL = 12  # seconds fees are reused on chains with no known block time
+DEFAULT_PRIORITY_FEE = 10 ** 9  # 1 gwei, for nodes without eth_maxPriorityFeePerGas
+
+# chain_id -> GasOracle
+_oracles = {}
+_oracles_lock = threading.Lock()
+
+
+def _hex_int(value):
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _shape(value):
+    """
+    Reduce an argument to what its gas cost depends on: its type, and for
+    dynamic values their length in 32-byte words, not their contents
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        if isinstance(value, str) and value.startswith('0x') and len(value) == 42:
+            return 'address'
+        return (type(value).__name__, (len(value) + 31) // 32)
+    if isinstance(value, (list, tuple)):
+        return tuple(_shape(item) for item in value)
+    return type(value).__name__
+
+
+class GasOracle:
+    """
+    Gas limits and fee fields for one chain (thread-safe)
+
+    Usage:
+        oracle = get_gas_oracle(w3, chain_id)
+        fn = contract.functions.activate(duration)
+        txn = fn.build_transaction({'from': sender, 'nonce': nonce,
+                                    **oracle.transaction_params(fn, sender)})
+    """
+
+    def __init__(self, w3, chain_id, gas_margin=DEFAULT_GAS_MARGIN, estimate_ttl=DEFAULT_ESTIMATE_TTL,
+                 fee_ttl=None):
+        """
+        Args:
+            w3 (Web3): Connected Web3 instance for the chain
+            chain_id (int): Chain ID (also put into every transaction)
+            gas_margin (float): Multiplier applied to estimate_gas results
+            estimate_ttl (float): Seconds a gas estimate is reused
+            fee_ttl (float, optional): Seconds fees are reused; defaults to the block time
+        """
+        self.w3 = w3
+        self.chain_id = chain_id
+        self.gas_margin = gas_margin
+        self.estimate_ttl = estimate_ttl
+        self.fee_ttl = fee_ttl if fee_ttl is not None else (get_block_time(chain_id) or DEFAULT_FEE_TTL)
+        self.legacy = uses_legacy_gas(chain_id)
+        self._lock = threading.Lock()
+        self._estimates = {}  # (to, from, selector, shape, pays value) -> (expires_at, gas)
+        self._fees = None  # (expires_at, fee fields)
+        self.estimate_calls = 0
+
+    # --- gas limits ---
+
+    def _estimate_key(self, fn, sender, value):
+        return (fn.address.lower(), sender.lower(), fn.selector, _shape(fn.args), bool(value))
+
+    def estimate(self, fn, sender, value=0):
+        """
+        Gas limit for a contract call, from cache when one of the same shape was estimated
+
+        Args:
+            fn: Bound web3 ContractFunction, e.g. contract.functions.activate(300)
+            sender (str): Address sending the transaction
+            value (int): Native value sent with it (payable calls)
+
+        Returns:
+            int: Padded gas limit
+
+        Raises:
+            ContractLogicError: If the call would revert (nothing is cached)
+        """
+        key = self._estimate_key(fn, sender, value)
+        now = time.time()
+        with self._lock:
+            hit = self._estimates.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+
+        params = {'from': sender}
+        if value:
+            params['value'] = value
+        gas = int(fn.estimate_gas(params) * self.gas_margin)
+        with self._lock:
+            self.estimate_calls += 1
+            self._estimates[key] = (now + self.estimate_ttl, gas)
+        return gas
+
+    def invalidate(self, fn=None, sender=None, value=0):
+        """Drop one cached estimate (e.g. after a transaction ran out of gas), or all of them"""
+        with self._lock:
+            if fn is None:
+                self._estimates.clear()
+            else:
+                self._estimates.pop(self._estimate_key(fn, sender, value), None)
+
+    # --- fees ---
+
+    def fees(self):
+        """
+        Fee fields for a transaction sent now
+
+        Returns:
+            dict: {'maxFeePerGas', 'maxPriorityFeePerGas'}, or {'gasPrice'} on legacy chains
+        """
+        now = time.time()
+        with self._lock:
+            if self._fees is not None and self._fees[0] > now:
+                return dict(self._fees[1])
+
+        fees = self._read_fees()
+        with self._lock:
+            self._fees = (now + self.fee_ttl, fees)
+        return dict(fees)
+
+    def _read_fees(self):
+        # Base fee, priority fee and gas price in one round-trip; whichever the chain lacks just errors
+        reader = BatchReader(self.w3)
+        gas_price = reader.add_request('eth_gasPrice', formatter=_hex_int)
+        if not self.legacy:
+            block = reader.add_request('eth_getBlockByNumber', ['latest', False])
+            priority = reader.add_request('eth_maxPriorityFeePerGas', formatter=_hex_int)
+        results = reader.execute(raise_errors=False)
+
+        if not self.legacy:
+            latest = results[block]
+            if isinstance(latest, BatchCallError):
+                # Says nothing about the chain; a blip must not downgrade it to legacy for good
+                raise latest
+            base_fee = latest.get('baseFeePerGas')
+            if base_fee is not None:
+                tip = results[priority]
+                if isinstance(tip, BatchCallError):
+                    tip = DEFAULT_PRIORITY_FEE
+                # Twice the base fee survives six full blocks of +12.5% increases
+                return {'maxFeePerGas': 2 * _hex_int(base_fee) + tip, 'maxPriorityFeePerGas': tip}
+            # No base fee: a pre-London chain, stay legacy from now on
+            self.legacy = True
+
+        if isinstance(results[gas_price], BatchCallError):
+            raise results[gas_price]
+        return {'gasPrice': results[gas_price]}
+
+    # --- both ---
+
+    def transaction_params(self, fn, sender, value=0):
+        """
+        Gas limit, fees and chain ID to merge into build_transaction(), so web3
+        makes no estimate, gas price or chain ID request of its own
+
+        Returns:
+            dict: e.g. {'chainId', 'gas', 'maxFeePerGas', 'maxPriorityFeePerGas'}
+        """
+        params = {'chainId': self.chain_id, 'gas': self.estimate(fn, sender, value)}
+        params.update(self.fees())
+        return params
+
+
+def get_gas_oracle(w3, chain_id=None):
+    """
+    Shared GasOracle for a chain, so every sender reuses the same estimates and fees
+
+    Args:
+        w3 (Web3): Connected Web3 instance
+        chain_id (int, optional): Chain ID if already known (saves an eth_chainId call)
+
+    Returns:
+        GasOracle
+    """
+    if chain_id is None:
+        chain_id = w3.eth.chain_id
+    with _oracles_lock:
+        oracle = _oracles.get(chain_id)
+        if oracle is None:
+            oracle = GasOracle(w3, chain_id)
+            _oracles[chain_id] = oracle
+        return oracle
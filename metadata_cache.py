@@ -0,0 +1,180 @@
+"""
+InfraLink metadata cache
+Device name/description, payment token details and chain ids almost never
+change, so they are read once and kept in memory plus a small JSON file.
+Entries are only dropped when a DeviceInfoUpdated or FeeChanged event is seen,
+or when the device's token address no longer matches the cached one.
+"""
+
+import json
+import os
+import threading
+
+from rpc_batch import BatchReader
+
+DEFAULT_METADATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".infralink_metadata.json")
+
+# Cached field -> device contract view function
+DEVICE_METADATA_FUNCTIONS = {
+    'device_name': 'deviceName',
+    'device_description': 'deviceDescription',
+    'token_address': 'token',
+    'token_name': 'tokenName',
+    'token_symbol': 'tokenSymbol',
+    'token_decimals': 'tokenDecimals',
+    'use_native_token': 'useNativeToken',
+}
+
+# Events after which a device's cached metadata is stale
+INVALIDATING_EVENTS = ('DeviceInfoUpdated', 'FeeChanged')
+
+
+class MetadataCache:
+    """Device metadata keyed by (chain_id, contract address), plus chain ids keyed by RPC URL"""
+
+    def __init__(self, cache_file=DEFAULT_METADATA_FILE):
+        """
+        Args:
+            cache_file (str, optional): JSON file to persist to; None keeps the cache in memory only
+        """
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._chain_ids = {}
+        self._load()
+
+    @staticmethod
+    def _key(chain_id, address):
+        return f"{chain_id}:{address.lower()}"
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            self._devices = data.get('devices', {})
+            self._chain_ids = data.get('chain_ids', {})
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            tmp_file = self.cache_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({'devices': self._devices, 'chain_ids': self._chain_ids}, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Could not save metadata cache: {e}")
+
+    def get(self, chain_id, address):
+        """Return the cached metadata dict for a device, or None"""
+        with self._lock:
+            entry = self._devices.get(self._key(chain_id, address))
+            return dict(entry) if entry is not None else None
+
+    def put(self, chain_id, address, metadata):
+        """Store metadata for a device"""
+        with self._lock:
+            self._devices[self._key(chain_id, address)] = dict(metadata)
+            self._save()
+
+    def put_many(self, chain_id, metadata_by_address):
+        """Store metadata for several devices on one chain with a single file write"""
+        if not metadata_by_address:
+            return
+        with self._lock:
+            for address, metadata in metadata_by_address.items():
+                self._devices[self._key(chain_id, address)] = dict(metadata)
+            self._save()
+
+    def invalidate(self, chain_id, address):
+        """Drop a device's metadata so the next read refetches it"""
+        with self._lock:
+            if self._devices.pop(self._key(chain_id, address), None) is not None:
+                self._save()
+
+    @staticmethod
+    def _endpoint(w3):
+        return str(getattr(w3.provider, 'endpoint_uri', '') or '')
+
+    def get_cached_chain_id(self, w3):
+        """Return the cached chain id for a Web3 instance's RPC URL, or None"""
+        endpoint = self._endpoint(w3)
+        with self._lock:
+            return self._chain_ids.get(endpoint) if endpoint else None
+
+    def put_chain_id(self, w3, chain_id):
+        """Remember the chain id behind a Web3 instance's RPC URL"""
+        endpoint = self._endpoint(w3)
+        if not endpoint:
+            return
+        with self._lock:
+            self._chain_ids[endpoint] = chain_id
+            self._save()
+
+    def get_chain_id(self, w3):
+        """
+        Return the chain id behind a Web3 instance, asking the node only once per RPC URL
+
+        Args:
+            w3 (Web3): Connected Web3 instance
+
+        Returns:
+            int: Chain ID
+        """
+        chain_id = self.get_cached_chain_id(w3)
+        if chain_id is None:
+            chain_id = w3.eth.chain_id
+            self.put_chain_id(w3, chain_id)
+        return chain_id
+
+
+def queue_metadata_reads(reader, contract, address=None):
+    """Add every metadata read for a device to a BatchReader; returns {field: index}"""
+    return {field: reader.add(contract, fn_name, address=address)
+            for field, fn_name in DEVICE_METADATA_FUNCTIONS.items()}
+
+
+def collect_metadata(results, indexes):
+    """Build the metadata dict from BatchReader results and queue_metadata_reads() indexes"""
+    return {field: results[index] for field, index in indexes.items()}
+
+
+def get_device_metadata(contract, chain_id, cache=None):
+    """
+    Return device metadata, reading it from the chain only on a cache miss
+
+    Args:
+        contract: web3 contract bound to CONTRACT_ABI
+        chain_id (int): Chain ID the contract lives on
+        cache (MetadataCache, optional): Cache to use (defaults to the shared one)
+
+    Returns:
+        dict: Metadata keyed by the fields in DEVICE_METADATA_FUNCTIONS
+    """
+    cache = cache or get_default_cache()
+    metadata = cache.get(chain_id, contract.address)
+    if metadata is not None:
+        return metadata
+
+    reader = BatchReader(contract.w3)
+    indexes = queue_metadata_reads(reader, contract)
+    metadata = collect_metadata(reader.execute(), indexes)
+    cache.put(chain_id, contract.address, metadata)
+    return metadata
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Process-wide MetadataCache backed by DEFAULT_METADATA_FILE"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache()
+        return _default_cache
@@ -0,0 +1,609 @@
+"""
+InfraLink monitoring core
+Reads device contract state off the UI thread and hands immutable snapshots
+to whoever renders them (the Tk monitor, or anything else that drains a queue).
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque, namedtuple
+
+from metadata_cache import queue_metadata_reads, collect_metadata, get_device_metadata
+from rpc_batch import BatchReader
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Immutable view of a device contract at one point in time
+DeviceSnapshot = namedtuple('DeviceSnapshot', [
+    'fee_per_second',
+    'is_active',
+    'last_activated_by',
+    'session_ends_at',
+    'token_address',
+    'time_remaining',
+    'token_name',
+    'token_symbol',
+    'token_decimals',
+    'device_name',
+    'device_description',
+    'use_native_token',
+    'last_user_was_whitelisted',
+    'whitelist_fee_per_second',
+    'chain_id',
+    'fetched_at',
+])
+
+# Snapshot field -> device contract view function, for the state that changes per session
+DYNAMIC_STATE_FUNCTIONS = {
+    'fee_per_second': 'feePerSecond',
+    'whitelist_fee_per_second': 'whitelistFeePerSecond',
+    'is_active': 'isActive',
+    'last_activated_by': 'lastActivatedBy',
+    'session_ends_at': 'sessionEndsAt',
+    'last_user_was_whitelisted': 'lastUserWasWhitelisted',
+    'token_address': 'token',
+}
+
+# Posted to the queue instead of a snapshot when a fetch fails
+FetchError = namedtuple('FetchError', ['message', 'fetched_at'])
+
+
+def read_device_snapshot(contract, chain_id=None, metadata_cache=None):
+    """
+    Read the current device state from the contract in a single round-trip
+
+    Args:
+        contract: web3 contract bound to CONTRACT_ABI
+        chain_id (int, optional): Chain ID the contract lives on; fetched in
+            the same batch when not known yet
+        metadata_cache (MetadataCache, optional): When given (with a known chain_id),
+            only the per-session state is read and names/token details come from the cache
+
+    Returns:
+        DeviceSnapshot: Current device state
+    """
+    if metadata_cache is not None and chain_id is not None:
+        return _read_cached_snapshot(contract, chain_id, metadata_cache)
+
+    reader = BatchReader(contract.w3)
+    # Get device info with zero address to get general info
+    info_index = reader.add(contract, 'getDeviceInfo', ZERO_ADDRESS)
+    details_index = reader.add(contract, 'getDeviceDetails')
+    chain_index = None
+    if chain_id is None:
+        chain_index = reader.add_request('eth_chainId', formatter=lambda value: int(value, 16))
+    results = reader.execute()
+
+    device_info = results[info_index]
+    device_details = results[details_index]
+    if chain_index is not None:
+        chain_id = results[chain_index]
+
+    return DeviceSnapshot(
+        fee_per_second=device_info[0],
+        is_active=device_info[1],
+        last_activated_by=device_info[2],
+        session_ends_at=device_info[3],
+        token_address=device_info[4],
+        time_remaining=device_info[6],
+        token_name=device_info[7],
+        token_symbol=device_info[8],
+        token_decimals=device_info[9],
+        device_name=device_details[0],
+        device_description=device_details[1],
+        use_native_token=device_details[2],
+        last_user_was_whitelisted=device_details[3],
+        whitelist_fee_per_second=device_details[4],
+        chain_id=chain_id,
+        fetched_at=time.time(),
+    )
+
+
+def queue_state_reads(reader, contract, address=None):
+    """
+    Add the per-session state reads for one device to a BatchReader
+
+    Args:
+        reader (BatchReader): Batch to add to
+        contract: web3 contract carrying CONTRACT_ABI (may be unbound when `address` is given)
+        address (str, optional): Device address, overriding contract.address
+
+    Returns:
+        dict: {field: result index}
+    """
+    return {field: reader.add(contract, fn_name, address=address)
+            for field, fn_name in DYNAMIC_STATE_FUNCTIONS.items()}
+
+
+def build_snapshot(state, metadata, chain_id, fetched_at=None):
+    """Combine per-session state and cached metadata into a DeviceSnapshot"""
+    if fetched_at is None:
+        fetched_at = time.time()
+    return DeviceSnapshot(
+        fee_per_second=state['fee_per_second'],
+        is_active=state['is_active'],
+        last_activated_by=state['last_activated_by'],
+        session_ends_at=state['session_ends_at'],
+        token_address=state['token_address'],
+        time_remaining=max(0, state['session_ends_at'] - int(fetched_at)) if state['is_active'] else 0,
+        token_name=metadata['token_name'],
+        token_symbol=metadata['token_symbol'],
+        token_decimals=metadata['token_decimals'],
+        device_name=metadata['device_name'],
+        device_description=metadata['device_description'],
+        use_native_token=metadata['use_native_token'],
+        last_user_was_whitelisted=state['last_user_was_whitelisted'],
+        whitelist_fee_per_second=state['whitelist_fee_per_second'],
+        chain_id=chain_id,
+        fetched_at=fetched_at,
+    )
+
+
+def _read_cached_snapshot(contract, chain_id, metadata_cache):
+    metadata = metadata_cache.get(chain_id, contract.address)
+
+    reader = BatchReader(contract.w3)
+    state_indexes = queue_state_reads(reader, contract)
+    metadata_indexes = queue_metadata_reads(reader, contract) if metadata is None else None
+    results = reader.execute()
+    state = {field: results[index] for field, index in state_indexes.items()}
+
+    if metadata_indexes is not None:
+        metadata = collect_metadata(results, metadata_indexes)
+        metadata_cache.put(chain_id, contract.address, metadata)
+    elif metadata['token_address'].lower() != state['token_address'].lower():
+        # setToken() emits no event; a different token address is the only signal
+        metadata_cache.invalidate(chain_id, contract.address)
+        metadata = get_device_metadata(contract, chain_id, metadata_cache)
+
+    return build_snapshot(state, metadata, chain_id)
+
+
+class SessionExpiryScheduler:
+    """
+    Fires callbacks at session end times from one background thread
+
+    Deadlines live in a heap keyed by an arbitrary hashable key (typically one
+    per device). Arming a key again replaces its deadline, so an extended
+    session simply moves its timer; superseded heap entries are skipped when
+    they surface. One scheduler can serve any number of devices.
+    """
+
+    def __init__(self):
+        self._heap = []  # (deadline, seq, key)
+        self._armed = {}  # key -> (deadline, seq, callback, args)
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = True
+
+    def __len__(self):
+        with self._condition:
+            return len(self._armed)
+
+    def arm(self, key, deadline, callback, *args):
+        """
+        Call callback(*args) at `deadline` (epoch seconds), replacing any deadline armed for `key`
+
+        Returns:
+            bool: False if the key was already armed for the same deadline (nothing changed)
+        """
+        with self._condition:
+            current = self._armed.get(key)
+            if current is not None and current[0] == deadline:
+                return False
+            seq = next(self._seq)
+            self._armed[key] = (deadline, seq, callback, args)
+            heapq.heappush(self._heap, (deadline, seq, key))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SessionExpiry", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return True
+
+    def cancel(self, key):
+        """Forget the deadline armed for `key`, if any"""
+        with self._condition:
+            self._armed.pop(key, None)
+
+    def clear(self):
+        """Forget every armed deadline"""
+        with self._condition:
+            self._armed.clear()
+            self._heap = []
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def _next_due(self):
+        """Block until a deadline is due; returns its (callback, args), or None when stopped"""
+        with self._condition:
+            while self._running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, seq, key = self._heap[0]
+                armed = self._armed.get(key)
+                if armed is None or armed[1] != seq:
+                    heapq.heappop(self._heap)  # Cancelled or re-armed since
+                    continue
+                delay = deadline - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                del self._armed[key]
+                return armed[2], armed[3]
+        return None
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            if due is None:
+                return
+            callback, args = due
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Session expiry callback failed: {e}")
+
+
+class TransitionDetector:
+    """Detects enable/disable transitions between consecutive device states"""
+
+    def __init__(self, on_transition, expiry_scheduler=None, warning_lead=0):
+        """
+        Args:
+            on_transition (callable): Called as on_transition(action, user_address, is_whitelisted)
+                with action 'enable', 'disable' or 'expiry_warning'
+            expiry_scheduler (SessionExpiryScheduler, optional): When given, an active
+                session is disabled locally at its session_ends_at instead of on the
+                first poll after it; polling then only reconciles
+            warning_lead (float): Seconds before session_ends_at to fire 'expiry_warning'
+                (needs expiry_scheduler; 0 turns it off)
+        """
+        self.on_transition = on_transition
+        self.expiry_scheduler = expiry_scheduler
+        self.warning_lead = warning_lead
+        self._warning_key = (self, 'expiry_warning')
+        self.last_state = None
+        self._expired_ends_at = None  # session_ends_at of the session the scheduler already closed
+        self._lock = threading.Lock()
+
+    def observe(self, is_active, user_address, is_whitelisted, session_ends_at=None):
+        """Record a new state and fire the transition callback if it changed"""
+        current_state = {
+            'is_active': is_active,
+            'user_address': user_address,
+            'is_whitelisted': is_whitelisted,
+            'session_ends_at': session_ends_at
+        }
+
+        with self._lock:
+            previous_state = self.last_state
+            self.last_state = current_state
+
+        if self.expiry_scheduler is not None:
+            if is_active and session_ends_at:
+                # Arms on activation, moves the timer if the session was extended
+                self.expiry_scheduler.arm(self, session_ends_at, self._expire, session_ends_at)
+                warn_at = session_ends_at - self.warning_lead
+                if self.warning_lead and warn_at > time.time():
+                    self.expiry_scheduler.arm(self._warning_key, warn_at, self._warn, session_ends_at)
+                else:
+                    self.expiry_scheduler.cancel(self._warning_key)
+            else:
+                self.expiry_scheduler.cancel(self)
+                self.expiry_scheduler.cancel(self._warning_key)
+
+        if previous_state is None:
+            return None
+
+        # Device enabled (inactive -> active)
+        if not previous_state['is_active'] and current_state['is_active']:
+            self.on_transition('enable', current_state['user_address'], current_state['is_whitelisted'])
+            return 'enable'
+
+        # Device disabled (active -> inactive)
+        if previous_state['is_active'] and not current_state['is_active']:
+            self.on_transition('disable', previous_state['user_address'], previous_state['is_whitelisted'])
+            return 'disable'
+
+        return None
+
+    def observe_snapshot(self, snapshot):
+        """Convenience wrapper around observe() for a DeviceSnapshot"""
+        is_active = snapshot.is_active and snapshot.session_ends_at > int(snapshot.fetched_at)
+        if is_active and snapshot.session_ends_at == self._expired_ends_at:
+            # Read just before the local expiry fired; the session is already over
+            is_active = False
+        return self.observe(is_active, snapshot.last_activated_by, snapshot.last_user_was_whitelisted,
+                            snapshot.session_ends_at)
+
+    def _expire(self, session_ends_at):
+        """Scheduler callback: close the session if it is still the one that was armed"""
+        with self._lock:
+            state = self.last_state
+            if state is None or not state['is_active'] or state['session_ends_at'] != session_ends_at:
+                return
+            self.last_state = dict(state, is_active=False)
+            self._expired_ends_at = session_ends_at
+        self.on_transition('disable', state['user_address'], state['is_whitelisted'])
+
+    def _warn(self, session_ends_at):
+        """Scheduler callback: announce the session end if that session is still running"""
+        with self._lock:
+            state = self.last_state
+            if state is None or not state['is_active'] or state['session_ends_at'] != session_ends_at:
+                return
+        self.on_transition('expiry_warning', state['user_address'], state['is_whitelisted'])
+
+
+class AdaptivePollInterval:
+    """
+    Chooses the delay before the next status read from what the last one showed
+
+    - Idle device, no events: the delay grows by `idle_growth` per quiet poll up to `idle_interval`
+    - Active session: the base interval, shortened so one read lands just before
+      sessionEndsAt (catches extensions) and one just after it (confirms the expiry)
+    - RPC errors: exponential backoff from the base interval up to `max_backoff`
+    Delays are rounded up to whole blocks, since reading faster than the chain
+    produces blocks only returns the same state again.
+    """
+
+    def __init__(self, base_interval, block_time=None, idle_interval=None, idle_growth=1.5,
+                 max_backoff=300.0, rate_window=300.0):
+        """
+        Args:
+            base_interval (float): The configured fixed interval (seconds)
+            block_time (float, optional): Chain block time; also the minimum delay
+            idle_interval (float, optional): Longest delay while idle (default 6x base)
+            idle_growth (float): Factor the delay grows by per quiet idle poll
+            max_backoff (float): Longest delay after repeated errors
+            rate_window (float): Seconds of history used for calls_per_minute()
+        """
+        self.base_interval = base_interval
+        self.block_time = block_time
+        self.idle_interval = idle_interval if idle_interval is not None else base_interval * 6
+        self.idle_growth = idle_growth
+        self.max_backoff = max_backoff
+        self.rate_window = rate_window
+        self.errors = 0
+        self.idle_streak = 0
+        self.last_active = None
+        self._calls = deque()
+
+    def _align(self, delay):
+        minimum = self.block_time or 1.0
+        if self.block_time:
+            delay = math.ceil(delay / self.block_time - 1e-9) * self.block_time
+        return max(minimum, delay)
+
+    def next_interval(self, snapshot=None, error=False, events_pending=False, now=None):
+        """
+        Args:
+            snapshot (DeviceSnapshot, optional): Result of the read that just finished
+            error (bool): The read failed
+            events_pending (bool): Contract events arrived since the last read
+            now (float, optional): Current time (defaults to time.time())
+
+        Returns:
+            float: Seconds to wait before the next read
+        """
+        if error:
+            # Capped: 2 ** errors overflows a float after ~1000 errors, long past max_backoff
+            self.errors = min(self.errors + 1, 32)
+            return min(self.max_backoff, self.base_interval * 2 ** self.errors)
+        self.errors = 0
+
+        if snapshot is None:
+            return self._align(self.base_interval)
+        if now is None:
+            now = time.time()
+
+        remaining = snapshot.session_ends_at - now if snapshot.is_active else 0
+        is_active = remaining > 0
+        if is_active != self.last_active or events_pending:
+            self.idle_streak = 0  # Something happened; stay attentive
+        self.last_active = is_active
+
+        if is_active:
+            margin = self.block_time or 1.0
+            if remaining > self.base_interval:
+                delay = min(self.base_interval, remaining - margin)
+            elif remaining > 2 * margin:
+                delay = remaining - margin  # just before the end
+            else:
+                delay = remaining + margin  # just after the end
+            return self._align(delay)
+
+        if events_pending:
+            return self._align(self.base_interval)
+        self.idle_streak += 1
+        delay = self.base_interval * self.idle_growth ** (self.idle_streak - 1)
+        return self._align(min(self.idle_interval, delay))
+
+    def record_call(self, now=None):
+        """Count one status read (one batched RPC round-trip)"""
+        if now is None:
+            now = time.time()
+        self._calls.append(now)
+        while self._calls and self._calls[0] < now - self.rate_window:
+            self._calls.popleft()
+
+    def calls_per_minute(self, now=None):
+        """Effective status reads per minute over the last `rate_window` seconds"""
+        if now is None:
+            now = time.time()
+        calls = [t for t in list(self._calls) if t >= now - self.rate_window]
+        if len(calls) < 2:
+            return 0.0
+        span = max(now - calls[0], self.base_interval)
+        return len(calls) * 60.0 / span
+
+    def fixed_calls_per_minute(self):
+        """Reads per minute the fixed base interval would have cost"""
+        return 60.0 / self.base_interval
+
+
+class StatusFetcher(threading.Thread):
+    """
+    Background thread that polls a device contract and posts snapshots to a queue
+
+    RPC latency only ever blocks this thread; the consumer just drains the queue.
+    With an event watcher attached, transitions come from contract logs and the
+    full state is only re-read when an event arrives or every `reconcile_interval`.
+    """
+
+    def __init__(self, contract, chain_id, out_queue, interval=10.0, detector=None,
+                 event_watcher=None, reconcile_interval=60.0, metadata_cache=None,
+                 metadata_watcher=None, poll_interval=None):
+        """
+        Args:
+            contract: web3 contract bound to CONTRACT_ABI
+            chain_id (int): Chain ID the contract lives on
+            out_queue (queue.Queue): Receives DeviceSnapshot or FetchError items
+            interval (float): Seconds between polls
+            detector (TransitionDetector, optional): Fed every successful snapshot (polling mode)
+            event_watcher (DeviceEventWatcher, optional): Enables log-ingestion mode
+            reconcile_interval (float): Seconds between full state reads in log-ingestion mode
+            metadata_cache (MetadataCache, optional): Serve names/token details from the cache
+            metadata_watcher (DeviceEventWatcher, optional): Checked every `reconcile_interval`
+                in polling mode so metadata-changing events still invalidate the cache
+            poll_interval (AdaptivePollInterval, optional): Varies the delay between polls
+                instead of always waiting `interval`
+        """
+        super().__init__(name="StatusFetcher", daemon=True)
+        self.contract = contract
+        self.chain_id = chain_id
+        self.out_queue = out_queue
+        self.interval = interval
+        self.detector = detector
+        self.event_watcher = event_watcher
+        self.reconcile_interval = reconcile_interval
+        self.metadata_cache = metadata_cache
+        self.metadata_watcher = metadata_watcher
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    def read_snapshot(self):
+        return read_device_snapshot(self.contract, self.chain_id, self.metadata_cache)
+
+    def run(self):
+        last_snapshot_at = None
+        last_metadata_check = None
+        snapshot = None
+        while not self._stop_event.is_set():
+            error = False
+            events = None
+            try:
+                if self.event_watcher is not None:
+                    events = self.event_watcher.poll()
+                    self.event_watcher.check_expiry()
+                    due = (last_snapshot_at is None or
+                           time.time() - last_snapshot_at >= self.reconcile_interval)
+                    if events or due:
+                        snapshot = self.read_snapshot()
+                        self._post(snapshot)
+                        last_snapshot_at = time.time()
+                else:
+                    if self.metadata_watcher is not None and (
+                            last_metadata_check is None or
+                            time.time() - last_metadata_check >= self.reconcile_interval):
+                        self.metadata_watcher.poll()
+                        last_metadata_check = time.time()
+                    snapshot = self.read_snapshot()
+                    if self.detector is not None and not self._stop_event.is_set():
+                        self.detector.observe_snapshot(snapshot)
+                    self._post(snapshot)
+            except Exception as e:
+                error = True
+                self._post(FetchError(str(e), time.time()))
+
+            delay = self.interval
+            if self.poll_interval is not None:
+                self.poll_interval.record_call()
+                delay = self.poll_interval.next_interval(snapshot, error=error, events_pending=bool(events))
+            self._stop_event.wait(delay)
+
+    def _post(self, item):
+        # A stopped fetcher may still finish an in-flight read; its result is stale
+        if not self._stop_event.is_set():
+            self.out_queue.put(item)
+
+    def stop(self):
+        """Ask the thread to exit after the current poll"""
+        self._stop_event.set()
+
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+
+class PollingEngine:
+    """
+    Single owner of the status fetchers: at most one running poller per key
+
+    Starting a key that already has a poller stops the old one first, so a
+    reconnect or restart can never leave two loops polling the same device.
+    Stopped fetchers that are still finishing an RPC call are counted by
+    active_pollers() until they exit, so leaked loops stay visible.
+    """
+
+    def __init__(self):
+        self._fetchers = {}  # key -> StatusFetcher
+        self._retiring = []  # stopped fetchers whose thread has not exited yet
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._fetchers)
+
+    def get(self, key):
+        """Return the running fetcher for `key`, or None"""
+        with self._lock:
+            return self._fetchers.get(key)
+
+    def start(self, key, fetcher):
+        """Start `fetcher` as the only poller for `key`, stopping any previous one"""
+        with self._lock:
+            self._retire(self._fetchers.pop(key, None))
+            self._fetchers[key] = fetcher
+            fetcher.start()
+        return fetcher
+
+    def stop(self, key):
+        """Stop the poller for `key`; returns False if there was none"""
+        with self._lock:
+            fetcher = self._fetchers.pop(key, None)
+            self._retire(fetcher)
+        return fetcher is not None
+
+    def stop_all(self):
+        with self._lock:
+            for fetcher in self._fetchers.values():
+                self._retire(fetcher)
+            self._fetchers.clear()
+
+    def join(self, timeout=None):
+        """Wait for stopped fetchers to exit (e.g. on shutdown)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            retiring = list(self._retiring)
+        for fetcher in retiring:
+            fetcher.join(None if deadline is None else max(0, deadline - time.time()))
+
+    def _retire(self, fetcher):
+        if fetcher is not None:
+            fetcher.stop()
+            self._retiring.append(fetcher)
+
+    def active_pollers(self):
+        """Number of fetcher threads still alive, including stopped ones finishing a read"""
+        with self._lock:
+            self._retiring = [fetcher for fetcher in self._retiring if fetcher.is_alive()]
+            return sum(1 for fetcher in self._fetchers.values() if fetcher.is_alive()) + len(self._retiring)
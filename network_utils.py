@@ -3,6 +3,14 @@ Network configuration and utilities for InfraLink
 Handles multi-chain compatibility and proper fee calculations
 """
 
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+try:
+    import numpy as np  # optional; bulk pricing runs on int64 arrays when available
+except ImportError:
+    np = None
+
 # Network configurations
 NETWORK_CONFIG = {
     # Ethereum Mainnet
@@ -11,7 +19,13 @@ NETWORK_CONFIG = {
         'currency': 'ETH',
         'decimals': 18,
         'rpc_url': 'https://mainnet.infura.io/v3/YOUR_PROJECT_ID',
-        'explorer': 'https://etherscan.io'
+        'rpc_urls': [
+            'https://mainnet.infura.io/v3/YOUR_PROJECT_ID',
+            'https://ethereum-rpc.publicnode.com',
+            'https://cloudflare-eth.com',
+        ],
+        'explorer': 'https://etherscan.io',
+        'block_time': 12  # seconds
     },
     # Ethereum Goerli Testnet
     5: {
@@ -19,7 +33,9 @@ NETWORK_CONFIG = {
         'currency': 'ETH',
         'decimals': 18,
         'rpc_url': 'https://goerli.infura.io/v3/YOUR_PROJECT_ID',
-        'explorer': 'https://goerli.etherscan.io'
+        'rpc_urls': ['https://goerli.infura.io/v3/YOUR_PROJECT_ID'],
+        'explorer': 'https://goerli.etherscan.io',
+        'block_time': 12  # seconds
     },
     # Ethereum Sepolia Testnet
     11155111: {
@@ -27,7 +43,13 @@ NETWORK_CONFIG = {
         'currency': 'ETH',
         'decimals': 18,
         'rpc_url': 'https://sepolia.infura.io/v3/YOUR_PROJECT_ID',
-        'explorer': 'https://sepolia.etherscan.io'
+        'rpc_urls': [
+            'https://sepolia.infura.io/v3/YOUR_PROJECT_ID',
+            'https://ethereum-sepolia-rpc.publicnode.com',
+            'https://rpc.sepolia.org',
+        ],
+        'explorer': 'https://sepolia.etherscan.io',
+        'block_time': 12  # seconds
     },
     # Hedera Mainnet
     295: {
@@ -35,7 +57,10 @@ NETWORK_CONFIG = {
         'currency': 'HBAR',
         'decimals': 8,
         'rpc_url': 'https://mainnet.hashio.io/api',
-        'explorer': 'https://hashscan.io/mainnet'
+        'rpc_urls': ['https://mainnet.hashio.io/api', 'https://295.rpc.thirdweb.com'],
+        'explorer': 'https://hashscan.io/mainnet',
+        'block_time': 2,  # seconds
+        'legacy_gas': True  # JSON-RPC relay prices gas with gasPrice only
     },
     # Hedera Testnet
     296: {
@@ -43,7 +68,10 @@ NETWORK_CONFIG = {
         'currency': 'HBAR',
         'decimals': 8,
         'rpc_url': 'https://testnet.hashio.io/api',
-        'explorer': 'https://hashscan.io/testnet'
+        'rpc_urls': ['https://testnet.hashio.io/api', 'https://296.rpc.thirdweb.com'],
+        'explorer': 'https://hashscan.io/testnet',
+        'block_time': 2,  # seconds
+        'legacy_gas': True  # JSON-RPC relay prices gas with gasPrice only
     },
     # Polygon Mainnet
     137: {
@@ -51,7 +79,9 @@ NETWORK_CONFIG = {
         'currency': 'MATIC',
         'decimals': 18,
         'rpc_url': 'https://polygon-rpc.com/',
-        'explorer': 'https://polygonscan.com'
+        'rpc_urls': ['https://polygon-rpc.com/', 'https://polygon-bor-rpc.publicnode.com'],
+        'explorer': 'https://polygonscan.com',
+        'block_time': 2  # seconds
     },
     # BSC Mainnet
     56: {
@@ -59,7 +89,13 @@ NETWORK_CONFIG = {
         'currency': 'BNB',
         'decimals': 18,
         'rpc_url': 'https://bsc-dataseed.binance.org/',
-        'explorer': 'https://bscscan.com'
+        'rpc_urls': [
+            'https://bsc-dataseed.binance.org/',
+            'https://bsc-dataseed1.defibit.io/',
+            'https://bsc-rpc.publicnode.com',
+        ],
+        'explorer': 'https://bscscan.com',
+        'block_time': 3  # seconds
     },
     # Avalanche Mainnet
     43114: {
@@ -67,7 +103,12 @@ NETWORK_CONFIG = {
         'currency': 'AVAX',
         'decimals': 18,
         'rpc_url': 'https://api.avax.network/ext/bc/C/rpc',
-        'explorer': 'https://snowtrace.io'
+        'rpc_urls': [
+            'https://api.avax.network/ext/bc/C/rpc',
+            'https://avalanche-c-chain-rpc.publicnode.com',
+        ],
+        'explorer': 'https://snowtrace.io',
+        'block_time': 2  # seconds
     }
 }
 
@@ -78,49 +119,189 @@ def get_network_info(chain_id):
         'currency': 'UNKNOWN',
         'decimals': 18,  # Default to 18 decimals
         'rpc_url': None,
-        'explorer': None
+        'rpc_urls': [],
+        'explorer': None,
+        'block_time': None  # Unknown; pollers fall back to their own minimum
     })
 
-def calculate_fee_for_network(human_fee_per_second, chain_id):
+def get_rpc_urls(chain_id):
     """
-    Calculate the fee in smallest units for a given network
+    Get every known RPC endpoint of a network, primary first
     
     Args:
-        human_fee_per_second (float): Fee in human-readable format (e.g., 0.001)
         chain_id (int): Network chain ID
         
     Returns:
-        int: Fee in smallest units (wei, tinybars, etc.)
+        list: RPC URLs (empty if the network is unknown)
     """
     network = get_network_info(chain_id)
-    return int(human_fee_per_second * (10 ** network['decimals']))
+    return list(network.get('rpc_urls') or ([network['rpc_url']] if network.get('rpc_url') else []))
 
-def format_native_amount(amount, chain_id, contract_decimals=None):
+def get_block_time(chain_id):
     """
-    Format native token amount for display
+    Get the typical block interval of a network
     
     Args:
-        amount (int): Amount in smallest units
         chain_id (int): Network chain ID
-        contract_decimals (int, optional): Decimals from contract (overrides network default)
         
     Returns:
-        str: Formatted amount with appropriate precision
+        float: Seconds between blocks, or None if unknown
     """
-    network = get_network_info(chain_id)
-    decimals = contract_decimals if contract_decimals is not None else network['decimals']
+    return get_network_info(chain_id).get('block_time')
+
+def uses_legacy_gas(chain_id):
+    """
+    Check whether a network needs legacy (gasPrice) transactions instead of EIP-1559 fees
+    
+    Args:
+        chain_id (int): Network chain ID
+        
+    Returns:
+        bool: True for networks marked legacy; unknown networks return False
+            and are detected from the latest block instead
+    """
+    return bool(get_network_info(chain_id).get('legacy_gas'))
+
+# Amounts are converted with integer arithmetic only: wei-scale values exceed
+# float precision (2^53) and float fees like 0.0003 * 10**18 come out one unit short.
+# Per-decimals scale tables: decimals -> (10**decimals, {places: (step, 10**places)})
+_scale_tables = {}
+
+@lru_cache(maxsize=None)
+def _pow10(exponent):
+    return 10 ** exponent
+
+def _scale_table(decimals):
+    table = _scale_tables.get(decimals)
+    if table is None:
+        steps = {places: (_pow10(decimals - places), _pow10(places)) for places in range(decimals + 1)}
+        table = (_pow10(decimals), steps)
+        _scale_tables[decimals] = table
+    return table
+
+@lru_cache(maxsize=4096)
+def format_units(amount, decimals, places=None, trim=False):
+    """
+    Format an integer amount of smallest units exactly (no float conversion)
     
+    Args:
+        amount (int): Amount in smallest units (wei, tinybars, ...)
+        decimals (int): Decimals of the token
+        places (int, optional): Fraction digits; by default 6 for amounts of 1
+            or more and 8 below, rounded half to even like float formatting
+        trim (bool): Drop trailing fraction zeros (and the point if nothing is left)
+        
+    Returns:
+        str: e.g. format_units(1500000000000000000, 18) -> "1.500000"
+    """
+    return _format_units(amount, decimals, places, trim)
+
+def _format_units(amount, decimals, places, trim):
+    """format_units() without the memo, for one-off amounts like bulk pricing output"""
+    amount = int(amount)
     if amount == 0:
         return "0"
+    scale, steps = _scale_table(decimals)
+    sign = "-" if amount < 0 else ""
+    amount = abs(amount)
+    if places is None:
+        places = 6 if amount >= scale else 8
     
-    # Convert to decimal with proper precision
-    decimal_amount = amount / (10 ** decimals)
+    if places >= decimals:
+        whole, fraction = divmod(amount, scale)
+        digits = str(fraction).rjust(decimals, "0") + "0" * (places - decimals) if decimals else "0" * places
+    else:
+        step, place_scale = steps[places]
+        units, remainder = divmod(amount, step)
+        if remainder * 2 > step or (remainder * 2 == step and units & 1):
+            units += 1
+        whole, fraction = divmod(units, place_scale)
+        digits = str(fraction).rjust(places, "0") if places else ""
     
-    # Format with appropriate decimal places
-    if decimal_amount >= 1:
-        return f"{decimal_amount:.6f}"
+    if trim:
+        digits = digits.rstrip("0")
+    return f"{sign}{whole}.{digits}" if digits else f"{sign}{whole}"
+
+def parse_units(value, decimals, truncate=False):
+    """
+    Convert a human amount to integer smallest units exactly
+    
+    Args:
+        value (str, int, float or Decimal): e.g. "0.001"; floats are taken by their
+            shortest repr, so 0.0003 means exactly 0.0003
+        decimals (int): Decimals of the token
+        truncate (bool): Drop digits beyond `decimals` instead of raising
+        
+    Returns:
+        int: Amount in smallest units
+        
+    Raises:
+        ValueError: If value is not a number, or has more digits than the token
+            can represent (unless truncate)
+    """
+    if isinstance(value, int):
+        return value * _pow10(decimals)
+    try:
+        number = value if isinstance(value, Decimal) else Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Not an amount: {value!r}")
+    if not number.is_finite():
+        raise ValueError(f"Not an amount: {value!r}")
+    
+    sign, digits, exponent = number.as_tuple()
+    units = int("".join(map(str, digits)) or "0")
+    shift = decimals + exponent
+    if shift >= 0:
+        units *= _pow10(shift)
     else:
-        return f"{decimal_amount:.8f}"
+        units, remainder = divmod(units, _pow10(-shift))
+        if remainder and not truncate:
+            raise ValueError(f"{value} has more than {decimals} decimals")
+    return -units if sign else units
+
+def to_decimal(amount, decimals):
+    """
+    Exact Decimal value of an integer amount of smallest units
+    
+    Args:
+        amount (int): Amount in smallest units
+        decimals (int): Decimals of the token
+        
+    Returns:
+        Decimal: e.g. to_decimal(1, 18) -> Decimal('1E-18')
+    """
+    return Decimal(int(amount)).scaleb(-decimals)
+
+def calculate_fee_for_network(human_fee_per_second, chain_id):
+    """
+    Calculate the fee in smallest units for a given network
+    
+    Args:
+        human_fee_per_second (float, str or Decimal): Fee in human-readable format (e.g., 0.001)
+        chain_id (int): Network chain ID
+        
+    Returns:
+        int: Fee in smallest units (wei, tinybars, etc.); digits beyond the
+            network's decimals are dropped
+    """
+    network = get_network_info(chain_id)
+    return parse_units(human_fee_per_second, network['decimals'], truncate=True)
+
+def format_native_amount(amount, chain_id, contract_decimals=None):
+    """
+    Format native token amount for display
+    
+    Args:
+        amount (int): Amount in smallest units
+        chain_id (int): Network chain ID
+        contract_decimals (int, optional): Decimals from contract (overrides network default)
+        
+    Returns:
+        str: Formatted amount with appropriate precision (6 decimals from 1
+            upwards, 8 below), computed exactly
+    """
+    decimals = contract_decimals if contract_decimals is not None else get_network_info(chain_id)['decimals']
+    return format_units(amount, decimals)
 
 def get_currency_symbol(chain_id, contract_symbol=None):
     """
@@ -160,7 +341,7 @@ def validate_deployment_fee(human_fee, chain_id):
         'human_fee': f"{human_fee} {network['currency']}/second",
         'contract_fee': fee_in_smallest,
         'example_10min_cost': fee_in_smallest * 600,
-        'example_10min_human': f"{human_fee * 600} {network['currency']}"
+        'example_10min_human': f"{format_units(fee_in_smallest * 600, network['decimals'], trim=True)} {network['currency']}"
     }
 
 # Pre-calculated fee examples for common rates
@@ -216,6 +397,226 @@ def get_suggested_fee(chain_id, rate_level='low'):
     
     return COMMON_FEES[rate_level].get(chain_id, COMMON_FEES[rate_level][1])  # Default to Ethereum rate
 
+# Bulk pricing: items formatted per chunk, bounding the temporary arrays
+BULK_CHUNK_SIZE = 65536
+_INT64_MAX = 2 ** 63 - 1
+
+def _is_sequence(values):
+    return isinstance(values, (list, tuple, range)) or (np is not None and isinstance(values, np.ndarray)
+                                                        and values.ndim > 0)
+
+def _split_pow10(units, decimals):
+    """(m, k) with units == m * 10**k, k as large as possible but at most decimals"""
+    shift = 0
+    while units and shift < decimals and units % 10 == 0:
+        units //= 10
+        shift += 1
+    return units, shift
+
+def _multiply(values, factor):
+    """values * factor, exactly: int64 while it fits, Python integers (object dtype) beyond"""
+    if np is None:
+        return [value * factor for value in values]
+    if values.dtype == np.int64 and len(values):
+        bound = max(abs(int(values.max())), abs(int(values.min())))
+        if bound * abs(factor) <= _INT64_MAX:
+            return values * factor
+    elif values.dtype == np.int64:
+        return values.copy()
+    return values.astype(object) * factor
+
+def _format_int64(amounts, decimals, places, trim):
+    """format_units() over an int64 array of non-negative amounts: vector rounding, one format per item"""
+    scale, steps = _scale_table(decimals)
+    formatted = np.empty(len(amounts), dtype=object)
+    if places is None:
+        groups = [(6, amounts >= scale), (8, amounts < scale)]
+    else:
+        groups = [(places, slice(None))]
+    for group_places, selection in groups:
+        group = amounts[selection]
+        if not len(group):
+            continue
+        if group_places >= decimals:
+            whole, fraction = np.divmod(group, scale)
+            width, padding = decimals, "0" * (group_places - decimals)
+        else:
+            step, place_scale = steps[group_places]
+            units, remainder = np.divmod(group, step)
+            # Round half to even, like format_units
+            units += (remainder * 2 > step) | ((remainder * 2 == step) & (units % 2 == 1))
+            whole, fraction = np.divmod(units, place_scale)
+            width, padding = group_places, ""
+        # NumPy's int-to-str casts are slower than one format per item on the int lists
+        if not width:
+            suffix = "." + padding if padding and not trim else ""
+            text = [f"{whole_part}{suffix}" for whole_part in whole.tolist()]
+        elif trim:
+            text = [f"{whole_part}.{fraction_part:0{width}d}{padding}".rstrip("0").rstrip(".")
+                    for whole_part, fraction_part in zip(whole.tolist(), fraction.tolist())]
+        else:
+            text = [f"{whole_part}.{fraction_part:0{width}d}{padding}"
+                    for whole_part, fraction_part in zip(whole.tolist(), fraction.tolist())]
+        formatted[selection] = text
+    formatted[amounts == 0] = "0"
+    return formatted.tolist()
+
+def _format_many(amounts, decimals, places, trim):
+    """Formatted strings for a list or array of amounts sharing one decimals value"""
+    vectorized = (np is not None and amounts.dtype == np.int64 and decimals <= 18
+                  and (places is None or places <= 18) and (not len(amounts) or amounts.min() >= 0))
+    if not vectorized:
+        values = amounts.tolist() if np is not None else amounts
+        return [_format_units(amount, decimals, places, trim) for amount in values]
+    formatted = []
+    for start in range(0, len(amounts), BULK_CHUNK_SIZE):
+        formatted.extend(_format_int64(amounts[start:start + BULK_CHUNK_SIZE], decimals, places, trim))
+    return formatted
+
+def calculate_costs(fees, durations, chain_ids, human_fees=False, places=None, trim=False, formatted=True):
+    """
+    Exact costs (fee per second * seconds) for many combinations in one call
+    
+    Each argument is a scalar or a sequence (list, tuple, NumPy array); every
+    sequence must have the same length and scalars are repeated to match it.
+    Items are grouped by (fee, chain). Each group's fee is split into
+    m * 10**k, so costs are m * seconds in plain int64 arithmetic (NumPy) and
+    are formatted against decimals - k, which stays exact for 18-decimal
+    amounts far beyond int64. Values that still do not fit fall back to
+    Python integers.
+    
+    Args:
+        fees: Fee per second per item, in smallest units (or human amounts such
+            as 0.001 or "0.001" with human_fees, converted per chain like
+            calculate_fee_for_network)
+        durations: Seconds per item
+        chain_ids: Chain per item; decides the decimals
+        human_fees (bool): Fees are human amounts
+        places (int, optional): Fraction digits of the formatted costs (default
+            like format_native_amount: 6 from 1 upwards, 8 below)
+        trim (bool): Drop trailing fraction zeros from the formatted costs
+        formatted (bool): Also build the formatted strings
+        
+    Returns:
+        dict: {'fees': fees in smallest units, 'costs': costs in smallest units,
+            'formatted': list of cost strings (None unless formatted)};
+            'fees' and 'costs' are NumPy arrays (int64, or object for larger
+            values) when NumPy is installed, lists otherwise
+            
+    Raises:
+        ValueError: If sequence lengths differ, or a fee is not a number
+    """
+    lengths = {len(values) for values in (fees, durations, chain_ids) if _is_sequence(values)}
+    if len(lengths) > 1:
+        raise ValueError(f"fees, durations and chain_ids have different lengths: {sorted(lengths)}")
+    length = lengths.pop() if lengths else 1
+    
+    if np is not None:
+        durations = np.asarray(durations) if _is_sequence(durations) else np.full(length, int(durations))
+        if len(durations) and (durations.dtype.kind not in 'iu' or int(durations.max()) > _INT64_MAX):
+            durations = np.array([int(seconds) for seconds in durations.tolist()], dtype=object)
+        elif durations.dtype != np.int64:
+            durations = durations.astype(np.int64)
+    else:
+        durations = [int(seconds) for seconds in durations] if _is_sequence(durations) else [int(durations)] * length
+    
+    # Group item positions by (fee, chain); None means "every item"
+    if _is_sequence(fees) or _is_sequence(chain_ids):
+        fee_list = fees.tolist() if np is not None and isinstance(fees, np.ndarray) else fees
+        chain_list = chain_ids.tolist() if np is not None and isinstance(chain_ids, np.ndarray) else chain_ids
+        fee_list = list(fee_list) if _is_sequence(fees) else [fee_list] * length
+        chain_list = list(chain_list) if _is_sequence(chain_ids) else [chain_list] * length
+        groups = {}
+        for position, key in enumerate(zip(fee_list, chain_list)):
+            groups.setdefault(key, []).append(position)
+    else:
+        groups = {(fees, chain_ids): None}
+    
+    results = []  # (positions, fee units, costs, formatted)
+    for (fee, chain_id), positions in groups.items():
+        decimals = get_network_info(chain_id)['decimals']
+        units = parse_units(fee, decimals, truncate=True) if human_fees else int(fee)
+        multiplier, shift = _split_pow10(units, decimals)
+        if positions is None:
+            seconds = durations
+        elif np is not None:
+            seconds = durations[positions]
+        else:
+            seconds = [durations[position] for position in positions]
+        reduced = _multiply(seconds, multiplier)
+        labels = _format_many(reduced, decimals - shift, places, trim) if formatted else None
+        results.append((positions, units, _multiply(reduced, _pow10(shift)), labels))
+    
+    if len(results) == 1 and results[0][0] is None:
+        _, units, costs, labels = results[0]
+        fee_units = [units] * length
+        if np is not None:
+            fee_units = np.full(length, units, dtype=np.int64 if abs(units) <= _INT64_MAX else object)
+        return {'fees': fee_units, 'costs': costs, 'formatted': labels}
+    
+    if np is not None:
+        exact = all(group_costs.dtype == np.int64 and abs(units) <= _INT64_MAX
+                    for _, units, group_costs, _ in results)
+        fee_units = np.empty(length, dtype=np.int64 if exact else object)
+        costs = np.empty(length, dtype=np.int64 if exact else object)
+    else:
+        fee_units = [0] * length
+        costs = [0] * length
+    labels = [None] * length if formatted else None
+    for positions, units, group_costs, group_labels in results:
+        if np is not None:
+            fee_units[positions] = units
+            costs[positions] = group_costs
+        else:
+            for position, cost in zip(positions, group_costs):
+                fee_units[position] = units
+                costs[position] = cost
+        if formatted:
+            for position, label in zip(positions, group_labels):
+                labels[position] = label
+    return {'fees': fee_units, 'costs': costs, 'formatted': labels}
+
+def cost_matrix(fees, durations, chain_ids=None, human_fees=True, places=None, trim=False, formatted=True):
+    """
+    Price every combination of chain, fee and duration (e.g. for pricing dashboards)
+    
+    Args:
+        fees (dict or list): Fees per second to compare, e.g. {'regular': 0.001,
+            'whitelist': 0.0005}; a list is labelled by position
+        durations (list): Seconds (a NumPy array is fine too)
+        chain_ids (list, optional): Chains to price on (default: every chain in NETWORK_CONFIG)
+        human_fees (bool): Fees are human amounts, converted per chain; with False
+            the same smallest-unit fee is used on every chain
+        places, trim, formatted: As for calculate_costs
+        
+    Returns:
+        dict: {'chain_ids', 'fee_labels', 'durations': the axes,
+            'costs', 'formatted': indexed [chain][fee][duration]; every innermost
+            row is what calculate_costs returned for it (array or list)}
+    """
+    if not isinstance(fees, dict):
+        fees = dict(enumerate(fees))
+    chain_ids = list(NETWORK_CONFIG) if chain_ids is None else list(chain_ids)
+    fee_labels = list(fees)
+    if np is not None:
+        durations = np.asarray(durations)
+    
+    costs = []
+    labels = [] if formatted else None
+    for chain_id in chain_ids:
+        rows = [calculate_costs(fees[label], durations, chain_id, human_fees=human_fees, places=places,
+                                trim=trim, formatted=formatted) for label in fee_labels]
+        costs.append([row['costs'] for row in rows])
+        if formatted:
+            labels.append([row['formatted'] for row in rows])
+    return {
+        'chain_ids': chain_ids,
+        'fee_labels': fee_labels,
+        'durations': durations.tolist() if np is not None else list(durations),
+        'costs': costs,
+        'formatted': labels,
+    }
+
 def print_deployment_guide(target_chain_id):
     """Print deployment guide for a specific network"""
     network = get_network_info(target_chain_id)
@@ -235,7 +636,7 @@ def print_deployment_guide(target_chain_id):
         fee = get_suggested_fee(target_chain_id, rate_name)
         print(f"For {rate_value} {network['currency']}/second ({rate_name} rate):")
         print(f"  _feePerSecond = {fee}")
-        print(f"  10 minutes cost: {fee * 600} ({rate_value * 600} {network['currency']})")
+        print(f"  10 minutes cost: {fee * 600} ({format_units(fee * 600, network['decimals'], trim=True)} {network['currency']})")
         print()
 
 if __name__ == "__main__":
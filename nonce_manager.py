@@ -0,0 +1,186 @@
+"""
+InfraLink nonce manager
+Hands out transaction nonces from a local counter per (chain, account)
+instead of calling eth_getTransactionCount before every send. That saves a
+round-trip per transaction and keeps several transactions sent within one
+block from all getting the same nonce. The counter is resynced from the
+node's pending count on first use, after a nonce error and after a send
+that got no answer; a nonce the node refused is handed out again before
+any new one, so a failed send never leaves a gap that stalls every later
+transaction.
+"""
+
+import threading
+
+from rpc_pool import EndpointUnavailable
+
+# Fee bump for replace-by-fee; geth and most relays require at least +10%
+DEFAULT_FEE_BUMP = 1.125
+
+# Send errors that mean our counter disagrees with the node
+NONCE_ERRORS = ('nonce too low', 'nonce too high', 'replacement transaction underpriced', 'invalid nonce')
+
+# Send errors that mean the node already holds this exact transaction; the send succeeded
+ALREADY_KNOWN_ERRORS = ('already known', 'known transaction')
+
+# (chain_id, address lowercased) -> NonceManager
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def is_nonce_error(error):
+    """True if a send error means the nonce was wrong (resync and retry)"""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERRORS)
+
+
+def is_rejection(error):
+    """
+    True if a send error means the transaction certainly was not accepted: the
+    node's own answer (a JSON-RPC error, which web3 raises as ValueError), or an
+    EndpointUnavailable that never reached any endpoint (could not connect, or
+    refused as rate limited). Timeouts and dropped connections are not: the node
+    may have taken it.
+    """
+    if isinstance(error, EndpointUnavailable):
+        return not error.delivered
+    return isinstance(error, ValueError) and not is_already_known(error)
+
+
+def is_already_known(error):
+    """True if a send error means the transaction is already in the node's mempool"""
+    message = str(error).lower()
+    return any(marker in message for marker in ALREADY_KNOWN_ERRORS)
+
+
+def bump_fees(txn, bump=DEFAULT_FEE_BUMP):
+    """
+    Fee fields for replacing `txn` (same nonce) so nodes accept the replacement
+
+    Args:
+        txn (dict): Transaction previously sent, legacy (gasPrice) or EIP-1559
+        bump (float): Multiplier applied to every fee field (rounded up)
+
+    Returns:
+        dict: The fee fields only, e.g. {'gasPrice': ...}
+    """
+    def bumped(value):
+        value = int(value)
+        return max(value + 1, -(-value * int(bump * 1000) // 1000))
+
+    if 'maxFeePerGas' in txn:
+        return {'maxFeePerGas': bumped(txn['maxFeePerGas']),
+                'maxPriorityFeePerGas': bumped(txn['maxPriorityFeePerGas'])}
+    return {'gasPrice': bumped(txn['gasPrice'])}
+
+
+class NonceManager:
+    """
+    Local nonce counter for one account on one chain (thread-safe)
+
+    Usage:
+        nonces = get_nonce_manager(w3, account.address)
+        nonce = nonces.reserve()
+        try:
+            send(nonce)
+        except Exception as e:
+            if is_rejection(e):
+                nonces.release(nonce, e)
+            else:  # no answer; it may have got through, so never hand the nonce out again
+                nonces.sent(nonce)
+                nonces.resync()
+        else:
+            nonces.sent(nonce)
+    """
+
+    def __init__(self, w3, address):
+        """
+        Args:
+            w3 (Web3): Connected Web3 instance for the account's chain
+            address (str): Account that signs the transactions
+        """
+        self.w3 = w3
+        self.address = w3.to_checksum_address(address)
+        self._lock = threading.Lock()
+        self._next = None  # next new nonce to hand out; None until synced
+        self._reserved = set()  # handed out but not yet sent or released
+        self._free = set()  # given back below _next; reused lowest first
+        self.resyncs = 0
+
+    def reserve(self):
+        """
+        Returns:
+            int: A nonce no other caller of this manager will get
+        """
+        with self._lock:
+            if self._next is None:
+                self._sync_locked()
+            if self._free:
+                nonce = min(self._free)
+                self._free.discard(nonce)
+            else:
+                nonce = self._next
+                self._next += 1
+            self._reserved.add(nonce)
+            return nonce
+
+    def sent(self, nonce):
+        """Mark a reserved nonce as used by a transaction the node accepted"""
+        with self._lock:
+            self._reserved.discard(nonce)
+
+    def release(self, nonce, error=None):
+        """
+        Give back a nonce whose transaction certainly never reached the node
+
+        It is handed out again by the next reserve(); otherwise it would be a
+        hole every later nonce waits behind. After a send that may or may not
+        have arrived (timeout, dropped connection) use sent() and resync()
+        instead: reusing the nonce could get a second transaction mined.
+
+        Args:
+            nonce (int): Nonce from reserve()
+            error (Exception, optional): Why the send failed; nonce errors force a resync
+        """
+        with self._lock:
+            self._reserved.discard(nonce)
+            if error is not None and is_nonce_error(error):
+                self._next = None
+            elif self._next is not None and nonce < self._next:
+                self._free.add(nonce)
+
+    def resync(self):
+        """Forget the local counter; the next reserve() asks the node again"""
+        with self._lock:
+            self._next = None
+
+    def _sync_locked(self):
+        pending = self.w3.eth.get_transaction_count(self.address, 'pending')
+        # Nonces reserved but not yet sent are unknown to the node; keep them
+        # and hand out the ones around them
+        self._next = max([pending] + [nonce + 1 for nonce in self._reserved])
+        self._free = {nonce for nonce in range(pending, self._next) if nonce not in self._reserved}
+        self.resyncs += 1
+
+
+def get_nonce_manager(w3, address, chain_id=None):
+    """
+    Shared NonceManager for (chain, address), so every sender in this process agrees
+
+    Args:
+        w3 (Web3): Connected Web3 instance
+        address (str): Sending account
+        chain_id (int, optional): Chain ID if already known (saves an eth_chainId call)
+
+    Returns:
+        NonceManager
+    """
+    if chain_id is None:
+        chain_id = w3.eth.chain_id
+    key = (chain_id, address.lower())
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = NonceManager(w3, address)
+            _managers[key] = manager
+        return manager
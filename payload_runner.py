@@ -0,0 +1,370 @@
+"""
+InfraLink payload runner
+Invokes device payload hooks (devicepayload.py enable/disable) and keeps each
+device's hooks in order without letting one slow device hold up the others.
+Hooks run in-process through a pre-warmed PayloadEngine, or in a separate
+long-lived payload server through PayloadClient, and fall back to one
+subprocess per transition when neither is available.
+"""
+
+import importlib
+import json
+import os
+import select
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_PAYLOAD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "devicepayload.py")
+
+# Must match PAYLOAD_SOCKET / PAYLOAD_PORT in devicepayload.py
+DEFAULT_PAYLOAD_SOCKET = os.environ.get("INFRALINK_PAYLOAD_SOCKET", "/tmp/infralink-payload.sock")
+DEFAULT_PAYLOAD_PORT = int(os.environ.get("INFRALINK_PAYLOAD_PORT", "47820"))
+
+# Seconds to wait for a hook; must exceed COMMAND_DEADLINE in devicepayload.py (60)
+DEFAULT_HOOK_TIMEOUT = 90
+
+
+def run_payload_script(action, user_address=None, is_whitelisted=False,
+                       script_path=DEFAULT_PAYLOAD_SCRIPT, env=None, timeout=DEFAULT_HOOK_TIMEOUT):
+    """
+    Run a payload script as `python <script> <action> [user_address is_whitelisted]`
+
+    Args:
+        action (str): 'enable', 'disable' or 'expiry_warning'
+        user_address (str, optional): User who triggered the transition
+        is_whitelisted (bool): Whether that user is whitelisted
+        script_path (str): Payload script to run
+        env (dict, optional): Extra environment variables for the script
+        timeout (float): Seconds before the script is killed
+
+    Returns:
+        bool: True if the script exited successfully
+    """
+    try:
+        if not os.path.exists(script_path):
+            print(f"Warning: payload script not found at {script_path}")
+            return False
+
+        cmd = [sys.executable, script_path, action]
+        if user_address:
+            cmd.append(user_address)
+            cmd.append(str(is_whitelisted).lower())
+
+        script_env = None
+        if env:
+            script_env = dict(os.environ)
+            script_env.update(env)
+
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=script_env)
+
+        if result.returncode == 0:
+            print(f"Device payload {action} executed successfully")
+            if result.stdout:
+                print(f"Output: {result.stdout.strip()}")
+            return True
+        else:
+            print(f"Device payload {action} failed")
+            if result.stderr:
+                print(f"Error: {result.stderr.strip()}")
+            return False
+
+    except subprocess.TimeoutExpired:
+        print(f"Device payload {action} timed out")
+        return False
+    except Exception as e:
+        print(f"Error calling device payload {action}: {e}")
+        return False
+
+
+class PayloadEngine:
+    """
+    Runs devicepayload hooks in-process
+
+    The payload module is imported once and its sound system initialized once,
+    so a transition costs a function call instead of an interpreter start,
+    a pygame import and a mixer init. Hooks run on a single worker thread in
+    submission order, so callers never block on them.
+    """
+
+    def __init__(self, module_name="devicepayload"):
+        """
+        Args:
+            module_name (str): Module providing on_device_enable/on_device_disable
+        """
+        self.module_name = module_name
+        self.module = None
+        self.error = None
+        self._executor = None
+
+        try:
+            self.module = importlib.import_module(module_name)
+            if getattr(self.module, 'SOUND_ENABLED', False):
+                self.module.initialize_sound()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payload-engine")
+            print(f"Payload engine ready ({module_name} loaded in-process)")
+        except Exception as e:
+            # Typically pygame missing; callers fall back to the subprocess path
+            self.error = str(e)
+            print(f"Payload engine unavailable, using subprocess payloads: {e}")
+
+    @property
+    def available(self):
+        return self.module is not None
+
+    def run(self, action, user_address=None, is_whitelisted=False, device_address=None):
+        """
+        Run a hook synchronously on the calling thread
+
+        Args:
+            device_address (str, optional): Device the transition belongs to; one
+                process may run hooks for many devices, so the hook cannot rely
+                on $INFRALINK_DEVICE
+
+        Returns:
+            bool: Hook result (False on error or unknown action)
+        """
+        # Only passed when given, so payload modules with the older signature keep working
+        kwargs = {'device_address': device_address} if device_address else {}
+        try:
+            if action == 'enable':
+                return bool(self.module.on_device_enable(user_address, is_whitelisted, **kwargs))
+            if action == 'disable':
+                return bool(self.module.on_device_disable(user_address, is_whitelisted, **kwargs))
+            if action == 'expiry_warning' and hasattr(self.module, 'on_session_expiring'):
+                return bool(self.module.on_session_expiring(user_address, is_whitelisted, **kwargs))
+            print(f"Unknown payload action: {action}")
+            return False
+        except Exception as e:
+            print(f"Error in device payload {action}: {e}")
+            return False
+
+    def submit(self, action, user_address=None, is_whitelisted=False, device_address=None):
+        """
+        Queue a hook on the engine's worker thread
+
+        Returns:
+            Future: Resolves to the hook result
+        """
+        if not self.available:
+            future = Future()
+            future.set_result(False)
+            return future
+        return self._executor.submit(self.run, action, user_address, is_whitelisted, device_address)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+class PayloadServerUnavailable(Exception):
+    """Raised when the payload server cannot be reached (the request was never delivered)"""
+
+
+class PayloadResponseLost(Exception):
+    """Raised when a request was delivered but no response came back; the hook may have run"""
+
+
+class PayloadClient:
+    """
+    Client for the `devicepayload.py serve` payload server
+
+    Keeps one connection open and reconnects on demand. If the server cannot
+    be reached the hook runs through the subprocess path instead, so a
+    stopped server never drops a transition.
+    """
+
+    def __init__(self, socket_path=DEFAULT_PAYLOAD_SOCKET, port=DEFAULT_PAYLOAD_PORT,
+                 timeout=DEFAULT_HOOK_TIMEOUT, retry_delay=5, script_path=DEFAULT_PAYLOAD_SCRIPT):
+        """
+        Args:
+            socket_path (str): Server's Unix socket (used where AF_UNIX exists)
+            port (int): Server's localhost TCP port (used elsewhere)
+            timeout (float): Seconds to wait for a hook to complete; keep it above
+                COMMAND_DEADLINE or slow hooks are reported as lost
+            retry_delay (float): After a failed connect, go straight to the
+                fallback for this many seconds instead of retrying every call
+            script_path (str): Payload script for the subprocess fallback
+        """
+        self.socket_path = socket_path
+        self.port = port
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.script_path = script_path
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._down_until = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payload-client")
+
+    @property
+    def available(self):
+        return True  # Always usable thanks to the subprocess fallback
+
+    def _connect(self):
+        if hasattr(socket, 'AF_UNIX'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.socket_path
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = ("127.0.0.1", self.port)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError as e:
+            sock.close()
+            raise PayloadServerUnavailable(f"payload server not reachable at {address}: {e}")
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _stale(self):
+        # An idle connection has nothing to read; if it is readable the server
+        # closed it (restart), so it must not carry the next request
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _send(self, request):
+        try:
+            self._sock.sendall((json.dumps(request) + "\n").encode())
+        except OSError as e:
+            raise PayloadServerUnavailable(f"payload server connection lost: {e}")
+        # Delivered from here on: a failure may come after the hook ran, so it is
+        # never retried or handed to the fallback
+        try:
+            line = self._reader.readline()
+        except OSError as e:
+            raise PayloadResponseLost(f"no response from payload server: {e}")
+        if not line:
+            raise PayloadResponseLost("payload server closed the connection before responding")
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise PayloadResponseLost(f"unreadable response from payload server: {e}")
+
+    def request(self, request):
+        """
+        Send one request, on a fresh connection if the open one went stale
+
+        Returns:
+            dict: Server response
+
+        Raises:
+            PayloadServerUnavailable: If the request could not be delivered
+                (safe to run the hook some other way)
+            PayloadResponseLost: If it was delivered but no response came back
+                (the hook may have run; do not run it again)
+        """
+        with self._lock:
+            if self._sock is None and time.time() < self._down_until:
+                raise PayloadServerUnavailable("payload server marked down")
+
+            if self._sock is not None and self._stale():
+                self._close()
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._send(request)
+            except PayloadServerUnavailable:
+                self._close()
+                self._down_until = time.time() + self.retry_delay
+                raise
+            except PayloadResponseLost:
+                self._close()
+                raise
+
+    def run(self, action, user_address=None, is_whitelisted=False, device_address=None):
+        """
+        Run a hook on the server, falling back to the subprocess path if it is down
+
+        Args:
+            device_address (str, optional): Device the transition belongs to; a
+                standalone server has no $INFRALINK_DEVICE of its own
+        """
+        try:
+            response = self.request({
+                'action': action,
+                'user_address': user_address,
+                'is_whitelisted': is_whitelisted,
+                'device_address': device_address
+            })
+            if not response.get('ok'):
+                print(f"Device payload {action} failed on server: {response.get('error', 'hook reported failure')}")
+            return bool(response.get('ok'))
+        except PayloadServerUnavailable as e:
+            print(f"{e}; running payload {action} as a subprocess")
+            env = {'INFRALINK_DEVICE': device_address} if device_address else None
+            return run_payload_script(action, user_address, is_whitelisted, script_path=self.script_path, env=env)
+        except PayloadResponseLost as e:
+            print(f"Device payload {action} failed: {e}")
+            return False
+
+    def submit(self, action, user_address=None, is_whitelisted=False, device_address=None):
+        """
+        Queue a hook on the client's worker thread
+
+        Returns:
+            Future: Resolves to the hook result
+        """
+        return self._executor.submit(self.run, action, user_address, is_whitelisted, device_address)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            self._close()
+
+
+class SerialHookRunner:
+    """
+    Runs hooks on a shared thread pool, one at a time per key
+
+    Hooks for the same device run in submission order; hooks for different
+    devices run concurrently, bounded by `max_workers`.
+    """
+
+    def __init__(self, max_workers=8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="payload")
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> deque of callables; present while the key has a hook running
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) behind any hooks already queued for `key`"""
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].append((fn, args, kwargs))
+                return
+            self._pending[key] = deque()
+        self._executor.submit(self._drain, key, fn, args, kwargs)
+
+    def _drain(self, key, fn, args, kwargs):
+        while True:
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Payload hook for {key} failed: {e}")
+
+            with self._lock:
+                queued = self._pending[key]
+                if not queued:
+                    del self._pending[key]
+                    return
+                fn, args, kwargs = queued.popleft()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,321 @@
+"""
+InfraLink read aggregation
+Collects contract view calls (and plain JSON-RPC reads like eth_chainId) and
+sends them in one HTTP round-trip: either a JSON-RPC batch request, or a single
+Multicall3 aggregate3 eth_call when the chain has Multicall3 deployed.
+Results are decoded with the ABI of the contract object each call was added on.
+"""
+
+import threading
+
+import requests
+from eth_abi import decode, encode
+from web3 import Web3
+
+from rpc_pool import get_session, EndpointUnavailable
+
+# Multicall3 is deployed at the same address on most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# aggregate3((address target, bool allowFailure, bytes callData)[]) returns ((bool success, bytes returnData)[])
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+
+DEFAULT_TIMEOUT = 10  # seconds
+
+# (rpc_url) -> bool, so Multicall3 availability is only probed once per endpoint
+_multicall_support = {}
+_multicall_lock = threading.Lock()
+
+# (id(abi), fn_name, args) -> (abi, calldata, fn_abi); encoding through web3 costs
+# ~1.5ms per call, which adds up when hundreds of devices share the same calls
+_encoding_cache = {}
+_ENCODING_CACHE_SIZE = 4096
+
+# (id(abi), fn_name) -> (abi, fn_abi, selector, input types or None); lets calls whose
+# arguments differ every time (one per user, say) skip web3's encoding pipeline
+_function_cache = {}
+_STATIC_INPUT_PREFIXES = ('address', 'uint', 'int', 'bool', 'bytes32')
+
+
+class BatchCallError(Exception):
+    """Raised when one call inside a batch fails"""
+
+
+def _abi_type(item):
+    """Collapse an ABI input/output entry into a canonical type string"""
+    abi_type = item['type']
+    if abi_type.startswith('tuple'):
+        inner = ",".join(_abi_type(component) for component in item['components'])
+        return f"({inner}){abi_type[len('tuple'):]}"
+    return abi_type
+
+
+def _normalize(abi_type, value):
+    """Match web3's return formatting: checksummed addresses"""
+    if abi_type == 'address':
+        return Web3.to_checksum_address(value)
+    if abi_type == 'address[]':
+        return [Web3.to_checksum_address(item) for item in value]
+    return value
+
+
+def decode_function_result(fn_abi, data):
+    """
+    Decode raw eth_call return data the same way ContractFunction.call() would
+
+    Args:
+        fn_abi (dict): Function ABI entry
+        data (bytes): Raw return data
+
+    Returns:
+        The single output value, or a tuple when the function has several outputs
+    """
+    output_types = [_abi_type(item) for item in fn_abi['outputs']]
+    values = decode(output_types, data)
+    values = tuple(_normalize(t, v) for t, v in zip(output_types, values))
+    return values[0] if len(values) == 1 else values
+
+
+def encode_call(contract, fn_name, args):
+    """Return (calldata, fn_abi) for a call, memoized per ABI/function/arguments"""
+    try:
+        key = (id(contract.abi), fn_name, args)
+        cached = _encoding_cache.get(key)
+    except TypeError:  # unhashable arguments
+        key = cached = None
+    # The cached entry holds the ABI itself, so its id cannot be reused while cached
+    if cached is not None and cached[0] is contract.abi:
+        return cached[1], cached[2]
+
+    function = _function_cache.get((id(contract.abi), fn_name))
+    if function is None or function[0] is not contract.abi:
+        fn_abi = contract.get_function_by_name(fn_name).abi
+        input_types = [_abi_type(item) for item in fn_abi['inputs']]
+        selector = Web3.keccak(text=f"{fn_name}({','.join(input_types)})")[:4]
+        if not all(t.startswith(_STATIC_INPUT_PREFIXES) and not t.endswith(']') for t in input_types):
+            input_types = None  # Arrays, strings, tuples: leave them to web3
+        function = (contract.abi, fn_abi, selector, input_types)
+        _function_cache[(id(contract.abi), fn_name)] = function
+    _, fn_abi, selector, input_types = function
+
+    if input_types is not None:
+        # Lowercase addresses encode without a checksum (keccak) validation
+        values = [arg.lower() if t == 'address' and isinstance(arg, str) else arg
+                  for t, arg in zip(input_types, args)]
+        data = Web3.to_hex(selector + encode(input_types, values))
+    else:
+        data = contract.encodeABI(fn_name=fn_name, args=list(args))
+    if key is not None:
+        if len(_encoding_cache) >= _ENCODING_CACHE_SIZE:
+            _encoding_cache.clear()
+        _encoding_cache[key] = (contract.abi, data, fn_abi)
+    return data, fn_abi
+
+
+class _ContractCall:
+    def __init__(self, target, data, fn_abi):
+        self.target = target
+        self.data = data
+        self.fn_abi = fn_abi
+
+
+class _RawRequest:
+    def __init__(self, method, params, formatter):
+        self.method = method
+        self.params = params
+        self.formatter = formatter
+
+
+class BatchReader:
+    """
+    Collects reads for one round-trip
+
+    Usage:
+        reader = BatchReader(w3)
+        info = reader.add(contract, 'getDeviceInfo', zero_address)
+        chain = reader.add_request('eth_chainId', [], formatter=lambda h: int(h, 16))
+        results = reader.execute()
+        results[info], results[chain]
+    """
+
+    def __init__(self, w3, use_multicall=True, timeout=DEFAULT_TIMEOUT, block='latest'):
+        """
+        Args:
+            w3 (Web3): Web3 instance whose provider endpoint the batch is sent to
+            use_multicall (bool): Fold contract calls into one Multicall3 call when available
+            timeout (float): HTTP timeout for the batch request
+            block: Block identifier every eth_call is executed against
+        """
+        self.w3 = w3
+        self.use_multicall = use_multicall
+        self.timeout = timeout
+        self.block = block
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, contract, fn_name, *args, address=None):
+        """
+        Queue a contract view call
+
+        Args:
+            contract: web3 contract whose ABI describes fn_name
+            fn_name (str): Function name
+            *args: Function arguments
+            address (str, optional): Call this address instead of contract.address
+                (lets one contract object serve many deployments of the same ABI)
+
+        Returns:
+            int: Index of the result in the list returned by execute()
+        """
+        data, fn_abi = encode_call(contract, fn_name, args)
+        target = Web3.to_checksum_address(address) if address else contract.address
+        self._items.append(_ContractCall(target, data, fn_abi))
+        return len(self._items) - 1
+
+    def add_request(self, method, params=None, formatter=None):
+        """
+        Queue a plain JSON-RPC read such as eth_chainId or eth_blockNumber
+
+        Returns:
+            int: Index of the result in the list returned by execute()
+        """
+        self._items.append(_RawRequest(method, params or [], formatter))
+        return len(self._items) - 1
+
+    def execute(self, raise_errors=True):
+        """
+        Send every queued read and return the decoded results in order
+
+        Args:
+            raise_errors (bool): Raise the first failure; otherwise failed
+                slots hold a BatchCallError instance
+
+        Returns:
+            list: One decoded result per queued read
+        """
+        items, self._items = self._items, []
+        if not items:
+            return []
+
+        endpoint = getattr(self.w3.provider, 'endpoint_uri', None)
+        if endpoint is None:
+            # Not an HTTP provider (IPC, websocket...): no batching possible
+            results = [self._execute_single(item) for item in items]
+        else:
+            try:
+                results = self._execute_batch(str(endpoint), items)
+            except (requests.RequestException, EndpointUnavailable, ValueError, KeyError, TypeError) as e:
+                print(f"Batch request failed ({e}), falling back to individual calls")
+                results = [self._execute_single(item) for item in items]
+
+        if raise_errors:
+            for result in results:
+                if isinstance(result, BatchCallError):
+                    raise result
+        return results
+
+    # --- transports ---
+
+    def _block_param(self):
+        return self.block if isinstance(self.block, str) else hex(self.block)
+
+    def _execute_single(self, item):
+        try:
+            if isinstance(item, _ContractCall):
+                data = self.w3.eth.call({'to': item.target, 'data': item.data}, self.block)
+                return decode_function_result(item.fn_abi, bytes(data))
+            response = self.w3.provider.make_request(item.method, item.params)
+            if 'error' in response:
+                return BatchCallError(f"{item.method} failed: {response['error']}")
+            return item.formatter(response['result']) if item.formatter else response['result']
+        except Exception as e:
+            return BatchCallError(str(e))
+
+    def _execute_batch(self, endpoint, items):
+        calls = [i for i, item in enumerate(items) if isinstance(item, _ContractCall)]
+        multicall = self.use_multicall and len(calls) > 1 and self._has_multicall(endpoint)
+
+        # Build the JSON-RPC payload; with Multicall3 all contract calls share one entry
+        payload = []
+        slots = []  # payload index -> list of item indexes it answers
+        if multicall:
+            payload.append(self._rpc('eth_call', [{
+                'to': MULTICALL3_ADDRESS,
+                'data': Web3.to_hex(self._encode_aggregate3([items[i] for i in calls]))
+            }, self._block_param()], len(payload)))
+            slots.append(calls)
+        for index, item in enumerate(items):
+            if multicall and isinstance(item, _ContractCall):
+                continue
+            if isinstance(item, _ContractCall):
+                payload.append(self._rpc('eth_call', [{'to': item.target, 'data': item.data},
+                                                      self._block_param()], len(payload)))
+            else:
+                payload.append(self._rpc(item.method, item.params, len(payload)))
+            slots.append([index])
+
+        post_json = getattr(self.w3.provider, 'post_json', None)
+        if post_json is not None:
+            # Pooled/failover providers pick the endpoint (and hedge) themselves
+            replies = post_json(payload, timeout=self.timeout)
+        else:
+            response = get_session(endpoint).post(endpoint, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            replies = response.json()
+        if not isinstance(replies, list):
+            raise ValueError("endpoint does not support JSON-RPC batches")
+        replies = {reply['id']: reply for reply in replies}
+
+        results = [None] * len(items)
+        for request_id, indexes in enumerate(slots):
+            reply = replies.get(request_id)
+            if reply is None or 'error' in reply:
+                error = reply['error'] if reply else "missing response"
+                for index in indexes:
+                    results[index] = BatchCallError(f"batch item {index} failed: {error}")
+                continue
+
+            if multicall and request_id == 0:
+                returned = decode(['(bool,bytes)[]'], bytes.fromhex(reply['result'][2:]))[0]
+                for index, (success, data) in zip(indexes, returned):
+                    results[index] = self._decode_call(items[index], success, data)
+            else:
+                item = items[indexes[0]]
+                if isinstance(item, _ContractCall):
+                    results[indexes[0]] = self._decode_call(item, True, bytes.fromhex(reply['result'][2:]))
+                else:
+                    results[indexes[0]] = item.formatter(reply['result']) if item.formatter else reply['result']
+        return results
+
+    @staticmethod
+    def _rpc(method, params, request_id):
+        return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+
+    @staticmethod
+    def _encode_aggregate3(calls):
+        encoded = encode(['(address,bool,bytes)[]'],
+                         [[(call.target, True, bytes.fromhex(call.data[2:])) for call in calls]])
+        return AGGREGATE3_SELECTOR + encoded
+
+    @staticmethod
+    def _decode_call(item, success, data):
+        if not success:
+            return BatchCallError(f"call to {item.target} ({item.fn_abi['name']}) reverted")
+        try:
+            return decode_function_result(item.fn_abi, data)
+        except Exception as e:
+            return BatchCallError(f"could not decode {item.fn_abi['name']}: {e}")
+
+    def _has_multicall(self, endpoint):
+        with _multicall_lock:
+            if endpoint in _multicall_support:
+                return _multicall_support[endpoint]
+        try:
+            code = self.w3.eth.get_code(MULTICALL3_ADDRESS)
+            supported = len(code) > 0
+        except Exception:
+            supported = False
+        with _multicall_lock:
+            _multicall_support[endpoint] = supported
+        return supported
@@ -0,0 +1,345 @@
+"""
+InfraLink RPC connection pool
+Keeps one pooled requests.Session per RPC URL for the whole process, so every
+Web3 provider, batched read and reconnect to the same endpoint reuses warm
+keep-alive (TLS) connections instead of opening and handshaking new ones.
+
+When several endpoints serve the same chain, FailoverHTTPProvider spreads
+reads across them by measured latency, hedges slow reads onto a second
+endpoint, and stops sending to endpoints that keep failing for a while.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from web3 import Web3, HTTPProvider
+
+POOL_CONNECTIONS = 4  # Hosts whose connection pools a session keeps
+POOL_MAXSIZE = 32  # Keep-alive connections per host (reader threads + UI + hooks)
+CONNECT_TIMEOUT = 5  # seconds
+READ_TIMEOUT = 20  # seconds
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+_sessions = {}  # rpc_url -> requests.Session
+_sessions_lock = threading.Lock()
+
+# Read-only methods: safe to send to two endpoints at once
+HEDGEABLE_METHODS = frozenset([
+    'eth_call', 'eth_chainId', 'eth_blockNumber', 'eth_getBalance', 'eth_getCode',
+    'eth_getLogs', 'eth_getTransactionReceipt', 'eth_getTransactionByHash',
+    'eth_getTransactionCount', 'eth_getBlockByNumber', 'eth_getBlockByHash',
+    'eth_gasPrice', 'eth_maxPriorityFeePerGas', 'eth_feeHistory', 'eth_estimateGas',
+    'net_version', 'web3_clientVersion',
+])
+
+# JSON-RPC error codes meaning "this endpoint is overloaded", not "your call failed"
+RATE_LIMIT_CODES = frozenset([-32005, -32029, 429])
+
+FAILURE_THRESHOLD = 3  # consecutive failures before an endpoint is taken out of rotation
+COOLDOWN = 30  # seconds an endpoint stays out before it gets a trial request
+MAX_HEDGE_DELAY = 2.0  # seconds; a read slower than this always gets a hedge
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_session(rpc_url):
+    """
+    Return the process-wide pooled session for an RPC URL
+
+    Args:
+        rpc_url (str): HTTP(S) JSON-RPC endpoint
+
+    Returns:
+        requests.Session: Session with keep-alive pools sized for concurrent readers
+    """
+    rpc_url = str(rpc_url)
+    with _sessions_lock:
+        session = _sessions.get(rpc_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Connection": "keep-alive"})
+            _sessions[rpc_url] = session
+        return session
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider that always posts through the shared session for its URL
+
+    web3's own session cache is keyed per thread, so every fetcher/reader
+    thread would otherwise open (and handshake) its own connections.
+    """
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        response = get_session(self.endpoint_uri).post(
+            self.endpoint_uri, data=request_data, **dict(self.get_request_kwargs())
+        )
+        response.raise_for_status()
+        return self.decode_rpc_response(response.content)
+
+    def post_json(self, payload, timeout=None):
+        """POST a JSON-RPC payload (single request or batch) and return the parsed reply"""
+        response = get_session(self.endpoint_uri).post(
+            self.endpoint_uri, json=payload, timeout=timeout or self._request_kwargs.get("timeout", DEFAULT_TIMEOUT)
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class EndpointUnavailable(Exception):
+    """Raised when an endpoint fails at the transport level or reports it is rate limited"""
+
+    def __init__(self, message, delivered=True):
+        """
+        Args:
+            message (str): What went wrong
+            delivered (bool): False only if the endpoint certainly never processed the
+                request (could not connect, or refused it as rate limited)
+        """
+        super().__init__(message)
+        self.delivered = delivered
+
+
+def _never_sent(error):
+    """True if a requests error happened before the request reached the endpoint"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+class EndpointHealth:
+    """Latency and error tracking plus a circuit breaker for one RPC endpoint"""
+
+    def __init__(self, url, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latency = None  # EWMA of successful request time (seconds)
+        self.error_rate = 0.0  # EWMA of failures (0..1)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0  # circuit open (endpoint skipped) until this time
+
+    def is_available(self, now):
+        return now >= self.open_until
+
+    def score(self):
+        """Lower is better; endpoints never measured sort first so each gets tried"""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + 4 * self.error_rate)
+
+    def record_success(self, latency):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.open_until = 0
+        self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+        self.error_rate *= 0.7
+
+    def record_slow(self, elapsed):
+        """A request has been outstanding for `elapsed` seconds; rank the endpoint at least that slow"""
+        self.latency = elapsed if self.latency is None else max(self.latency, elapsed)
+
+    def record_failure(self, now):
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.error_rate = 0.7 * self.error_rate + 0.3
+        if self.consecutive_failures >= self.failure_threshold:
+            # Half-open after the cooldown: the next request is a trial, one more failure re-opens
+            self.open_until = now + self.cooldown
+
+    def stats(self):
+        return {
+            'url': self.url,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'circuit_open': self.open_until > time.time(),
+        }
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="rpc-hedge")
+        return _hedge_executor
+
+
+class FailoverHTTPProvider(PooledHTTPProvider):
+    """
+    HTTP provider over several endpoints of the same chain
+
+    Each request goes to the healthy endpoint with the best latency/error
+    score. Read-only requests still running after a few times that endpoint's
+    usual latency are hedged: the next endpoint gets the same request and the
+    first good answer wins. Writes are never duplicated; they only fail over
+    when an endpoint could not be reached. Endpoints failing FAILURE_THRESHOLD
+    times in a row are skipped for COOLDOWN seconds.
+
+    endpoint_uri is the first (primary) URL, so per-endpoint caches keyed on it
+    (chain ids, Multicall3 support) keep working.
+    """
+
+    def __init__(self, rpc_urls, request_kwargs=None, hedge_after=None,
+                 failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        """
+        Args:
+            rpc_urls (list): Endpoints serving the same chain, primary first
+            request_kwargs (dict, optional): requests kwargs such as timeout
+            hedge_after (float, optional): Fixed hedge delay in seconds; by default
+                3x the endpoint's measured latency, capped at MAX_HEDGE_DELAY
+            failure_threshold (int): Consecutive failures that open an endpoint's circuit
+            cooldown (float): Seconds an open circuit stays open
+        """
+        super().__init__(rpc_urls[0], request_kwargs)
+        self.hedge_after = hedge_after
+        self.endpoints = [EndpointHealth(url, failure_threshold, cooldown) for url in rpc_urls]
+        self._lock = threading.Lock()
+
+    def ranked_endpoints(self):
+        """Endpoints to try, best first; open circuits only when nothing else is left"""
+        now = time.time()
+        with self._lock:
+            available = sorted((e for e in self.endpoints if e.is_available(now)), key=EndpointHealth.score)
+            if available:
+                return available
+            return sorted(self.endpoints, key=lambda e: e.open_until)
+
+    def endpoint_stats(self):
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def _hedge_delay(self, endpoint):
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if endpoint.latency is None:
+            return MAX_HEDGE_DELAY
+        return min(MAX_HEDGE_DELAY, max(0.1, 3 * endpoint.latency))
+
+    def _post(self, endpoint, body, timeout=None):
+        started = time.time()
+        request_kwargs = dict(self.get_request_kwargs())
+        if timeout:
+            request_kwargs['timeout'] = timeout
+        try:
+            response = get_session(endpoint.url).post(endpoint.url, data=body, **request_kwargs)
+            if response.status_code == 429:
+                raise EndpointUnavailable(f"{endpoint.url} returned HTTP 429", delivered=False)
+            if response.status_code >= 500:
+                raise EndpointUnavailable(f"{endpoint.url} returned HTTP {response.status_code}")
+            response.raise_for_status()
+            reply = response.json()
+            replies = reply if isinstance(reply, list) else [reply]
+            for item in replies:
+                error = item.get('error') if isinstance(item, dict) else None
+                if error and (error.get('code') in RATE_LIMIT_CODES or 'rate limit' in str(error.get('message', '')).lower()):
+                    raise EndpointUnavailable(f"{endpoint.url} is rate limiting: {error.get('message')}",
+                                              delivered=False)
+        except (requests.RequestException, ValueError, EndpointUnavailable) as e:
+            with self._lock:
+                endpoint.record_failure(time.time())
+            if isinstance(e, EndpointUnavailable):
+                raise
+            raise EndpointUnavailable(f"{endpoint.url}: {e}", delivered=not _never_sent(e))
+        with self._lock:
+            endpoint.record_success(time.time() - started)
+        return reply
+
+    def _request(self, body, hedge, timeout=None):
+        # hedge: every method in the body is read-only, so it may run on several endpoints
+        candidates = self.ranked_endpoints()
+        if not hedge or len(candidates) == 1:
+            last_error = None
+            for endpoint in candidates:
+                try:
+                    return self._post(endpoint, body, timeout)
+                except EndpointUnavailable as e:
+                    last_error = e
+                    if not hedge and e.delivered:
+                        # A write the endpoint may have applied (e.g. a read timeout after
+                        # eth_sendRawTransaction); sending it elsewhere could apply it twice
+                        raise
+            raise last_error
+
+        executor = _get_hedge_executor()
+        remaining = list(candidates)
+        pending = {}
+        last_error = None
+        while True:
+            if remaining:
+                endpoint = remaining.pop(0)
+                pending[executor.submit(self._post, endpoint, body, timeout)] = endpoint
+            if not pending:
+                raise last_error
+            # Wait for an answer; on timeout (hedge) or failure (fail over) loop to the next endpoint
+            hedge_delay = self._hedge_delay(endpoint) if remaining else None
+            done, _ = wait(list(pending), timeout=hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                with self._lock:
+                    endpoint.record_slow(hedge_delay)
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()  # Slower duplicates finish in the background
+                except EndpointUnavailable as e:
+                    last_error = e
+
+    def make_request(self, method, params):
+        body = self.encode_rpc_request(method, params)
+        return self._request(body, method in HEDGEABLE_METHODS)
+
+    def post_json(self, payload, timeout=None):
+        """POST a JSON-RPC payload (single request or batch) with failover and hedging"""
+        items = payload if isinstance(payload, list) else [payload]
+        hedge = all(item.get('method') in HEDGEABLE_METHODS for item in items)
+        return self._request(json.dumps(payload).encode(), hedge, timeout)
+
+
+def split_rpc_urls(rpc_url):
+    """Accept one URL, a comma-separated string of URLs, or a list; return a list"""
+    if isinstance(rpc_url, (list, tuple)):
+        return [str(url).strip() for url in rpc_url if str(url).strip()]
+    return [url.strip() for url in str(rpc_url).split(",") if url.strip()]
+
+
+def get_web3(rpc_url, timeout=DEFAULT_TIMEOUT):
+    """
+    Build a Web3 instance whose HTTP provider uses the pooled session for rpc_url
+
+    Args:
+        rpc_url (str or list): HTTP(S) JSON-RPC endpoint; several endpoints of the
+            same chain (a list or comma-separated string) get a FailoverHTTPProvider
+        timeout: requests timeout, seconds or a (connect, read) tuple
+
+    Returns:
+        Web3: Instance sharing connections with every other user of rpc_url
+    """
+    urls = split_rpc_urls(rpc_url)
+    if len(urls) > 1:
+        return Web3(FailoverHTTPProvider(urls, request_kwargs={"timeout": timeout}))
+    return Web3(PooledHTTPProvider(urls[0], request_kwargs={"timeout": timeout}))
+
+
+def close_sessions():
+    """Close every pooled session (e.g. on shutdown)"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -0,0 +1,312 @@
+"""
+InfraLink transaction pipeline
+Signs and sends transactions off the caller's thread and tracks them until
+they are mined. One sender thread sends in submission order, with nonces
+from the account's shared NonceManager (no eth_getTransactionCount per
+send); one poller thread asks for every outstanding receipt in a single
+JSON-RPC batch per tick instead of one wait_for_transaction_receipt loop
+per transaction. Stuck transactions can be replaced with higher fees.
+Progress is handed back through a queue the UI drains from its after()
+loop, so nothing here ever blocks the Tk thread.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nonce_manager import (DEFAULT_FEE_BUMP, bump_fees, get_nonce_manager, is_already_known, is_nonce_error,
+                           is_rejection)
+from rpc_batch import BatchReader, BatchCallError
+
+DEFAULT_POLL_INTERVAL = 1.0  # seconds between receipt batches
+DEFAULT_TIMEOUT = 300  # seconds a sent transaction may stay unmined before it is reported
+MAX_RECEIPTS_PER_BATCH = 200  # receipts asked for in one round-trip
+
+# PendingTransaction.status values
+QUEUED, SENT, CONFIRMED, FAILED, TIMEOUT, ERROR = 'queued', 'sent', 'confirmed', 'failed', 'timeout', 'error'
+FINAL_STATES = (CONFIRMED, FAILED, TIMEOUT, ERROR)
+# Reported by drain() when replace() succeeds or fails; tx.status stays SENT
+REPLACED, REPLACE_FAILED = 'replaced', 'replace_failed'
+
+
+def _parse_receipt(receipt):
+    """Pull the fields the UI needs out of a raw eth_getTransactionReceipt result"""
+    if receipt is None:
+        return None
+    return {
+        'status': int(receipt.get('status') or '0x0', 16),
+        'block_number': int(receipt['blockNumber'], 16),
+        'gas_used': int(receipt.get('gasUsed') or '0x0', 16),
+        'raw': receipt,
+    }
+
+
+class PendingTransaction:
+    """One submitted transaction; its fields are updated by the pipeline threads"""
+
+    def __init__(self, label):
+        self.label = label
+        self.status = QUEUED
+        self.tx_hash = None  # latest hash sent for this nonce
+        self.tx_hashes = []  # every hash sent for it (replacements included); any may get mined
+        self.params = None  # transaction dict last signed, for replacements
+        self.nonce = None
+        self.sent_at = None
+        self.receipt = None  # parsed receipt once mined
+        self.error = None
+
+    @property
+    def done(self):
+        return self.status in FINAL_STATES
+
+    def __repr__(self):
+        return f"PendingTransaction({self.label!r}, {self.status}, {self.tx_hash})"
+
+
+class TransactionPipeline:
+    """
+    Non-blocking submit-and-track for one account
+
+    Usage:
+        pipeline = TransactionPipeline(w3, account)
+        pipeline.submit(lambda nonce: contract.functions.deactivate().build_transaction(
+            {'from': account.address, 'nonce': nonce, 'gas': 200000, 'gasPrice': w3.eth.gas_price}),
+            "deactivation")
+        ...
+        for tx, status in pipeline.drain():  # from the UI thread
+            print(tx.label, status)
+    """
+
+    def __init__(self, w3, account, poll_interval=DEFAULT_POLL_INTERVAL, timeout=DEFAULT_TIMEOUT,
+                 max_batch=MAX_RECEIPTS_PER_BATCH, nonces=None):
+        """
+        Args:
+            w3 (Web3): Connected Web3 instance
+            account: eth_account LocalAccount that signs every transaction
+            nonces (NonceManager, optional): Nonce source; by default the one shared
+                by every sender of this account on this chain
+            poll_interval (float): Seconds between receipt batches
+            timeout (float): Seconds before an unmined transaction is reported as TIMEOUT
+            max_batch (int): Receipts requested per round-trip
+        """
+        self.w3 = w3
+        self.account = account
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.nonces = nonces
+
+        self._updates = queue.Queue()
+        self._pending = {}  # tx hash -> PendingTransaction awaiting a receipt (one entry per hash)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tx-sender")
+        self._poller = threading.Thread(target=self._poll_loop, name="tx-receipts", daemon=True)
+        self._poller.start()
+
+    @property
+    def outstanding(self):
+        """Transactions queued for sending or waiting to be mined"""
+        with self._lock:
+            return self._queued + len(set(self._pending.values()))
+
+    def sent_transactions(self):
+        """
+        Returns:
+            list: PendingTransaction objects sent but not yet mined, oldest nonce first
+        """
+        with self._lock:
+            return sorted(set(self._pending.values()), key=lambda tx: tx.nonce)
+
+    def submit(self, build, label):
+        """
+        Queue a transaction and return at once
+
+        Args:
+            build (callable): build(nonce) -> transaction dict ready to sign; runs
+                on the sender thread, so it may make RPC calls (gas price, ...)
+            label (str): Shown in progress reports
+
+        Returns:
+            PendingTransaction: Updated as it is sent and mined
+        """
+        tx = PendingTransaction(label)
+        with self._lock:
+            self._queued += 1
+        self._sender.submit(self._send, tx, build)
+        return tx
+
+    def replace(self, tx, bump=DEFAULT_FEE_BUMP):
+        """
+        Re-send a stuck transaction with the same nonce and higher fees (replace-by-fee)
+
+        Whichever version gets mined completes `tx`. Reported through drain()
+        as REPLACED or REPLACE_FAILED.
+
+        Args:
+            tx (PendingTransaction): A transaction in SENT state
+            bump (float): Fee multiplier; nodes usually require at least 1.1
+        """
+        with self._lock:
+            self._queued += 1
+        self._sender.submit(self._replace, tx, bump)
+
+    def drain(self):
+        """
+        Collect progress reported since the last call (call from the UI thread)
+
+        Returns:
+            list: (PendingTransaction, status) per change, oldest first; the status
+                is the one reported then, tx.status may have moved on since
+        """
+        updates = []
+        try:
+            while True:
+                updates.append(self._updates.get_nowait())
+        except queue.Empty:
+            pass
+        return updates
+
+    def shutdown(self):
+        """Stop tracking; transactions already sent still get mined, just not reported"""
+        self._stop.set()
+        self._wake.set()
+        self._sender.shutdown(wait=False)
+
+    # --- sender thread ---
+
+    def _send(self, tx, build, retry=True):
+        if self.nonces is None:
+            self.nonces = get_nonce_manager(self.w3, self.account.address)
+        nonce = self.nonces.reserve()
+        signed = None
+        try:
+            params = build(nonce)
+            signed = self.account.sign_transaction(params)
+            self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception as e:
+            if signed is not None and not is_rejection(e):
+                self._sent_anyway(nonce, e)
+            else:
+                self.nonces.release(nonce, e)
+                if retry and is_nonce_error(e):
+                    # The counter was stale (another wallet, a dropped transaction...); it is
+                    # resynced now, so try once more with a fresh nonce
+                    print(f"Nonce {nonce} rejected ({e}), resyncing")
+                    return self._send(tx, build, retry=False)
+                tx.error = str(e)
+                tx.status = ERROR
+                # Report before it stops counting as outstanding, so a drain loop
+                # that stops at zero never misses it
+                self._updates.put((tx, ERROR))
+                with self._lock:
+                    self._queued -= 1
+                return
+
+        self.nonces.sent(nonce)
+        tx.nonce = nonce
+        tx.params = params
+        tx.tx_hash = signed.hash.hex()
+        tx.tx_hashes.append(tx.tx_hash)
+        tx.sent_at = time.time()
+        tx.status = SENT
+        self._updates.put((tx, SENT))
+        with self._lock:
+            self._queued -= 1
+            self._pending[tx.tx_hash] = tx
+        self._wake.set()
+
+    def _sent_anyway(self, nonce, error):
+        """
+        A signed transaction whose send raised without the node refusing it:
+        either it is already in the mempool, or the answer was lost (timeout,
+        dropped connection) and it may well be. Either way it is tracked by its
+        hash like a normal send; sending it again under a new nonce could get
+        it mined twice.
+        """
+        if is_already_known(error):
+            return
+        print(f"No answer sending nonce {nonce} ({error}); tracking it and resyncing")
+        self.nonces.resync()
+
+    def _replace(self, tx, bump):
+        signed = None
+        try:
+            if tx.status != SENT:
+                raise ValueError(f"transaction is {tx.status}, not waiting to be mined")
+            params = dict(tx.params, **bump_fees(tx.params, bump))
+            signed = self.account.sign_transaction(params)
+            self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception as e:
+            if signed is None or is_rejection(e):
+                tx.error = str(e)
+                self._updates.put((tx, REPLACE_FAILED))
+                with self._lock:
+                    self._queued -= 1
+                return
+            # Already known, or no answer: the replacement may be in the mempool, so track it too
+            if not is_already_known(e):
+                print(f"No answer replacing nonce {tx.nonce} ({e}); tracking the replacement")
+
+        tx_hash = signed.hash.hex()
+        tx.params = params
+        tx.tx_hash = tx_hash
+        tx.tx_hashes.append(tx_hash)
+        tx.sent_at = time.time()
+        self._updates.put((tx, REPLACED))
+        with self._lock:
+            self._queued -= 1
+            if not tx.done:
+                self._pending[tx_hash] = tx
+
+    # --- poller thread ---
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self._poll_receipts()
+            except Exception as e:
+                print(f"Receipt poll failed: {e}")
+
+    def _poll_receipts(self):
+        with self._lock:
+            waiting = list(self._pending.items())
+        for start in range(0, len(waiting), self.max_batch):
+            chunk = waiting[start:start + self.max_batch]
+            reader = BatchReader(self.w3)
+            for tx_hash, _ in chunk:
+                reader.add_request('eth_getTransactionReceipt', [tx_hash], formatter=_parse_receipt)
+            results = reader.execute(raise_errors=False)
+
+            now = time.time()
+            for (tx_hash, tx), receipt in zip(chunk, results):
+                if tx.done:
+                    # Settled through another hash (e.g. a replacement raced the receipt)
+                    with self._lock:
+                        self._pending.pop(tx_hash, None)
+                    continue
+                if isinstance(receipt, BatchCallError):
+                    # Transient for this hash only; ask again next tick
+                    continue
+                if receipt is not None:
+                    tx.receipt = receipt
+                    tx.tx_hash = tx_hash
+                    tx.status = CONFIRMED if receipt['status'] == 1 else FAILED
+                elif now - tx.sent_at > self.timeout:
+                    tx.error = f"not mined after {self.timeout}s"
+                    tx.status = TIMEOUT
+                    # Probably dropped; later nonces would wait behind it forever
+                    self.nonces.resync()
+                else:
+                    continue
+                self._updates.put((tx, tx.status))
+                with self._lock:
+                    for sent_hash in tx.tx_hashes:
+                        self._pending.pop(sent_hash, None)
@@ -0,0 +1,207 @@
+"""
+InfraLink user enrichment
+Reads Info contract details (registered user addresses, profiles, per-device
+whitelist info) for many users at once. Users are split into chunks; each
+chunk is one batched round-trip (a single Multicall3 eth_call where the chain
+has it), and a bounded number of chunks are in flight at a time. Answers are
+kept for a TTL so scrolling back and forth or re-opening the tab is free.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+from rpc_batch import BatchReader, BatchCallError
+
+DEFAULT_TTL = 300  # seconds a fetched profile/whitelist answer is reused
+DEFAULT_CHUNK_SIZE = 100  # users per batched round-trip
+DEFAULT_MAX_IN_FLIGHT = 4  # batched round-trips running at once
+
+_MISSING = object()
+
+
+def _is_revert(error):
+    return 'revert' in str(error).lower()
+
+
+class UserEnricher:
+    """
+    Bulk, cached Info contract reads keyed by user
+
+    Every method takes a list of users and returns a dict keyed by the
+    lowercase address; users whose read failed (other than by reverting)
+    are left out and not cached, so the next call retries them.
+    """
+
+    def __init__(self, w3, info_contract, ttl=DEFAULT_TTL, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """
+        Args:
+            w3 (Web3): Connected Web3 instance
+            info_contract: web3 contract bound to INFO_CONTRACT_ABI
+            ttl (float): Seconds answers are cached
+            chunk_size (int): Reads per batched round-trip
+            max_in_flight (int): Round-trips running concurrently
+        """
+        self.w3 = w3
+        self.contract = info_contract
+        self.ttl = ttl
+        self.chunk_size = chunk_size
+        self._cache = {}  # (kind, user, device) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="enrich")
+
+    # --- cache ---
+
+    def _cached(self, key, now):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                return _MISSING
+            if hit[0] <= now:
+                del self._cache[key]
+                return _MISSING
+            return hit[1]
+
+    def _store(self, items, now):
+        with self._lock:
+            for key, value in items:
+                self._cache[key] = (now + self.ttl, value)
+
+    def invalidate(self, user=None):
+        """Forget cached answers for one user (e.g. after an event about them), or for everyone"""
+        with self._lock:
+            if user is None:
+                self._cache.clear()
+                return
+            user = user.lower()
+            for key in [key for key in self._cache if key[1] == user]:
+                del self._cache[key]
+
+    # --- bulk reads ---
+
+    def _fetch(self, kind, users, device, queue_read, parse):
+        """
+        Cached, chunked, concurrent read of one value per user
+
+        Args:
+            kind (str): Cache namespace
+            users (list): Addresses
+            device (str, optional): Part of the cache key for per-device reads
+            queue_read (callable): queue_read(reader, checksum_address) -> result index
+            parse (callable): parse(result) -> value; a BatchCallError that is a
+                revert is passed through too, anything else is dropped
+
+        Returns:
+            dict: lowercase address -> value
+        """
+        now = time.time()
+        device_key = device.lower() if device else None
+        values = {}
+        missing = []  # (lowercase key, address as given)
+        for address in users:
+            user = address.lower()
+            value = self._cached((kind, user, device_key), now)
+            if value is _MISSING:
+                missing.append((user, address))
+            else:
+                values[user] = value
+
+        chunks = [missing[start:start + self.chunk_size] for start in range(0, len(missing), self.chunk_size)]
+        futures = [self._executor.submit(self._fetch_chunk, chunk, queue_read) for chunk in chunks]
+        fetched = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"Enrichment of {len(chunk)} users failed: {e}")
+                continue
+            for (user, _), result in zip(chunk, results):
+                if isinstance(result, BatchCallError) and not _is_revert(result):
+                    continue
+                value = parse(result)
+                values[user] = value
+                fetched.append(((kind, user, device_key), value))
+
+        self._store(fetched, time.time())
+        return values
+
+    def _fetch_chunk(self, chunk, queue_read):
+        reader = BatchReader(self.w3)
+        for user, address in chunk:
+            # Checksumming costs a keccak; skip it for addresses that already are
+            queue_read(reader, address if address != user else Web3.to_checksum_address(address))
+        return reader.execute(raise_errors=False)
+
+    def profiles(self, users):
+        """
+        Returns:
+            dict: user -> {'name', 'bio', 'exists'} (getUserProfile)
+        """
+        def parse(result):
+            if isinstance(result, BatchCallError):
+                return {'name': "", 'bio': "", 'exists': False}
+            return {'name': result[0], 'bio': result[1], 'exists': result[4]}
+
+        return self._fetch('profile', users, None,
+                           lambda reader, user: reader.add(self.contract, 'getUserProfile', user), parse)
+
+    def whitelists(self, users):
+        """
+        Returns:
+            dict: user -> list of {'device', 'whitelist_name', 'fee_per_second', 'is_free'}
+                for every device the user is whitelisted on (getUserWhitelists)
+        """
+        def parse(result):
+            if isinstance(result, BatchCallError):
+                return []
+            devices, _, whitelist_names, fees, free_flags, _ = result
+            return [{'device': device, 'whitelist_name': whitelist_name, 'fee_per_second': fee, 'is_free': is_free}
+                    for device, whitelist_name, fee, is_free in zip(devices, whitelist_names, fees, free_flags)]
+
+        return self._fetch('whitelists', users, None,
+                           lambda reader, user: reader.add(self.contract, 'getUserWhitelists', user), parse)
+
+    def whitelist_info(self, users, device):
+        """
+        Returns:
+            dict: user -> {'whitelist_name', 'fee_per_second', 'is_free'} on `device`,
+                or None where the user is not whitelisted (getWhitelistInfo reverts)
+        """
+        device = Web3.to_checksum_address(device)
+
+        def parse(result):
+            if isinstance(result, BatchCallError):
+                return None
+            return {'whitelist_name': result[0], 'fee_per_second': result[1], 'is_free': result[2]}
+
+        return self._fetch('whitelist', users, device,
+                           lambda reader, user: reader.add(self.contract, 'getWhitelistInfo', user, device), parse)
+
+    def registered_users(self, count):
+        """
+        Enumerate registeredUsers(0..count-1) in concurrent batched chunks (not cached)
+
+        Returns:
+            list: Checksummed addresses in registration order
+
+        Raises:
+            BatchCallError: If any chunk could not be read
+        """
+        chunks = [range(start, min(start + self.chunk_size, count)) for start in range(0, count, self.chunk_size)]
+
+        def read(indexes):
+            reader = BatchReader(self.w3)
+            for i in indexes:
+                reader.add(self.contract, 'registeredUsers', i)
+            return reader.execute()
+
+        addresses = []
+        for results in self._executor.map(read, chunks):
+            addresses.extend(results)  # Already checksummed by the decoder
+        return addresses
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
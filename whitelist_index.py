@@ -0,0 +1,297 @@
+"""
+InfraLink whitelist index
+Answers "is this user whitelisted on this device, under what name and at
+what fee" locally instead of with an isUserWhitelisted / getWhitelistInfo
+eth_call. Entries are keyed by (user, deviceContract) in a dict and mirrored
+to SQLite, so a restart, the payload hooks and other processes read the
+same data. WhitelistSync keeps the index filled from Info contract events.
+
+Kept free of web3 imports so payload hooks can use it cheaply.
+"""
+
+import os
+import sqlite3
+import threading
+
+DEFAULT_WHITELIST_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".infralink_whitelist.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS whitelist_entries (
+    scope TEXT NOT NULL,
+    user TEXT NOT NULL,
+    device TEXT NOT NULL,
+    whitelist_name TEXT NOT NULL,
+    fee_per_second TEXT NOT NULL,
+    is_free INTEGER NOT NULL,
+    PRIMARY KEY (scope, user, device)
+);
+CREATE INDEX IF NOT EXISTS whitelist_entries_by_pair ON whitelist_entries (user, device);
+CREATE TABLE IF NOT EXISTS user_profiles (
+    scope TEXT NOT NULL,
+    user TEXT NOT NULL,
+    address TEXT NOT NULL,
+    name TEXT NOT NULL,
+    bio TEXT NOT NULL,
+    PRIMARY KEY (scope, user)
+);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    scope TEXT PRIMARY KEY,
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL
+);
+"""
+
+
+def _entry(whitelist_name, fee_per_second, is_free):
+    return {'whitelist_name': whitelist_name, 'fee_per_second': int(fee_per_second), 'is_free': bool(is_free)}
+
+
+class WhitelistIndex:
+    """
+    Whitelist entries and user profiles for one Info contract (a "scope")
+
+    Reads only touch the in-memory dicts. Writes update memory right away and
+    queue their SQL; commit() flushes them together with the sync cursor in
+    one transaction, so the database never holds changes without the cursor
+    that produced them (or the other way round).
+    """
+
+    def __init__(self, scope, db_path=DEFAULT_WHITELIST_DB):
+        """
+        Args:
+            scope (str): Identifies the Info contract, e.g. "whitelist:296:0x7aee..."
+            db_path (str, optional): SQLite file to persist to; None keeps the index in memory only
+        """
+        self.scope = scope
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._entries = {}  # (user, device), lowercased -> entry dict
+        self._by_device = {}  # device -> set of users with an entry on it
+        self._profiles = {}  # user, lowercased -> {'address', 'name', 'bio'}
+        self._pending = []  # (sql, params) not yet committed
+        self.cursor = None  # {'block': n, 'log_index': i} of the last committed change
+        self.version = 0  # Bumped on every change, so views know when to re-filter
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT user, device, whitelist_name, fee_per_second, is_free FROM whitelist_entries WHERE scope = ?",
+            (self.scope,))
+        for user, device, whitelist_name, fee_per_second, is_free in rows:
+            self._set_entry(user, device, _entry(whitelist_name, fee_per_second, is_free))
+        rows = self._conn.execute(
+            "SELECT user, address, name, bio FROM user_profiles WHERE scope = ? ORDER BY rowid", (self.scope,))
+        for user, address, name, bio in rows:
+            self._profiles[user] = {'address': address, 'name': name, 'bio': bio}
+        row = self._conn.execute("SELECT block, log_index FROM sync_cursors WHERE scope = ?", (self.scope,)).fetchone()
+        if row is not None:
+            self.cursor = {'block': row[0], 'log_index': row[1]}
+
+    def _set_entry(self, user, device, entry):
+        self.version += 1
+        self._entries[(user, device)] = entry
+        self._by_device.setdefault(device, set()).add(user)
+
+    def _drop_entry(self, user, device):
+        self.version += 1
+        self._entries.pop((user, device), None)
+        users = self._by_device.get(device)
+        if users is not None:
+            users.discard(user)
+            if not users:
+                del self._by_device[device]
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- lookups (no RPC, no SQL) ---
+
+    def is_whitelisted(self, user, device):
+        """Local equivalent of the Info contract's isUserWhitelisted(user, device)"""
+        return (user.lower(), device.lower()) in self._entries
+
+    def get_whitelist_info(self, user, device):
+        """
+        Local equivalent of getWhitelistInfo(user, device)
+
+        Returns:
+            dict: {'whitelist_name', 'fee_per_second', 'is_free'}, or None if not whitelisted
+        """
+        entry = self._entries.get((user.lower(), device.lower()))
+        return dict(entry) if entry is not None else None
+
+    def get_profile(self, user):
+        """
+        Returns:
+            dict: {'address', 'name', 'bio'} of a registered user, or None
+        """
+        profile = self._profiles.get(user.lower())
+        return dict(profile) if profile is not None else None
+
+    def registered_users(self):
+        """
+        Returns:
+            list: (address, profile dict) for every registered user
+        """
+        with self._lock:
+            return [(profile['address'], dict(profile)) for profile in self._profiles.values()]
+
+    def device_whitelist(self, device):
+        """
+        Returns:
+            dict: user address (lowercase) -> whitelist entry for one device
+        """
+        device = device.lower()
+        with self._lock:
+            return {user: dict(self._entries[(user, device)]) for user in self._by_device.get(device, ())}
+
+    def search(self, query="", device=None, whitelisted_only=False):
+        """
+        Users matching a filter, answered from memory like a server-side query
+
+        Args:
+            query (str): Case-insensitive substring of the address, profile name
+                or (with `device`) whitelist name; empty matches everyone
+            device (str, optional): Device contract whose whitelisted users are
+                included even without a profile
+            whitelisted_only (bool): Only users whitelisted on `device`
+
+        Returns:
+            list: Lowercase user addresses, registered users first
+        """
+        query = query.strip().lower()
+        device = device.lower() if device else None
+        with self._lock:
+            on_device = self._by_device.get(device, set()) if device else set()
+            if whitelisted_only:
+                candidates = [user for user in self._profiles if user in on_device]
+            else:
+                candidates = list(self._profiles)
+            candidates.extend(sorted(on_device.difference(self._profiles)))
+            if not query:
+                return candidates
+
+            matches = []
+            for user in candidates:
+                profile = self._profiles.get(user)
+                entry = self._entries.get((user, device)) if device else None
+                if (query in user
+                        or (profile is not None and query in profile['name'].lower())
+                        or (entry is not None and query in entry['whitelist_name'].lower())):
+                    matches.append(user)
+            return matches
+
+    # --- updates ---
+
+    def put_entry(self, user, device, whitelist_name, fee_per_second, is_free):
+        user, device = user.lower(), device.lower()
+        with self._lock:
+            self._set_entry(user, device, _entry(whitelist_name, fee_per_second, is_free))
+            self._pending.append((
+                "INSERT INTO whitelist_entries (scope, user, device, whitelist_name, fee_per_second, is_free) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (scope, user, device) DO UPDATE SET "
+                "whitelist_name = excluded.whitelist_name, fee_per_second = excluded.fee_per_second, "
+                "is_free = excluded.is_free",
+                # uint256 fees do not fit SQLite integers
+                (self.scope, user, device, whitelist_name, str(fee_per_second), int(bool(is_free)))))
+
+    def remove_entry(self, user, device):
+        user, device = user.lower(), device.lower()
+        with self._lock:
+            self._drop_entry(user, device)
+            self._pending.append(("DELETE FROM whitelist_entries WHERE scope = ? AND user = ? AND device = ?",
+                                  (self.scope, user, device)))
+
+    def put_profile(self, address, name, bio):
+        user = address.lower()
+        with self._lock:
+            self._profiles[user] = {'address': address, 'name': name, 'bio': bio}
+            self.version += 1
+            self._pending.append((
+                "INSERT INTO user_profiles (scope, user, address, name, bio) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (scope, user) DO UPDATE SET name = excluded.name, bio = excluded.bio",
+                (self.scope, user, address, name, bio)))
+
+    def remove_profile(self, address):
+        user = address.lower()
+        with self._lock:
+            self._profiles.pop(user, None)
+            self.version += 1
+            self._pending.append(("DELETE FROM user_profiles WHERE scope = ? AND user = ?", (self.scope, user)))
+
+    def commit(self, cursor):
+        """Persist queued changes and the cursor they bring the index up to, atomically"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self.cursor = dict(cursor)
+            if self._conn is None:
+                return
+            with self._conn:
+                for sql, params in pending:
+                    self._conn.execute(sql, params)
+                self._conn.execute(
+                    "INSERT INTO sync_cursors (scope, block, log_index) VALUES (?, ?, ?) "
+                    "ON CONFLICT (scope) DO UPDATE SET block = excluded.block, log_index = excluded.log_index",
+                    (self.scope, cursor['block'], cursor['log_index']))
+
+    def replace(self, profiles, entries, cursor):
+        """
+        Swap in a full snapshot
+
+        Args:
+            profiles (list): (address, name, bio) per registered user
+            entries (list): (user, device, whitelist_name, fee_per_second, is_free) per whitelist entry
+            cursor (dict): Block cursor the snapshot is current up to
+        """
+        with self._lock:
+            self._entries = {}
+            self._by_device = {}
+            self._profiles = {}
+            self._pending = [
+                ("DELETE FROM whitelist_entries WHERE scope = ?", (self.scope,)),
+                ("DELETE FROM user_profiles WHERE scope = ?", (self.scope,)),
+            ]
+            for address, name, bio in profiles:
+                self.put_profile(address, name, bio)
+            for user, device, whitelist_name, fee_per_second, is_free in entries:
+                self.put_entry(user, device, whitelist_name, fee_per_second, is_free)
+            self.commit(cursor)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def lookup_whitelist(user, device, db_path=DEFAULT_WHITELIST_DB):
+    """
+    One-off lookup straight from the SQLite index, for processes that keep no WhitelistIndex
+
+    Args:
+        user (str): User address
+        device (str): Device contract address
+        db_path (str): Index database written by WhitelistSync
+
+    Returns:
+        dict: {'whitelist_name', 'fee_per_second', 'is_free'}, or None if not
+            whitelisted or the index does not exist yet
+    """
+    if not user or not device or not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute(
+                "SELECT whitelist_name, fee_per_second, is_free FROM whitelist_entries "
+                "WHERE user = ? AND device = ? LIMIT 1", (user.lower(), device.lower())).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Whitelist index lookup failed: {e}")
+        return None
+    return _entry(*row) if row is not None else None
@@ -0,0 +1,208 @@
+"""
+InfraLink whitelist sync
+Fills the local WhitelistIndex with the Info contract's registered users and
+whitelist entries. The first start takes one snapshot, paged through registeredUsers(i) in
+batched reads so it never depends on one huge getAllRegisteredUsers()
+response; users whitelisted without a profile are found from the Whitelist*
+logs since the Info contract was deployed. After that only
+UserProfileUpdated / UserProfileDeleted and WhitelistAdded / WhitelistRemoved /
+WhitelistUpdated logs since the persisted block cursor are fetched, so a refresh costs in proportion to what changed,
+not to how many users are registered.
+"""
+
+from web3 import Web3
+
+from device_events import event_topic
+from rpc_batch import BatchReader, BatchCallError
+from whitelist_enrichment import UserEnricher
+from whitelist_index import DEFAULT_WHITELIST_DB, WhitelistIndex
+
+# Info contract events that change the mirrored registry
+SYNC_EVENTS = ('UserProfileUpdated', 'UserProfileDeleted', 'WhitelistAdded', 'WhitelistRemoved', 'WhitelistUpdated')
+# The ones that name every whitelisted user (indexed `user`), profile or not
+WHITELIST_EVENTS = ('WhitelistAdded', 'WhitelistRemoved', 'WhitelistUpdated')
+
+class WhitelistSync:
+    """
+    Keeps a WhitelistIndex current with the Info contract
+
+    Every event sets a value outright (an entry exists with these fields, or
+    it doesn't), so replaying logs the snapshot already reflects converges
+    on the same state; the snapshot can be read at 'latest' while the cursor
+    starts right after the block number read before it.
+    """
+
+    def __init__(self, w3, info_contract, chain_id, index=None, db_path=DEFAULT_WHITELIST_DB,
+                 max_block_range=1000, confirmations=0, enricher=None, deployment_block=0):
+        """
+        Args:
+            w3 (Web3): Connected Web3 instance
+            info_contract: web3 contract bound to INFO_CONTRACT_ABI
+            chain_id (int): Chain ID the Info contract lives on
+            index (WhitelistIndex, optional): Index to fill; by default one for this
+                Info contract persisted in db_path
+            db_path (str): SQLite file for the default index
+            max_block_range (int): Largest block span requested per eth_getLogs call
+            confirmations (int): Blocks to stay behind the head to avoid reorged logs
+            enricher (UserEnricher, optional): Bulk reader used for the first snapshot
+            deployment_block (int): Block the Info contract was deployed in; the
+                first snapshot scans Whitelist* logs from there
+        """
+        self.w3 = w3
+        self.contract = info_contract
+        self.chain_id = chain_id
+        self.max_block_range = max_block_range
+        self.confirmations = confirmations
+        self.deployment_block = deployment_block
+        self.enricher = enricher if enricher is not None else UserEnricher(w3, info_contract)
+        self.key = f"whitelist:{chain_id}:{info_contract.address.lower()}"
+
+        self._events_by_topic = {}
+        self._whitelist_topics = []
+        for entry in info_contract.abi:
+            if entry.get('type') == 'event' and entry['name'] in SYNC_EVENTS:
+                self._events_by_topic[event_topic(entry)] = getattr(info_contract.events, entry['name'])()
+                if entry['name'] in WHITELIST_EVENTS:
+                    self._whitelist_topics.append(event_topic(entry))
+
+        self.index = index if index is not None else WhitelistIndex(self.key, db_path)
+
+    @property
+    def cursor(self):
+        """{'block': n, 'log_index': i} the index is current up to, or None before the snapshot"""
+        return self.index.cursor
+
+    @property
+    def synced(self):
+        """True once a snapshot exists and events are being followed"""
+        return self.cursor is not None
+
+    def poll(self):
+        """
+        Bring the registry up to date: a snapshot on first start, new logs afterwards
+
+        Returns:
+            list: Decoded events applied, oldest first (empty after a snapshot)
+        """
+        head = self.w3.eth.block_number - self.confirmations
+        if head < 0:
+            return []
+        if self.cursor is None:
+            self.snapshot(head)
+            return []
+
+        applied = []
+        start_block = from_block = self.cursor['block']
+        last_seen = (self.cursor['block'], self.cursor['log_index'])
+        for logs, to_block in self._get_logs(from_block, head, list(self._events_by_topic.keys())):
+            for log in logs:
+                if (log['blockNumber'], log['logIndex']) <= last_seen:
+                    continue
+                event = self._events_by_topic[Web3.to_hex(log['topics'][0])].process_log(log)
+                self._apply(event)
+                applied.append(event)
+                last_seen = (log['blockNumber'], log['logIndex'])
+            from_block = to_block + 1
+
+        if from_block != start_block:
+            # Changes and the cursor past them land in one SQLite transaction
+            self.index.commit({'block': from_block, 'log_index': -1})
+        return applied
+
+    def _get_logs(self, from_block, to_block, topics):
+        """
+        eth_getLogs of the Info contract over a block range, in pages of at most max_block_range blocks
+
+        Yields:
+            tuple: (logs of one page sorted by position, last block the page covers)
+        """
+        page_size = self.max_block_range
+        while from_block <= to_block:
+            page_end = min(from_block + page_size - 1, to_block)
+            try:
+                logs = self.w3.eth.get_logs({
+                    'fromBlock': from_block,
+                    'toBlock': page_end,
+                    'address': self.contract.address,
+                    'topics': [topics]
+                })
+            except Exception:
+                # Most providers reject oversized ranges; shrink the page and retry
+                if page_size > 1:
+                    page_size = max(1, page_size // 2)
+                    continue
+                raise
+            yield sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex'])), page_end
+            from_block = page_end + 1
+
+    def whitelisted_users(self, to_block):
+        """
+        Every user a Whitelist* event has named since deployment_block, profile or not
+
+        Returns:
+            list: Checksummed addresses, first mention first
+        """
+        users = {}
+        for logs, _ in self._get_logs(self.deployment_block, to_block, self._whitelist_topics):
+            for log in logs:
+                # `user` is the first indexed argument: the low 20 bytes of topic 1
+                users.setdefault(Web3.to_hex(log['topics'][1])[-40:], None)
+        return [Web3.to_checksum_address('0x' + user) for user in users]
+
+    def snapshot(self, head):
+        """
+        Read the whole registry once and start following events after `head`
+
+        Users are enumerated through the public registeredUsers(i) getter, and
+        their profiles and whitelists read by the UserEnricher: chunks of
+        batched reads, several in flight at once. Users whitelisted without a
+        profile are not in registeredUsers; they are collected from the
+        Whitelist* logs up to `head` and their current whitelists read the
+        same way.
+        """
+        reader = BatchReader(self.w3)
+        reader.add(self.contract, 'getRegisteredUsersCount')
+        count = reader.execute()[0]
+        print(f"Whitelist sync: first start, reading {count} registered users")
+
+        registered = self.enricher.registered_users(count)
+        known = {address.lower() for address in registered}
+        unregistered = [address for address in self.whitelisted_users(head) if address.lower() not in known]
+        if unregistered:
+            print(f"Whitelist sync: {len(unregistered)} whitelisted users without a profile found in logs")
+        addresses = registered + unregistered
+
+        profiles = self.enricher.profiles(registered)
+        whitelists = self.enricher.whitelists(addresses)
+        incomplete = [address for address in addresses if address.lower() not in whitelists
+                      or (address.lower() in known and address.lower() not in profiles)]
+        if incomplete:
+            # A partial snapshot would hide those users' entries until they change again
+            raise BatchCallError(f"snapshot incomplete: could not read {len(incomplete)} users")
+
+        entries = []
+        for address in addresses:
+            for entry in whitelists[address.lower()]:
+                entries.append((address, entry['device'], entry['whitelist_name'],
+                                entry['fee_per_second'], entry['is_free']))
+        profiles = [(address, profiles[address.lower()]['name'], profiles[address.lower()]['bio'])
+                    for address in registered]
+
+        self.index.replace(profiles, entries, {'block': head + 1, 'log_index': -1})
+        print(f"Whitelist sync: snapshot of {len(profiles)} users and {len(entries)} whitelist entries saved")
+
+    def _apply(self, event):
+        """Apply one decoded Info contract event to the index (committed by poll())"""
+        args = event['args']
+        name = event['event']
+        self.enricher.invalidate(args['user'])
+        if name == 'UserProfileUpdated':
+            self.index.put_profile(args['user'], args['name'], args['bio'])
+        elif name == 'UserProfileDeleted':
+            # Whitelist entries survive a deleted profile on chain, so they stay here too
+            self.index.remove_profile(args['user'])
+        elif name in ('WhitelistAdded', 'WhitelistUpdated'):
+            self.index.put_entry(args['user'], args['deviceContract'], args['whitelistName'],
+                                 args['feePerSecond'], args['isFree'])
+        elif name == 'WhitelistRemoved':
+            self.index.remove_entry(args['user'], args['deviceContract'])
@@ -0,0 +1,215 @@
+"""
+InfraLink whitelist view
+Virtualized Treeview for registries with tens of thousands of users. The
+widget only ever holds the rows that fit on screen; scrolling or a changed
+filter re-fills those rows by diff instead of rebuilding the table, and
+details the local index cannot answer are fetched for visible rows only,
+on a worker thread.
+"""
+
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_ROW_HEIGHT = 20  # pixels; ttk's default Treeview rowheight
+
+
+class VirtualTreeview:
+    """
+    A Treeview that shows a window of `keys` without creating a row per key
+
+    The scrollbar drives an offset into `keys` rather than the Treeview's own
+    yview; each key's values come from `row_values(key)` when it scrolls into
+    view. Keys are used as item ids, so they must be unique strings.
+    """
+
+    def __init__(self, parent, columns, row_values, widths=None, visible_rows=10, on_visible=None):
+        """
+        Args:
+            parent: Tk container
+            columns (tuple): Column names (also used as headings)
+            row_values (callable): row_values(key) -> tuple of column values
+            widths (dict, optional): Column name -> width in pixels
+            visible_rows (int): Rows shown until the widget knows its real height
+            on_visible (callable, optional): Called with the list of keys shown
+                after every render, e.g. to fetch their missing details
+        """
+        self.row_values = row_values
+        self.on_visible = on_visible
+        self.keys = []
+        self.offset = 0
+        self.visible_rows = visible_rows
+        self._shown = {}  # key -> values currently in the widget
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show='headings', height=visible_rows)
+        for column in columns:
+            self.tree.heading(column, text=column)
+            if widths and column in widths:
+                self.tree.column(column, width=widths[column])
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3))
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def set_keys(self, keys, force=False, to_top=False):
+        """
+        Show a new key list, keeping the scroll position unless `to_top`
+
+        Args:
+            keys (list): Every key in display order
+            force (bool): Re-read the values of rows already on screen too
+            to_top (bool): Scroll back to the first row (e.g. for a new filter)
+        """
+        self.keys = keys
+        if to_top:
+            self.offset = 0
+        self.render(force)
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+
+    def refresh(self, keys=None):
+        """Re-read values of the given keys (default: every visible row) if they are on screen"""
+        if keys is None:
+            self.render(force=True)
+        elif any(key in self._shown for key in keys):
+            self.render(force=True)
+
+    def render(self, force=False):
+        """Bring the widget's rows in line with the visible window of keys, touching only what changed"""
+        self.offset = max(0, min(self.offset, len(self.keys) - self.visible_rows))
+        window = self.keys[self.offset:self.offset + self.visible_rows]
+
+        in_window = set(window)
+        gone = [key for key in self._shown if key not in in_window]
+        if gone:
+            self.tree.delete(*gone)
+            for key in gone:
+                del self._shown[key]
+
+        for position, key in enumerate(window):
+            shown = self._shown.get(key)
+            values = self.row_values(key) if force or shown is None else shown
+            if shown is None:
+                self.tree.insert('', position, iid=key, values=values)
+            else:
+                if values != shown:
+                    self.tree.item(key, values=values)
+                if self.tree.index(key) != position:
+                    self.tree.move(key, '', position)
+            self._shown[key] = values
+
+        if self.keys:
+            self.scrollbar.set(self.offset / len(self.keys),
+                               min(1.0, (self.offset + self.visible_rows) / len(self.keys)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if self.on_visible is not None and window:
+            self.on_visible(window)
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self.keys))
+        elif args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self.offset += int(args[1]) * step
+        self.render()
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, event):
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or DEFAULT_ROW_HEIGHT
+        # One row's worth of height is taken by the headings
+        rows = max(1, event.height // int(row_height) - 1)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+
+class LazyResolver:
+    """
+    Fetches per-key details on a worker thread, once per key
+
+    The Tk thread calls request() with the keys it is about to show and
+    drain() from its after() loop to pick up what arrived; fetch() never
+    runs on the Tk thread.
+    """
+
+    def __init__(self, fetch, max_workers=1):
+        """
+        Args:
+            fetch (callable): fetch(keys) -> {key: details} for a list of keys
+            max_workers (int): Fetches running at once
+        """
+        self.fetch = fetch
+        self.resolved = {}
+        self._requested = set()
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolver")
+
+    @property
+    def pending(self):
+        with self._lock:
+            return bool(self._requested)
+
+    def get(self, key):
+        return self.resolved.get(key)
+
+    def request(self, keys):
+        """Queue a fetch for the keys not resolved or already requested"""
+        with self._lock:
+            missing = [key for key in keys if key not in self.resolved and key not in self._requested]
+            self._requested.update(missing)
+        if missing:
+            self._executor.submit(self._run, missing)
+
+    def _run(self, keys):
+        try:
+            results = self.fetch(keys)
+        except Exception as e:
+            print(f"Could not resolve {len(keys)} rows: {e}")
+            results = {}
+        self._results.put((keys, results))
+
+    def drain(self):
+        """
+        Collect finished fetches (call from the Tk thread)
+
+        Returns:
+            list: Keys whose details arrived
+        """
+        arrived = []
+        try:
+            while True:
+                keys, results = self._results.get_nowait()
+                self.resolved.update(results)
+                arrived.extend(results)
+                with self._lock:
+                    # Keys that failed can be requested again on a later render
+                    self._requested.difference_update(keys)
+        except queue.Empty:
+            pass
+        return arrived
+
+    def clear(self):
+        self.resolved.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)